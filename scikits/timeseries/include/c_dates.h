@@ -22,8 +22,14 @@ ts_datetime PyDatetime_to_tsdatetime(ts_metadata *, PyObject *);
 DatetimeObject *DatetimeObject_FromFreqAndValue(int, npy_int64);
 
 PyObject *DateArray_asfreq(PyObject *, PyObject *);
+PyObject *DateArray_getaffinecoefs(PyObject *, PyObject *);
 PyObject *DateArray_getdateinfo(PyObject *, PyObject *);
+PyObject *DateArray_getdatefields(PyObject *, PyObject *);
+PyObject *DateArray_fromstrings(PyObject *, PyObject *);
+PyObject *DateArray_addtimedelta(PyObject *, PyObject *);
+PyObject *DateArray_strftime(PyObject *, PyObject *);
 PyObject *DateArray_getdatetime(PyObject *, PyObject *);
+PyObject *DateArray_fromdatetimes(PyObject *, PyObject *);
 
 
 PyObject *c_dates_now(PyObject *, PyObject *);
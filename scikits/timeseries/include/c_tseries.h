@@ -4,8 +4,11 @@
 #include "c_lib.h"
 
 PyObject *TimeSeries_convert(PyObject *, PyObject *);
+PyObject *TimeSeries_asof(PyObject *, PyObject *);
+PyObject *TimeSeries_groupsort(PyObject *, PyObject *);
 
 PyObject *MaskedArray_mov_sum(PyObject *, PyObject *, PyObject *);
+PyObject *MaskedArray_mov_moments(PyObject *, PyObject *, PyObject *);
 PyObject *MaskedArray_mov_median(PyObject *, PyObject *, PyObject *);
 PyObject *MaskedArray_mov_min(PyObject *, PyObject *, PyObject *);
 PyObject *MaskedArray_mov_max(PyObject *, PyObject *, PyObject *);
@@ -60,7 +60,8 @@ from numpy.ma import MaskedArray, nomask, getmask, getmaskarray, masked
 marray = ma.array
 
 from scikits.timeseries.cseries import \
-    MA_mov_sum, MA_mov_median, MA_mov_min, MA_mov_max, MA_mov_average_expw
+    MA_mov_sum, MA_mov_moments, MA_mov_median, MA_mov_min, MA_mov_max, \
+    MA_mov_average_expw
 
 
 _doc_parameters = dict(
@@ -121,31 +122,14 @@ def _moving_func(data, cfunc, kwargs):
     data = ma.fix_invalid(data)
     data = ma.array(data.filled(0), mask=data._mask)
 
-    if data.ndim == 1:
-        kwargs['array'] = data
-        result_dict = cfunc(**kwargs)
-        return _process_result_dict(data, result_dict)
-
-    elif data.ndim == 2:
-        for i in range(data.shape[-1]):
-            kwargs['array'] = data[:,i]
-            result_dict = cfunc(**kwargs)
-
-            if i == 0:
-                rtype = result_dict['array'].dtype
-                result = data.astype(rtype)
-                print data.dtype, result.dtype
-
-            rmask = result_dict.get('mask', ma.nomask)
-
-            curr_col = marray(result_dict['array'], mask=rmask, copy=False)
-            result[:,i] = curr_col
-
-        return result
-
-    else:
+    if data.ndim > 2:
         raise ValueError, "Data should be at most 2D"
 
+    # 2D arrays are processed column by column in the C function
+    kwargs['array'] = data
+    result_dict = cfunc(**kwargs)
+    return _process_result_dict(data, result_dict)
+
 #...............................................................................
 def _mov_sum(data, span, dtype=None, type_num_double=False):
     """
@@ -256,6 +240,37 @@ mov_mean = mov_average
 
 
 
+def _mov_moments(x, y, span, ddof=0, dtype=None):
+    """
+    Helper function for calculating the moving means, variances and covariance
+    of x and y in a single pass.
+    Returns a dictionary of masked arrays with keys 'mean_x' and 'var_x',
+    and 'mean_y', 'var_y' and 'cov' if y is not None.
+    The results are masked wherever x or y is masked.
+    """
+    x = ma.fix_invalid(x)
+    mask = getmaskarray(x)
+    if y is not None:
+        y = ma.fix_invalid(y)
+        mask = np.logical_or(mask, getmaskarray(y))
+        y = y.filled(0)
+    data = ma.array(x.filled(0), mask=mask)
+
+    kwargs = {'span':span, 'ddof':ddof}
+    if dtype is not None:
+        kwargs['dtype'] = dtype
+
+    if data.ndim > 2:
+        raise ValueError, "Data should be at most 2D"
+
+    result_dict = MA_mov_moments(data, y=y, **kwargs)
+    rmask = result_dict.pop('mask')
+    return dict((key, _process_result_dict(data, {'array':rarray,
+                                                  'mask':rmask}))
+                for (key, rarray) in result_dict.iteritems())
+
+
+
 def mov_var(data, span, dtype=None, ddof=0):
     """
     Calculates the moving variance of a 1-D array.
@@ -269,7 +284,7 @@ def mov_var(data, span, dtype=None, ddof=0):
 
     %(movfuncresults)s
     """ % _doc_parameters
-    return _mov_cov(data, data, span, ddof, dtype=dtype)
+    return _mov_moments(data, None, span, ddof, dtype=dtype)['var_x']
 
 
 
@@ -290,20 +305,6 @@ def mov_std(data, span, dtype=None, ddof=0):
 
 
 
-def _mov_cov(x, y, span, ddof, dtype=None):
-    # helper function
-    denom = span - ddof
-
-    x = ma.asanyarray(x)
-    y = ma.asanyarray(y)
-
-    sum_prod = _mov_sum(x*y, span, dtype=dtype, type_num_double=True)
-    sum_x = _mov_sum(x, span, dtype=dtype, type_num_double=True)
-    sum_y = _mov_sum(y, span, dtype=dtype, type_num_double=True)
-
-    return sum_prod/denom - (sum_x * sum_y) / (span*denom)
-
-
 def mov_cov(x, y, span, bias=0, dtype=None):
     """
     Calculates the moving covariance of two 1-D arrays.
@@ -323,7 +324,7 @@ def mov_cov(x, y, span, bias=0, dtype=None):
     else:
         ddof = 0
 
-    return _mov_cov(x, y, span, ddof, dtype=dtype)
+    return _mov_moments(x, y, span, ddof, dtype=dtype)['cov']
 #...............................................................................
 def mov_corr(x, y, span, dtype=None):
     """
@@ -339,19 +340,8 @@ def mov_corr(x, y, span, dtype=None):
     %(movfuncresults)s
     """ % _doc_parameters
 
-    sum_x = _mov_sum(x, span, dtype=dtype, type_num_double=True)
-    sum_y = _mov_sum(y, span, dtype=dtype, type_num_double=True)
-
-    sum_prod = _mov_sum(x*y, span, dtype=dtype, type_num_double=True)
-    _covar = sum_prod/span - (sum_x * sum_y) / (span ** 2)
-
-    sum_prod = _mov_sum(x**2, span, dtype=dtype, type_num_double=True)
-    _stddev_x = sqrt(sum_prod/span - (sum_x ** 2) / (span ** 2))
-
-    sum_prod = _mov_sum(y**2, span, dtype=dtype, type_num_double=True)
-    _stddev_y = sqrt(sum_prod/span - (sum_y ** 2) / (span ** 2))
-
-    return _covar / (_stddev_x * _stddev_y)
+    moments = _mov_moments(x, y, span, dtype=dtype)
+    return moments['cov'] / sqrt(moments['var_x'] * moments['var_y'])
 
 
 
@@ -302,11 +302,6 @@ class Report(object):
             justify = ['none' for x in range(len(tseries)+1)]
             header_justify = justify
 
-        if datefmt is None:
-            def datefmt_func(date): return str(date)
-        else:
-            def datefmt_func(date): return date.strftime(datefmt)
-
         if dates is None:
             tseries = ts.align_series(*tseries)
             dates = ts.date_array(start_date=tseries[0].start_date,
@@ -338,10 +333,14 @@ class Report(object):
             col_width = [col_width for x in range(len(tseries)+1)]
 
         _sd = dates[0]
+        if datefmt is None:
+            datelabels = dates.tostring()
+        else:
+            datelabels = dates.strftime(datefmt)
 
-        for d in dates:
+        for (d, label) in zip(dates, datelabels):
             rows.append(
-                [datefmt_func(d)] + \
+                [label] + \
                 [fmt_func[i](ser.series[d - _sd]) \
                  for i, ser in enumerate(tseries)]
             )
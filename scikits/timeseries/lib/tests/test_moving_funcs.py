@@ -149,6 +149,24 @@ class TestMovFuncs(TestCase):
                 assert_equal(result._mask, result_mask)
                 assert_equal(result._dates, data._dates)
 
+    def test_on2darray(self):
+        "Test the moving functions on the columns of a 2D array"
+        data = ma.array(np.random.rand(25, 3))
+        data[10, 0] = data[3, 2] = masked
+        func_pairs = self.func_pairs + [(mf.mov_sum, None),
+                                        (mf.mov_min, None),
+                                        (mf.mov_max, None),
+                                        (mf.mov_average_expw, None)]
+        for mfunc, _ in func_pairs:
+            for k in [3, 4, 5]:
+                result = mfunc(data, k)
+                self.failUnless(isinstance(result, MaskedArray))
+                assert_equal(result.shape, data.shape)
+                for i in range(data.shape[1]):
+                    control = mfunc(data[:, i], k)
+                    assert_almost_equal(result[:, i], control)
+                    assert_equal(result[:, i]._mask, control._mask)
+
     def test_cov(self):
         "Test that  the covariance of series with itself is equal to variance"
         data = self.maskeddata
@@ -158,6 +176,20 @@ class TestMovFuncs(TestCase):
             assert_equal(cov, var)
 
 
+    def test_var_large_mean(self):
+        "Test mov_var/mov_corr on series with a large mean"
+        x = 1e9 + np.random.rand(100)
+        y = 1e9 + np.random.rand(100)
+        for k in [3, 10]:
+            var = mf.mov_var(x, k, ddof=1)
+            corr = mf.mov_corr(x, y, k)
+            for i in range(k-1, len(x)):
+                assert_almost_equal(var[i], x[i-k+1:i+1].var(ddof=1), 5)
+                assert_almost_equal(corr[i],
+                                    np.corrcoef(x[i-k+1:i+1],
+                                                y[i-k+1:i+1])[0, 1], 4)
+
+
     def test_on_list(self):
         "Test the moving functions on lists"
         data = self.data.tolist()
@@ -204,6 +236,45 @@ class TestMovFuncs(TestCase):
         assert_almost_equal(res_a, res_b)
 
 
+    def test_mov_sum_dtypes(self):
+        "Test mov_sum on the dtypes w/ a typed loop and on the fallback"
+        data = ma.array(np.arange(25), mask=False)
+        data[10] = masked
+        for dtype in (np.float32, np.float64, np.int32, np.int64, np.complex128):
+            series = data.astype(dtype)
+            for k in [3, 4, 5]:
+                result = mf.mov_sum(series, k)
+                self.failUnless(isinstance(result, MaskedArray))
+                for x in range(len(data)-k+1):
+                    if result[x+k-1] is not ma.masked:
+                        assert_equal(result[x+k-1], series[x:x+k].sum())
+                result_mask = np.array([1]*(k-1)+[0]*(len(data)-k+1))
+                result_mask[10:10+k] = 1
+                assert_equal(result._mask, result_mask)
+
+
+    def test_mov_ranked_dtypes(self):
+        "Test mov_median/min/max on the dtypes w/ a typed loop and on the fallback"
+        data = ma.array(np.random.permutation(25), mask=False)
+        data[10] = masked
+        func_pairs = [(mf.mov_median, ma.median),
+                      (mf.mov_min, ma.min),
+                      (mf.mov_max, ma.max)]
+        for dtype in (np.float32, np.float64, np.int32, np.int64, np.int16):
+            series = data.astype(dtype)
+            for mfunc, nfunc in func_pairs:
+                for k in [1, 3, 4, 5, 25]:
+                    result = mfunc(series, k)
+                    self.failUnless(isinstance(result, MaskedArray))
+                    for x in range(len(data)-k+1):
+                        if result[x+k-1] is not ma.masked:
+                            assert_almost_equal(result[x+k-1],
+                                                nfunc(series[x:x+k]))
+                    result_mask = np.array([1]*(k-1)+[0]*(len(data)-k+1))
+                    result_mask[10:10+k] = 1
+                    assert_equal(result._mask, result_mask)
+
+
     def test_mov_average_expw(self):
         "Test mov_average_expw"
         ser_a = ma.array(range(150), dtype=np.float32)
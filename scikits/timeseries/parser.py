@@ -10,12 +10,13 @@ Please see license.txt for more details.
 """
 
 __all__ = [
-'DateFromString', 'DateTimeFromString'
+'DateFromString', 'DateTimeFromString', 'DateTimeParser'
            ]
 
 import types
 import re
 import datetime as dt
+from collections import deque
 
 class RangeError(Exception): pass
 
@@ -321,7 +322,7 @@ def add_century(year):
         return year - 100
 
 
-def _parse_date(text):
+def _parse_date(text, formats=None):
     """
     Parses the date part given in text and returns a tuple
     (text,day,month,year,style) with the following meanings:
@@ -357,7 +358,8 @@ def _parse_date(text):
     match = None
     style = ''
 
-    formats = _date_formats
+    if formats is None:
+        formats = _date_formats
 
     us_formats=('us', 'altus')
     iso_formats=('iso', 'altiso', 'usiso')
@@ -555,7 +557,7 @@ def _parse_date(text):
     #print '_parse_date:',text,day,month,year,style
     return text,day,month,year,style
 
-def _parse_time(text):
+def _parse_time(text, formats=None):
 
     """ Parses a time part given in text and returns a tuple
         (text,hour,minute,second,offset,style) with the following
@@ -581,7 +583,8 @@ def _parse_time(text):
     match = None
     style = ''
 
-    formats=_time_formats
+    if formats is None:
+        formats = _time_formats
 
     # Apply parsers in the order given in formats
     for format in formats:
@@ -749,6 +752,151 @@ def DateFromString(text):
         raise RangeError,\
               'Failed to parse "%s": %s' % (text, why)
 
+# Any digit left once the date and time parts have been removed
+_digitRE = re.compile('\d')
+
+class DateTimeParser(object):
+
+    """ DateTimeParser([dateonly, maxsize])
+
+        Callable parser of date/time strings, for sequences of strings
+        sharing the same format.
+
+        The parser locks onto the date style and the parsing order that
+        succeeded on the first string and tries them first on the next
+        strings, instead of running the whole cascade of date and time
+        parsers. A string is only accepted by the locked style if no
+        digit is left once its date and time parts are removed: otherwise,
+        it is parsed as by DateTimeFromString (or DateFromString if
+        dateonly is True), and the parser locks onto the new style.
+
+        The results are also memoized in a cache of at most maxsize
+        strings, the least recently used strings being discarded first.
+        The numbers of cache hits and misses are stored in the hits and
+        misses attributes, and the number of strings that did not match
+        the locked style in the fallbacks attribute.
+
+    """
+
+    def __init__(self, dateonly=False, maxsize=1024):
+        self.dateonly = dateonly
+        self.maxsize = maxsize
+        # The cache maps each string to [value, tick], the tick of its last
+        # use. The (tick, string) pairs are queued in order of use: a pair
+        # is stale if the string has been used again since.
+        self._cache = {}
+        self._order = deque()
+        self._tick = 0
+        self.datestyle = None
+        self.isoorder = False
+        self.hits = self.misses = self.fallbacks = 0
+
+    def __call__(self, text):
+        if self.maxsize <= 0:
+            self.misses += 1
+            return self._parse(text)
+        cache = self._cache
+        self._tick += 1
+        entry = cache.get(text)
+        if entry is None:
+            self.misses += 1
+            value = self._parse(text)
+            if len(cache) >= self.maxsize:
+                self._discard()
+            entry = cache[text] = [value, self._tick]
+        else:
+            self.hits += 1
+            entry[1] = self._tick
+        self._order.append((self._tick, text))
+        if len(self._order) > 2 * self.maxsize:
+            # Drop the stale pairs
+            order = [(tick, key) for (key, (value, tick)) in cache.iteritems()]
+            order.sort()
+            self._order = deque(order)
+        return entry[0]
+
+    def _discard(self):
+        """ Removes the least recently used string from the cache.
+        """
+        cache = self._cache
+        order = self._order
+        while True:
+            (tick, text) = order.popleft()
+            if cache[text][1] == tick:
+                del cache[text]
+                return
+
+    def clear(self):
+        """ Empties the cache, resets the counters and unlocks the style.
+        """
+        self._cache.clear()
+        self._order.clear()
+        self._tick = 0
+        self.datestyle = None
+        self.isoorder = False
+        self.hits = self.misses = self.fallbacks = 0
+
+    def _parse_parts(self, text, dateformats, isoorder):
+        """ Returns the date and time parts of text and the styles used,
+            parsing the date first if isoorder is True, the time first
+            otherwise.
+            With dateonly, the date is parsed on the whole text and the
+            time part is only removed from what is left.
+        """
+        if self.dateonly or isoorder:
+            left,day,month,year,datestyle = _parse_date(text, dateformats)
+            if self.dateonly and not _digitRE.search(left):
+                return (left, (year,month,day,0,0,0,0), datestyle, None)
+            left,hour,minute,second,offset,timestyle = _parse_time(left)
+        else:
+            left,hour,minute,second,offset,timestyle = _parse_time(text)
+            left,day,month,year,datestyle = _parse_date(left, dateformats)
+        return (left, (year,month,day,hour,minute,second,offset),
+                datestyle, timestyle)
+
+    def _parse(self, text):
+        if self.datestyle is not None:
+            try:
+                (left, parts, datestyle, timestyle) = \
+                    self._parse_parts(text, (self.datestyle,), self.isoorder)
+            except ValueError:
+                pass
+            else:
+                # The time part must be parsed in the same order as before
+                if (self.dateonly or self.isoorder or \
+                    timestyle == 'standard') and not _digitRE.search(left):
+                    try:
+                        return self._todatetime(text, *parts)
+                    except RangeError:
+                        pass
+            self.fallbacks += 1
+        # Locate the date and time parts the same way as DateTimeFromString
+        # (or DateFromString)
+        isoorder = False
+        (left, parts, datestyle, timestyle) = \
+            self._parse_parts(text, None, False)
+        if (not self.dateonly) and (timestyle in ('iso', 'unknown')):
+            isoorder = True
+            (left, parts, datestyle, timestyle) = \
+                self._parse_parts(text, None, True)
+        if (datestyle != 'unknown') and not _digitRE.search(left):
+            self.datestyle = datestyle
+            self.isoorder = isoorder
+        return self._todatetime(text, *parts)
+
+    def _todatetime(self, text, year, month, day, hour, minute, second,
+                    offset):
+        try:
+            if self.dateonly:
+                return dt.datetime(year,month,day)
+            microsecond = int(1000000 * (second % 1))
+            second = int(second)
+            return dt.datetime(year,month,day,hour,minute,second,
+                               microsecond) - dt.timedelta(minutes=offset)
+        except ValueError, why:
+            raise RangeError,\
+                  'Failed to parse "%s": %s' % (text, why)
+
 def validateDateTimeString(text):
 
     """ validateDateTimeString(text, [formats, defaultdate])
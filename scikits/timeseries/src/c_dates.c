@@ -5,6 +5,7 @@
 
 #include <datetime.h>
 #include <time.h>
+#include <ctype.h>
 
 
 
@@ -165,9 +166,14 @@ PyDatetime_to_tsdatetime(ts_metadata *meta, PyObject *datetime)
         dinfo.year = (npy_int64)PyDateTime_GET_YEAR(datetime);
         dinfo.month = PyDateTime_GET_MONTH(datetime);
         dinfo.day = (int)PyDateTime_GET_DAY(datetime);
-        dinfo.hour = (int)PyDateTime_DATE_GET_HOUR(datetime);
-        dinfo.min = (int)PyDateTime_DATE_GET_MINUTE(datetime);
-        dinfo.sec = (int)PyDateTime_DATE_GET_SECOND(datetime);
+        if (PyDateTime_Check(datetime)) {
+            dinfo.hour = (int)PyDateTime_DATE_GET_HOUR(datetime);
+            dinfo.min = (int)PyDateTime_DATE_GET_MINUTE(datetime);
+            dinfo.sec = (int)PyDateTime_DATE_GET_SECOND(datetime);
+        }
+        else {
+            dinfo.hour = dinfo.min = dinfo.sec = 0;
+        }
         //
         val = datetimestruct_to_tsdatetime(meta, &dinfo);
     }
@@ -395,7 +401,7 @@ DatetimeObject_init(DatetimeObject *self, PyObject *args, PyObject *kwds) {
 
 
 static PyMemberDef DatetimeObject_members[] = {
-    {"value", T_INT, offsetof(DatetimeObject, obval), 0,
+    {"value", T_LONGLONG, offsetof(DatetimeObject, obval), 0,
      "integer representation of the Date"},
     {NULL}  /* Sentinel */
 };
@@ -883,148 +889,253 @@ static char DatetimeObject_strftime_doc[] =
 "   '01-Jan-2006'\n"
 "   >>> a.strftime('%b. %d, %Y was a %A')\n"
 "   'Jan. 01, 2001 was a Monday'\n";
-static PyObject *
-DatetimeObject_strftime(DatetimeObject *self, PyObject *args)
+/* Precompiled strftime formats
+
+   A format is split once into a list of tokens: chunks of standard directives
+   that are handed to the C strftime, and the custom quarter directives
+   (%q, %f and %F) that are computed directly.
+*/
+#define STRF_CHUNK 0
+#define STRF_QUARTER 1
+#define STRF_SHORTYEAR 2
+#define STRF_YEAR 3
+
+typedef struct {
+    int ntokens;
+    int *kinds;
+    char **chunks;
+    int daily;      // Whether the output only depends on the day
+    int quarterly;  // Whether we need the quarter of the dates
+    size_t maxlen;  // Size of the buffer for one formatted date
+    ts_metadata meta_qtr;
+    conversion_function qtr_from_days;
+} ts_strftime_format;
+
+
+static void
+_free_strftime_format(ts_strftime_format *cfmt)
 {
-    char *orig_fmt_str, *fmt_str;
-    char *result;
-
-    int num_extra_fmts = 3;
-    char extra_fmts[3][2][10] = {{"%q", "^`AB`^"},
-                                 {"%f", "^`CD`^"},
-                                 {"%F", "^`EF`^"}};
-    int extra_fmts_found[3] = {0,0,0};
-    int extra_fmts_found_one = 0;
-    struct tm c_date;
-    ymdstruct ymd;
-    hmsstruct hms;
-    npy_int64 absdate;
-    double abstime;
-    int i, result_len;
-    PyObject *py_result;
+    int i;
+    if (cfmt->chunks != NULL) {
+        for (i=0; i < cfmt->ntokens; i++)
+            PyArray_free(cfmt->chunks[i]);
+    }
+    PyArray_free(cfmt->chunks);
+    PyArray_free(cfmt->kinds);
+    cfmt->ntokens = 0;
+    cfmt->chunks = NULL;
+    cfmt->kinds = NULL;
+}
 
-    ts_metadata meta = self->obmeta;
 
-    if (!PyArg_ParseTuple(args, "s:strftime(fmt)", &orig_fmt_str))
-        return NULL;
+static int
+_add_strftime_token(ts_strftime_format *cfmt, int kind,
+                    const char *start, size_t length)
+{
+    int i = cfmt->ntokens;
+    if ((cfmt->chunks[i] = PyArray_malloc((length+1) * sizeof(char))) == NULL)
+        return -1;
+    memcpy(cfmt->chunks[i], start, length);
+    cfmt->chunks[i][length] = '\0';
+    cfmt->kinds[i] = kind;
+    cfmt->ntokens++;
+    return 0;
+}
 
-    conversion_function convert_to_days = get_converter_to_days(meta.unit, 0);
-    meta.convert_to_start = 0;
 
-    absdate = convert_to_days(self->obval, &meta);
+static int
+_compile_strftime_format(const char *fmt, ts_metadata *meta,
+                         ts_strftime_format *cfmt)
+{
+    const char *current, *directive, *chunk_start;
+    size_t fmt_len = strlen(fmt);
+    int kind;
+
+    cfmt->ntokens = 0;
+    cfmt->daily = 1;
+    cfmt->quarterly = 0;
+    cfmt->maxlen = 8 * fmt_len + 256;
+    // We can't have more tokens than characters
+    cfmt->kinds = PyArray_malloc((fmt_len + 2) * sizeof(int));
+    cfmt->chunks = PyArray_malloc((fmt_len + 2) * sizeof(char *));
+    if ((cfmt->kinds == NULL) || (cfmt->chunks == NULL))
+        goto fail;
+
+    current = chunk_start = fmt;
+    while (*current) {
+        if (*current != '%') {
+            current++;
+            continue;
+        }
+        // Skip the flags, the width and the modifiers of the directive
+        directive = current++;
+        while (*current && strchr("_-0^#123456789EO", *current))
+            current++;
+        if (!*current)
+            break;
+        if (*current == 'q')
+            kind = STRF_QUARTER;
+        else if (*current == 'f')
+            kind = STRF_SHORTYEAR;
+        else if (*current == 'F')
+            kind = STRF_YEAR;
+        else {
+            if (strchr("HIklMpPrRSsTXc", *current))
+                cfmt->daily = 0;
+            current++;
+            continue;
+        }
+        // Flush the standard directives found so far
+        if (_add_strftime_token(cfmt, STRF_CHUNK, chunk_start,
+                                directive - chunk_start) < 0)
+            goto fail;
+        if (_add_strftime_token(cfmt, kind, "", 0) < 0)
+            goto fail;
+        cfmt->quarterly = 1;
+        chunk_start = ++current;
+    }
+    if (_add_strftime_token(cfmt, STRF_CHUNK, chunk_start,
+                            strlen(chunk_start)) < 0)
+        goto fail;
+
+    if (cfmt->quarterly) {
+        if (meta->unit == FR_QTR)
+            cfmt->meta_qtr = *meta;
+        else
+            init_metadata_from_unit(&(cfmt->meta_qtr), FR_QTR);
+        cfmt->meta_qtr.convert_to_start = 0;
+        cfmt->qtr_from_days = get_converter_from_days(cfmt->meta_qtr.unit, 0);
+    }
+    return 0;
+
+ fail:
+    _free_strftime_format(cfmt);
+    PyErr_NoMemory();
+    return -1;
+}
+
+
+/* Formats the date of absolute day absdate and seconds from midnight abstime
+   into result (a buffer of cfmt->maxlen chars), and returns the length of the
+   string. */
+static size_t
+_format_date(npy_int64 absdate, npy_int64 abstime, ts_strftime_format *cfmt,
+             char *result)
+{
+    struct tm c_date;
+    ymdstruct ymd;
+    hmsstruct hms;
+    int i, qvals, quarter, year;
+    size_t length = 0, left = cfmt->maxlen;
+
     ymd = days_to_ymdstruct(absdate, GREGORIAN_CALENDAR);
-    abstime = _secs_from_midnight(self->obval, meta.unit);
     hms = seconds_to_hmsstruct(abstime);
 
     /* Populate standard C date struct with info from our date_info struct */
+    memset(&c_date, 0, sizeof(struct tm));
     c_date.tm_sec = hms.sec;
     c_date.tm_min = hms.min;
     c_date.tm_hour = hms.hour;
     c_date.tm_mday = ymd.day;
     c_date.tm_mon = ymd.month - 1;
     c_date.tm_year = ymd.year - 1900;
-    // c_date.tm_wday = (tempDate.day_of_week + 1) % 7;
-    // c_date.tm_yday = tempDate.day_of_year - 1;
+    c_date.tm_wday = (day_of_week(absdate) + 1) % 7;
+    c_date.tm_yday = ymd.day_of_year - 1;
     c_date.tm_isdst = -1;
 
-    result_len = strlen(orig_fmt_str) + 50;
-    if ((result = PyArray_malloc(result_len * sizeof(char))) == NULL)
-        return PyErr_NoMemory();
+    quarter = year = 0;
+    if (cfmt->quarterly) {
+        qvals = (cfmt->qtr_from_days)(absdate, &(cfmt->meta_qtr));
+        quarter = qvals % 4;
+        quarter = (quarter == 0 ? 4 : quarter);
+        year = (qvals - quarter)/4 + 1;
+        if (cfmt->meta_qtr.period_end_at > 12)
+            year -= 1;
+    }
 
-    fmt_str = orig_fmt_str;
-
-    // replace any special format characters with their place holder
-    for(i=0; i < num_extra_fmts; i++) {
-        char *special_loc;
-        if ((special_loc = strstr(fmt_str,extra_fmts[i][0])) != NULL) {
-            char *tmp_str = fmt_str;
-            fmt_str = str_replace(fmt_str, extra_fmts[i][0],
-                                           extra_fmts[i][1]);
-            /* only free the previous loop value if this is not the first
-               special format string found */
-            if (extra_fmts_found_one)
-                free(tmp_str);
-
-            if (fmt_str == NULL)
-                return NULL;
-
-            extra_fmts_found[i] = 1;
-            extra_fmts_found_one = 1;
+    result[0] = '\0';
+    for (i=0; i < cfmt->ntokens; i++) {
+        switch (cfmt->kinds[i]) {
+            case STRF_CHUNK:
+                if (cfmt->chunks[i][0])
+                    length += strftime(result + length, left,
+                                       cfmt->chunks[i], &c_date);
+                break;
+            case STRF_QUARTER:
+                length += PyOS_snprintf(result + length, left, "%i", quarter);
+                break;
+            case STRF_SHORTYEAR:
+                if (year % 100 < 10)
+                    length += PyOS_snprintf(result + length, left,
+                                            "0%i", year % 100);
+                else
+                    length += PyOS_snprintf(result + length, left,
+                                            "%i", year % 100);
+                break;
+            case STRF_YEAR:
+                length += PyOS_snprintf(result + length, left, "%i", year);
+                break;
         }
+        if (length >= cfmt->maxlen) {
+            length = cfmt->maxlen - 1;
+            break;
+        }
+        left = cfmt->maxlen - length;
     }
+    result[length] = '\0';
+    return length;
+}
 
-    strftime(result, result_len, fmt_str, &c_date);
-    if (extra_fmts_found_one)
-        free(fmt_str);
 
-    // replace any place holders with the appropriate value
-    for(i=0; i < num_extra_fmts; i++) {
-        if (extra_fmts_found[i]) {
-            char *tmp_str = result;
-            char *extra_str;
+/* Returns the default format of the string representation of a date */
+static char *
+_default_strftime_format(int unit)
+{
+    switch (unit) {
+        case FR_ANN: return "%Y";
+        case FR_QTR: return "%FQ%q";
+        case FR_MTH: return "%b-%Y";
+        case FR_WK:
+        case FR_BUS:
+        case FR_DAY: return "%d-%b-%Y";
+        case FR_HR: return "%d-%b-%Y %H:00";
+        case FR_MIN: return "%d-%b-%Y %H:%M";
+        case FR_SEC: return "%d-%b-%Y %H:%M:%S";
+    }
+    return NULL;
+}
 
-            if (strcmp(extra_fmts[i][0], "%q") == 0 ||
-                strcmp(extra_fmts[i][0], "%f") == 0 ||
-                strcmp(extra_fmts[i][0], "%F") == 0) {
 
-                ts_metadata meta_qtr;
-                if (self->obmeta.unit == FR_QTR)
-                    meta_qtr = self->obmeta;
-                else
-                    init_metadata_from_unit(&meta_qtr, FR_QTR);
-
-                int year, quarter, qvals, year_len;
-                meta_qtr.convert_to_start = 0;
-//                conversion_info qtr_info;
-//                metadata_to_conversioninfo(&meta_qtr, &qtr_info);
-//                set_conversion_info(qtr_freq, 'E', &qtr_info);
-
-                qvals = (*get_converter_from_days(meta_qtr.unit, 0))(absdate, &meta_qtr);
-                quarter = qvals % 4;
-                quarter = (quarter == 0 ? 4 : quarter);
-                year = (qvals - quarter)/4 + 1;
-
-                if(strcmp(extra_fmts[i][0], "%q") == 0) {
-                    if ((extra_str = PyArray_malloc(2 * sizeof(char))) == NULL) {
-                        free(tmp_str);
-                        return PyErr_NoMemory();
-                    }
-                    sprintf(extra_str, "%i", quarter);
-                } else {
-                    if (meta_qtr.period_end_at > 12)
-                        year -= 1;
-
-                    if (strcmp(extra_fmts[i][0], "%f") == 0) {
-                        year_len = 2;
-                        year = year % 100;
-                    }
-                    else
-                        year_len = 4;
+static PyObject *
+DatetimeObject_strftime(DatetimeObject *self, PyObject *args)
+{
+    char *fmt_str, *result;
+    size_t length;
+    npy_int64 absdate, abstime;
+    ts_strftime_format cfmt;
+    PyObject *py_result;
 
-                    if ((extra_str = PyArray_malloc((year_len+1) * sizeof(char))) == NULL) {
-                        free(tmp_str);
-                        return PyErr_NoMemory();
-                    }
+    ts_metadata meta = self->obmeta;
 
-                    if (year_len == 2 && year < 10)
-                        sprintf(extra_str, "0%i", year);
-                    else
-                        sprintf(extra_str, "%i", year);
-                }
-            }
-            else {
-                PyErr_SetString(PyExc_RuntimeError,"Unrecognized format string");
-                return NULL;
-            }
+    if (!PyArg_ParseTuple(args, "s:strftime(fmt)", &fmt_str))
+        return NULL;
 
-            result = str_replace(result, extra_fmts[i][1], extra_str);
-            free(tmp_str);
-            free(extra_str);
-            if (result == NULL) { return NULL; }
-        }
+    conversion_function convert_to_days = get_converter_to_days(meta.unit, 0);
+    meta.convert_to_start = 0;
+
+    if (_compile_strftime_format(fmt_str, &meta, &cfmt) < 0)
+        return NULL;
+    if ((result = PyArray_malloc(cfmt.maxlen * sizeof(char))) == NULL) {
+        _free_strftime_format(&cfmt);
+        return PyErr_NoMemory();
     }
-    py_result = PyString_FromString(result);
-    free(result);
+    absdate = convert_to_days(self->obval, &meta);
+    abstime = _secs_from_midnight(self->obval, meta.unit);
+    length = _format_date(absdate, abstime, &cfmt, result);
+
+    py_result = PyString_FromStringAndSize(result, length);
+    PyArray_free(result);
+    _free_strftime_format(&cfmt);
     return py_result;
 }
 
@@ -1033,23 +1144,18 @@ static PyObject *
 DatetimeObject___str__(DatetimeObject* self)
 {
     int unit = self->obmeta.unit;
+    char *fmt_str;
     PyObject *string_arg, *retval;
 
-    string_arg = NULL;
     if (unit == FR_UND) {
         retval = PyString_FromFormat("%ld", (long)(self->obval));
         return retval;
         }
-    else if (unit == FR_ANN) { string_arg = Py_BuildValue("(s)", "%Y"); }
-    else if (unit == FR_QTR) { string_arg = Py_BuildValue("(s)", "%FQ%q"); }
-    else if (unit == FR_MTH) { string_arg = Py_BuildValue("(s)", "%b-%Y"); }
-    else if (unit == FR_DAY ||
-             unit == FR_BUS ||
-             unit == FR_WK) { string_arg = Py_BuildValue("(s)", "%d-%b-%Y"); }
-    else if (unit == FR_HR) { string_arg = Py_BuildValue("(s)", "%d-%b-%Y %H:00"); }
-    else if (unit == FR_MIN) { string_arg = Py_BuildValue("(s)", "%d-%b-%Y %H:%M"); }
-    else if (unit == FR_SEC) { string_arg = Py_BuildValue("(s)", "%d-%b-%Y %H:%M:%S"); }
-
+    if ((fmt_str = _default_strftime_format(unit)) == NULL) {
+        PyErr_SetString(PyExc_ValueError, "Unrecognized frequency");
+        return NULL;
+    }
+    string_arg = Py_BuildValue("(s)", fmt_str);
     if (string_arg == NULL) { return NULL; }
     retval = DatetimeObject_strftime(self, string_arg);
     Py_DECREF(string_arg);
@@ -1204,47 +1310,80 @@ DatetimeObject_date_plus_int(PyObject *date, PyObject *pyint) {
 }
 
 
+/* Returns the number of days in the given month (Gregorian calendar) */
+static int
+_days_in_month(npy_int64 year, int month)
+{
+    static int days_per_month[12] = {31, 28, 31, 30, 31, 30,
+                                     31, 31, 30, 31, 30, 31};
+    if ((month == 2) && is_leapyear(year, GREGORIAN_CALENDAR))
+        return 29;
+    return days_per_month[month - 1];
+}
+
+/* Returns the value of the date `value` shifted by the given numbers of
+   months, days and seconds.
+   The months are added first: the day is clipped to the end of the month. */
+static npy_int64
+_value_plus_delta(npy_int64 value, ts_metadata *meta,
+                  conversion_function todays,
+                  npy_int64 months, npy_int64 days, npy_int64 seconds)
+{
+    ts_datetimestruct dtinfo;
+    npy_int64 absdate, ndays, nmonths;
+    int maxday;
+
+    if (meta->unit > FR_DAY)
+        seconds += _secs_from_midnight(value, meta->unit);
+    // Floor division: the seconds are between 0 and 86399
+    ndays = seconds / 86400;
+    seconds -= ndays * 86400;
+    if (seconds < 0) {
+        seconds += 86400;
+        ndays -= 1;
+    }
+    absdate = todays(value, meta);
+    set_datetimestruct_from_days(&dtinfo, absdate);
+    set_datetimestruct_from_secs(&dtinfo, seconds);
+
+    if (months) {
+        months += dtinfo.year * 12 + (dtinfo.month - 1);
+        nmonths = months % 12;
+        if (nmonths < 0)
+            nmonths += 12;
+        dtinfo.year = (months - nmonths) / 12;
+        dtinfo.month = (int)nmonths + 1;
+        maxday = _days_in_month(dtinfo.year, dtinfo.month);
+        if (dtinfo.day > maxday)
+            dtinfo.day = maxday;
+    }
+    if (days + ndays) {
+        absdate = days_from_ymd(dtinfo.year, dtinfo.month, dtinfo.day);
+        set_datetimestruct_from_days(&dtinfo, absdate + days + ndays);
+    }
+    return datetimestruct_to_tsdatetime(meta, &dtinfo);
+}
+
+
 static PyObject *
 date_plus_timedelta(PyObject *datearg, PyObject *deltaarg){
     DatetimeObject *date = (DatetimeObject*)datearg;
     TimeDeltaObject *delta = (TimeDeltaObject*)deltaarg;
     DatetimeObject *result;
+    ts_metadata meta = date->obmeta;
+    npy_int64 value;
 
-    ts_datetimestruct dtinfo;
-    npy_int64 seconds, days, months, years=0, absdate, abstime=0;
-    // Get the info from the delta
-    seconds = delta->seconds;
-    days = delta->days;
-    months = delta->months;
-
-    if (date->obmeta.unit > FR_DAY) {
-        abstime = _secs_from_midnight(date->obval, date->obmeta.unit);
-        // Update the days and secs from the seconds since midnight
-        seconds += abstime;
-    }
-    // Make sure the seconds are between -86400 and +86400
-    normalize_days_secs(&days, &seconds);
-    set_datetimestruct_from_secs(&dtinfo, seconds);
-
-    // Convert the current date to days and set the datetimestruct
-    conversion_function todays = get_converter_to_days(date->obmeta.unit, 0);
-    date->obmeta.convert_to_start = 1;
-    absdate = todays(date->obval, &(date->obmeta));
-    set_datetimestruct_from_days(&dtinfo, absdate + days);
-
-    // Update the datetime info with the months and normalize the months
-    years = dtinfo.year;
-    months += dtinfo.month;
-    normalize_years_months(&years, &months);
-
-    // Update the structure
-    dtinfo.year = years;
-    dtinfo.month = months;
+    conversion_function todays = get_converter_to_days(meta.unit, 0);
+    meta.convert_to_start = 1;
+    value = _value_plus_delta(date->obval, &meta, todays,
+                              delta->months, delta->days, delta->seconds);
+    if (PyErr_Occurred())
+        return NULL;
 
     // Convert to datetime
     result = DatetimeObject_New();
     result->obmeta = date->obmeta;
-    result->obval = datetimestruct_to_tsdatetime(&(date->obmeta), &dtinfo);
+    result->obval = value;
     return (PyObject*)result;
 
 };
@@ -1337,6 +1476,14 @@ DatetimeObject___subtract__(PyObject *left, PyObject *right)
             result = NULL;
         }
     }
+    else if (PyDelta_Check(right)) {
+        PyObject *minus_right;
+        minus_right = (PyObject*)timedelta_fromMDS(dleft->obmeta.unit, 0,
+                                -((PyDateTime_Delta*)right)->days,
+                                -((PyDateTime_Delta*)right)->seconds);
+        result = date_plus_timedelta(left, minus_right);
+        Py_DECREF(minus_right);
+    }
     else {
         DatetimeObject *dtresult = DatetimeObject_New();
         dtresult->obmeta = dleft->obmeta;
@@ -2290,75 +2437,131 @@ c_dates_now(PyObject *self, PyObject *args) {
 
 
 
+/* Helper function for DateArray_asfreq:
+    returns 1 if the conversion described by the input and output metadata
+    is of the form `value*k + c`, 0 otherwise */
+static int
+_is_affine_conversion(ts_metadata *input_meta, ts_metadata *output_meta)
+{
+    int fromunit = input_meta->unit, tounit = output_meta->unit;
+
+    if (tounit > FR_DAY) {
+        if (fromunit > FR_DAY)
+            return (input_meta->secs_per_period %
+                    output_meta->secs_per_period) == 0;
+        return (fromunit == FR_DAY) || (fromunit == FR_WK);
+    }
+    return (tounit == FR_DAY) && (fromunit == FR_WK);
+}
+
+/* Helper function for DateArray_asfreq:
+    sets the metadata and the converters to/from the mediator frequency */
+static void
+_init_asfreq(int fromfreq, int tofreq, char relation,
+             ts_metadata *input_meta, ts_metadata *output_meta,
+             conversion_function *converterfrom,
+             conversion_function *converterto)
+{
+    char relation_to;
+
+    if ((tofreq == FR_BUS) && (fromfreq < FR_DAY))
+        relation_to = 'S';
+    else
+        relation_to = relation;
+
+    init_metadata_from_unit(input_meta, fromfreq);
+    if (relation == 'S')
+        input_meta->convert_to_start = 1;
+    fromfreq = input_meta->unit;
+    *converterfrom = convert_to_mediator(fromfreq, tofreq, 0);
+
+    init_metadata_from_unit(output_meta, tofreq);
+    if (relation_to == 'S')
+        output_meta->convert_to_start = 1;
+    tofreq = output_meta->unit;
+    *converterto = convert_from_mediator(fromfreq, tofreq, 0);
+}
+
 PyObject *
 DateArray_asfreq(PyObject *self, PyObject *args)
 {
+    PyObject *fromDates_arg;
     PyArrayObject *fromDates, *toDates;
-    PyArrayIterObject *iterFrom, *iterTo;
-    PyObject *fromDateObj, *toDateObj;
     char *relation;
-    char relation_from, relation_to;
     conversion_function converterfrom, converterto;
-//    conversion_info infofrom, infoto;
     int fromfreq, tofreq;
-    npy_int64 fromDate, toDate, tmpDate;
+    npy_int64 *fromData, *toData, k, c;
+    npy_intp i, size;
 
     ts_metadata input_meta, output_meta;
 
     if (!PyArg_ParseTuple(args,
                 "Oiis:asfreq(fromDates, fromfreq, tofreq, relation)",
-                &fromDates, &fromfreq, &tofreq, &relation)) return NULL;
+                &fromDates_arg, &fromfreq, &tofreq, &relation)) return NULL;
 
-    relation_from = relation[0];
-    if ((tofreq == FR_BUS) && (fromfreq < FR_DAY))
-        relation_to = 'S';
-    else
-        relation_to = relation_from;
-
-    toDates = (PyArrayObject *)PyArray_Copy(fromDates);
-
-    iterFrom = (PyArrayIterObject *)PyArray_IterNew((PyObject *)fromDates);
-    if (iterFrom == NULL)
+    fromDates = (PyArrayObject *)PyArray_FROMANY(fromDates_arg, NPY_INT64,
+                                                 0, 0,
+                                                 NPY_CARRAY | NPY_FORCECAST);
+    if (fromDates == NULL)
         return NULL;
-
-    iterTo = (PyArrayIterObject *)PyArray_IterNew((PyObject *)toDates);
-    if (iterTo == NULL)
+    toDates = (PyArrayObject *)PyArray_SimpleNew(fromDates->nd,
+                                                 fromDates->dimensions,
+                                                 NPY_INT64);
+    if (toDates == NULL) {
+        Py_DECREF(fromDates);
         return NULL;
+    }
 
-    init_metadata_from_unit(&input_meta, fromfreq);
-    if (relation_from == 'S')
-        input_meta.convert_to_start = 1;
-    fromfreq = input_meta.unit;
-    converterfrom = convert_to_mediator(fromfreq, tofreq, 0);
-
-    init_metadata_from_unit(&output_meta, tofreq);
-    if (relation_to == 'S')
-        output_meta.convert_to_start = 1;
-    tofreq = output_meta.unit;
-    converterto = convert_from_mediator(fromfreq, tofreq, 0);
-
+    _init_asfreq(fromfreq, tofreq, relation[0], &input_meta, &output_meta,
+                 &converterfrom, &converterto);
+
+    fromData = (npy_int64 *)PyArray_DATA(fromDates);
+    toData = (npy_int64 *)PyArray_DATA(toDates);
+    size = PyArray_SIZE(fromDates);
+
+    if (_is_affine_conversion(&input_meta, &output_meta)) {
+        // Get the coefficients from the conversion of the first 2 periods
+        c = converterto(converterfrom(0, &input_meta), &output_meta);
+        k = converterto(converterfrom(1, &input_meta), &output_meta) - c;
+        Py_BEGIN_ALLOW_THREADS
+        for (i = 0; i < size; i++)
+            toData[i] = fromData[i]*k + c;
+        Py_END_ALLOW_THREADS
+    }
+    else {
+        // The calendar conversions may check the Python error state:
+        // keep the GIL
+        for (i = 0; i < size; i++)
+            toData[i] = converterto(converterfrom(fromData[i], &input_meta),
+                                    &output_meta);
+    }
 
-    while (iterFrom->index < iterFrom->size) {
+    Py_DECREF(fromDates);
+    return (PyObject *)toDates;
 
-        fromDateObj = PyArray_GETITEM(fromDates, iterFrom->dataptr);
-        fromDate = PyInt_AsLong(fromDateObj);
-        tmpDate = converterfrom(fromDate, &input_meta);
-        toDate = converterto(tmpDate, &output_meta);
-        // ERR_CHECK(toDate = asfreq_main(fromDate, relation[0], &af_info));
-        toDateObj = PyInt_FromLong(toDate);
+}
 
-        PyArray_SETITEM(toDates, iterTo->dataptr, toDateObj);
-        Py_DECREF(fromDateObj);
-        Py_DECREF(toDateObj);
+PyObject *
+DateArray_getaffinecoefs(PyObject *self, PyObject *args)
+{
+    char *relation;
+    conversion_function converterfrom, converterto;
+    int fromfreq, tofreq;
+    npy_int64 k, c;
 
-        PyArray_ITER_NEXT(iterFrom);
-        PyArray_ITER_NEXT(iterTo);
-    }
-    Py_DECREF(iterFrom);
-    Py_DECREF(iterTo);
+    ts_metadata input_meta, output_meta;
 
-    return (PyObject *)toDates;
+    if (!PyArg_ParseTuple(args,
+                "iis:getaffinecoefs(fromfreq, tofreq, relation)",
+                &fromfreq, &tofreq, &relation)) return NULL;
 
+    _init_asfreq(fromfreq, tofreq, relation[0], &input_meta, &output_meta,
+                 &converterfrom, &converterto);
+    if (!_is_affine_conversion(&input_meta, &output_meta))
+        Py_RETURN_NONE;
+    c = converterto(converterfrom(0, &input_meta), &output_meta);
+    k = converterto(converterfrom(1, &input_meta), &output_meta) - c;
+    return Py_BuildValue("(LL)", k, c);
 }
 
 /**************************************************************
@@ -2515,8 +2718,8 @@ DateArray_getdateinfo(PyObject *self, PyObject *args)
         output = (PyArrayObject *)PyArray_Copy(input);
     };
 
-    conversion_function todays = get_converter_to_days(freq, 1);
     init_metadata_from_unit(&meta, freq);
+    conversion_function todays = get_converter_to_days(meta.unit, 1);
     meta.convert_to_start = 0;
     ts_datetimestruct dinfo;
 
@@ -2628,43 +2831,702 @@ DateArray_getdateinfo(PyObject *self, PyObject *args)
 
 
 PyObject *
-DateArray_getdatetime(PyObject *self, PyObject *args)
+DateArray_getdatefields(PyObject *self, PyObject *args)
 {
-    int freq;
+    int freq, nfields, j, need_time=0;
+    char *fields;
+    npy_int64 value, absdate, abstime=0, *data;
+    npy_intp i, size, *dims;
+    long *result;
+    int end_month, qtr_end_month, month;
 
+    ts_metadata meta;
+    ts_datetimestruct dinfo;
+    conversion_function todays;
+    PyObject *input_arg;
     PyArrayObject *input, *output;
-    PyArrayIterObject *iterin, *iterout;
 
     if (!PyArg_ParseTuple(args,
-                          "Oi:getdatetime(array, freq)", &input, &freq))
+                          "Ois:getdatefields(array, freq, fields)",
+                          &input_arg, &freq, &fields))
         return NULL;
-    output = (PyArrayObject *)PyArray_SimpleNew(input->nd, input->dimensions, NPY_OBJECT);
 
-    conversion_function todays = get_converter_to_days(freq, 1);
-    ts_metadata meta = ((DatetimeObject *)self)->obmeta;
+    nfields = strlen(fields);
+    for (j = 0; j < nfields; j++) {
+        if (strchr("YFQMIDWRHTSO", fields[j]) == NULL) {
+            PyErr_Format(PyExc_ValueError, "unrecognized field: '%c'",
+                         fields[j]);
+            return NULL;
+        }
+        if (strchr("HTS", fields[j]) != NULL)
+            need_time = 1;
+    }
+
+    input = (PyArrayObject *)PyArray_FROMANY(input_arg, NPY_INT64, 0, 0,
+                                             NPY_CARRAY | NPY_FORCECAST);
+    if (input == NULL)
+        return NULL;
+
+    // The fields are stored along a new last axis
+    dims = PyDimMem_NEW(input->nd + 1);
+    for (j = 0; j < input->nd; j++)
+        dims[j] = input->dimensions[j];
+    dims[input->nd] = nfields;
+    output = (PyArrayObject *)PyArray_SimpleNew(input->nd + 1, dims, NPY_LONG);
+    PyDimMem_FREE(dims);
+    if (output == NULL) {
+        Py_DECREF(input);
+        return NULL;
+    }
+
+    init_metadata_from_unit(&meta, freq);
+    todays = get_converter_to_days(meta.unit, 1);
+    meta.convert_to_start = 0;
+
+    qtr_end_month = meta.period_end_at;
+    if (qtr_end_month == 0)
+        qtr_end_month = 12;
+    end_month = ending_month(&meta);
+
+    data = (npy_int64 *)PyArray_DATA(input);
+    result = (long *)PyArray_DATA(output);
+    size = PyArray_SIZE(input);
+
+    // Each date is decomposed once, whatever the number of fields
+    for (i = 0; i < size; i++) {
+        value = data[i];
+        absdate = todays(value, &meta);
+        if (need_time)
+            abstime = _secs_from_highfreq(value, &meta) % 86400;
+        set_datetimestruct_from_days_and_secs(&dinfo, absdate, abstime);
+
+        for (j = 0; j < nfields; j++, result++) {
+            switch(fields[j])
+            {
+                case 'Y': //year
+                    *result = dinfo.year;
+                    break;
+                case 'F': //"fiscal" year
+                    if ((get_base_unit(freq) == FR_QTR) &&
+                        (dinfo.month > qtr_end_month))
+                        *result = dinfo.year + 1;
+                    else
+                        *result = dinfo.year;
+                    break;
+                case 'Q': //quarter
+                    month = dinfo.month;
+                    if (get_base_unit(freq) == FR_QTR) {
+                        month -= end_month;
+                        if (month <= 0)
+                            month += 12;
+                    }
+                    *result = month_to_quarter(month);
+                    break;
+                case 'M': //month
+                    *result = dinfo.month;
+                    break;
+                case 'D': //day
+                    *result = dinfo.day;
+                    break;
+                case 'R': //day of year
+                    *result = dinfo.day_of_year;
+                    break;
+                case 'W': //day of week
+                    *result = day_of_week(absdate);
+                    break;
+                case 'I': //week of year
+                    *result = isoweek_from_datetimestruct(&dinfo);
+                    break;
+                case 'H': //hour
+                    *result = dinfo.hour;
+                    break;
+                case 'T': //minute
+                    *result = dinfo.min;
+                    break;
+                case 'S': //second
+                    *result = dinfo.sec;
+                    break;
+                case 'O': //toordinal
+                    *result = absdate;
+                    break;
+            }
+        }
+    }
+
+    Py_DECREF(input);
+    if (PyErr_Occurred()) {
+        Py_DECREF(output);
+        return NULL;
+    }
+    return (PyObject *)output;
+}
+
+
+// Reads exactly `width` digits, or between 1 and `width` digits if `exact`
+// is false. Returns -1 if no digit could be read.
+static int
+_parse_digits(const char **pos, const char *end, int width, int exact)
+{
+    int nread = 0, result = 0;
+    const char *p = *pos;
+
+    while ((nread < width) && (p < end) && isdigit((unsigned char)*p)) {
+        result = result * 10 + (*p - '0');
+        p++;
+        nread++;
+    }
+    if ((nread == 0) || (exact && (nread < width)))
+        return -1;
+    *pos = p;
+    return result;
+}
+
+
+// Parses the ISO-8601 formats 'YYYY-MM-DD', 'YYYYMMDD', optionally followed
+// by ' HH:MM[:SS]' or 'THH:MM[:SS]'. Returns 1 on success, 0 otherwise.
+static int
+_parse_isoformat(const char *p, const char *end, ts_datetimestruct *dinfo)
+{
+    int dashed;
+
+    if ((dinfo->year = _parse_digits(&p, end, 4, 1)) < 0)
+        return 0;
+    dashed = ((p < end) && (*p == '-'));
+    if (dashed)
+        p++;
+    if ((dinfo->month = _parse_digits(&p, end, 2, 1)) < 0)
+        return 0;
+    if (dashed) {
+        if ((p == end) || (*p != '-'))
+            return 0;
+        p++;
+    }
+    if ((dinfo->day = _parse_digits(&p, end, 2, 1)) < 0)
+        return 0;
+    if (p == end)
+        return 1;
+    // Optional time
+    if ((*p != ' ') && (*p != 'T'))
+        return 0;
+    p++;
+    if ((dinfo->hour = _parse_digits(&p, end, 2, 1)) < 0)
+        return 0;
+    if ((p == end) || (*p != ':'))
+        return 0;
+    p++;
+    if ((dinfo->min = _parse_digits(&p, end, 2, 1)) < 0)
+        return 0;
+    if (p == end)
+        return 1;
+    if (*p != ':')
+        return 0;
+    p++;
+    if ((dinfo->sec = _parse_digits(&p, end, 2, 1)) < 0)
+        return 0;
+    return (p == end);
+}
+
+
+// Parses a string according to a strptime-like format.
+// Only the %Y, %y, %m, %d, %H, %M, %S and %% directives are supported.
+// Returns 1 on success, 0 if the string does not match the format.
+static int
+_parse_withformat(const char *p, const char *end, const char *format,
+                  ts_datetimestruct *dinfo)
+{
+    int value;
+    const char *f = format;
+
+    while (*f) {
+        if (*f != '%') {
+            if ((p == end) || (*p != *f))
+                return 0;
+            p++;
+            f++;
+            continue;
+        }
+        f++;
+        switch (*f)
+        {
+            case 'Y':
+                value = _parse_digits(&p, end, 4, 1);
+                dinfo->year = value;
+                break;
+            case 'y':
+                value = _parse_digits(&p, end, 2, 1);
+                // Same pivot as time.strptime
+                dinfo->year = value + ((value < 69) ? 2000 : 1900);
+                break;
+            case 'm':
+                value = dinfo->month = _parse_digits(&p, end, 2, 0);
+                break;
+            case 'd':
+                value = dinfo->day = _parse_digits(&p, end, 2, 0);
+                break;
+            case 'H':
+                value = dinfo->hour = _parse_digits(&p, end, 2, 0);
+                break;
+            case 'M':
+                value = dinfo->min = _parse_digits(&p, end, 2, 0);
+                break;
+            case 'S':
+                value = dinfo->sec = _parse_digits(&p, end, 2, 0);
+                break;
+            case '%':
+                if ((p == end) || (*p != '%'))
+                    return 0;
+                p++;
+                value = 0;
+                break;
+            default:
+                return 0;
+        }
+        if (value < 0)
+            return 0;
+        f++;
+    }
+    return (p == end);
+}
+
+
+static int
+_check_formatdirectives(const char *format)
+{
+    const char *f;
+    for (f = format; *f; f++) {
+        if (*f != '%')
+            continue;
+        f++;
+        if ((*f == '\0') || (strchr("YymdHMS%", *f) == NULL)) {
+            PyErr_Format(PyExc_ValueError,
+                         "unsupported directive in format: '%%%c'", *f);
+            return 0;
+        }
+    }
+    return 1;
+}
+
+
+static int
+_is_valid_datetimestruct(ts_datetimestruct *dinfo)
+{
+    int ndays;
+
+    if ((dinfo->year < 1) || (dinfo->month < 1) || (dinfo->month > 12))
+        return 0;
+    ndays = _days_in_month(dinfo->year, dinfo->month);
+    return ((dinfo->day >= 1) && (dinfo->day <= ndays) &&
+            (dinfo->hour < 24) && (dinfo->min < 60) && (dinfo->sec < 60));
+}
+
+
+PyObject *
+DateArray_fromstrings(PyObject *self, PyObject *args)
+{
+    int freq;
+    char *format=NULL, *item;
+    const char *start, *end;
+    npy_int64 *result;
+    npy_bool *parsed;
+    npy_intp i, size, itemsize;
+
+    ts_metadata meta;
+    ts_datetimestruct dinfo;
+    PyObject *input_arg;
+    PyArrayObject *input, *output, *output_flags;
+
+    if (!PyArg_ParseTuple(args,
+                          "Oi|z:fromstrings(array, freq, format)",
+                          &input_arg, &freq, &format))
+        return NULL;
+    if ((format != NULL) && !_check_formatdirectives(format))
+        return NULL;
+
+    input = (PyArrayObject *)PyArray_FROMANY(input_arg, NPY_STRING, 0, 0,
+                                             NPY_CARRAY);
+    if (input == NULL)
+        return NULL;
+    output = (PyArrayObject *)PyArray_SimpleNew(input->nd, input->dimensions,
+                                                NPY_INT64);
+    output_flags = (PyArrayObject *)PyArray_SimpleNew(input->nd,
+                                                      input->dimensions,
+                                                      NPY_BOOL);
+    if ((output == NULL) || (output_flags == NULL)) {
+        Py_DECREF(input);
+        Py_XDECREF(output);
+        Py_XDECREF(output_flags);
+        return NULL;
+    }
+
+    init_metadata_from_unit(&meta, freq);
+
+    item = (char *)PyArray_DATA(input);
+    itemsize = PyArray_ITEMSIZE(input);
+    result = (npy_int64 *)PyArray_DATA(output);
+    parsed = (npy_bool *)PyArray_DATA(output_flags);
+    size = PyArray_SIZE(input);
+
+    for (i = 0; i < size; i++, item += itemsize) {
+        // Strings are padded with NULs up to the itemsize
+        start = item;
+        end = memchr(item, '\0', itemsize);
+        if (end == NULL)
+            end = item + itemsize;
+        while ((start < end) && isspace((unsigned char)*start))
+            start++;
+        while ((end > start) && isspace((unsigned char)*(end - 1)))
+            end--;
+        //
+        dinfo.year = 1;
+        dinfo.month = dinfo.day = 1;
+        dinfo.hour = dinfo.min = dinfo.sec = 0;
+        if (format == NULL)
+            parsed[i] = _parse_isoformat(start, end, &dinfo);
+        else
+            parsed[i] = _parse_withformat(start, end, format, &dinfo);
+        if (parsed[i] && _is_valid_datetimestruct(&dinfo))
+            result[i] = datetimestruct_to_tsdatetime(&meta, &dinfo);
+        else {
+            // Leave it to the generic parser
+            parsed[i] = 0;
+            result[i] = 0;
+        }
+        if (PyErr_Occurred()) {
+            Py_DECREF(input);
+            Py_DECREF(output);
+            Py_DECREF(output_flags);
+            return NULL;
+        }
+    }
+    Py_DECREF(input);
+    return Py_BuildValue("(NN)", output, output_flags);
+}
+
+
+/* Reads the months, days and seconds of a TimeDelta or datetime.timedelta */
+static int
+_get_delta_components(PyObject *delta,
+                      npy_int64 *months, npy_int64 *days, npy_int64 *seconds)
+{
+    if (TimeDelta_Check(delta)) {
+        *months = get_timedelta_months(delta);
+        *days = get_timedelta_days(delta);
+        *seconds = get_timedelta_seconds(delta);
+    }
+    else if (PyDelta_Check(delta)) {
+        *months = 0;
+        *days = ((PyDateTime_Delta *)delta)->days;
+        *seconds = ((PyDateTime_Delta *)delta)->seconds;
+    }
+    else {
+        PyErr_Format(PyExc_TypeError,
+                     "Expected a TimeDelta or a timedelta object, received: %s",
+                     delta->ob_type->tp_name);
+        return 0;
+    }
+    return 1;
+}
+
+
+PyObject *
+DateArray_addtimedelta(PyObject *self, PyObject *args)
+{
+    int freq, sign=1, unit;
+    npy_int64 months=0, days=0, seconds=0, shift, *data, *result;
+    npy_intp i, size;
+
+    ts_metadata meta;
+    conversion_function todays;
+    PyObject *input_arg, *deltas_arg, *item;
+    PyArrayObject *input, *deltas, *output;
+    PyArrayMultiIterObject *multi;
+
+    if (!PyArg_ParseTuple(args,
+                          "OiO|i:addtimedelta(array, freq, deltas, sign)",
+                          &input_arg, &freq, &deltas_arg, &sign))
+        return NULL;
+
+    input = (PyArrayObject *)PyArray_FROMANY(input_arg, NPY_INT64, 0, 0,
+                                             NPY_CARRAY | NPY_FORCECAST);
+    if (input == NULL)
+        return NULL;
+
+    init_metadata_from_unit(&meta, freq);
     meta.convert_to_start = 1;
+    unit = meta.unit;
+    todays = get_converter_to_days(unit, 1);
+
+    // A single delta .........................
+    if (TimeDelta_Check(deltas_arg) || PyDelta_Check(deltas_arg)) {
+        if (!_get_delta_components(deltas_arg, &months, &days, &seconds)) {
+            Py_DECREF(input);
+            return NULL;
+        }
+        months *= sign;
+        days *= sign;
+        seconds *= sign;
+        output = (PyArrayObject *)PyArray_SimpleNew(input->nd,
+                                                    input->dimensions,
+                                                    NPY_INT64);
+        if (output == NULL) {
+            Py_DECREF(input);
+            return NULL;
+        }
+        data = (npy_int64 *)PyArray_DATA(input);
+        result = (npy_int64 *)PyArray_DATA(output);
+        size = PyArray_SIZE(input);
+        if (size && (months == 0) &&
+            ((unit == FR_WK) || (unit == FR_DAY) || (unit == FR_UND) ||
+             (unit > FR_DAY))) {
+            // Periods of constant length: the shift is the same for all
+            shift = _value_plus_delta(data[0], &meta, todays,
+                                      0, days, seconds) - data[0];
+            Py_BEGIN_ALLOW_THREADS
+            for (i = 0; i < size; i++)
+                result[i] = data[i] + shift;
+            Py_END_ALLOW_THREADS
+        }
+        else {
+            for (i = 0; i < size; i++)
+                result[i] = _value_plus_delta(data[i], &meta, todays,
+                                              months, days, seconds);
+        }
+        Py_DECREF(input);
+        if (PyErr_Occurred()) {
+            Py_DECREF(output);
+            return NULL;
+        }
+        return (PyObject *)output;
+    }
+
+    // An array of deltas ....................
+    deltas = (PyArrayObject *)PyArray_FROMANY(deltas_arg, NPY_OBJECT, 0, 0,
+                                              NPY_CARRAY);
+    if (deltas == NULL) {
+        Py_DECREF(input);
+        return NULL;
+    }
+    multi = (PyArrayMultiIterObject *)PyArray_MultiIterNew(2, input, deltas);
+    Py_DECREF(input);
+    Py_DECREF(deltas);
+    if (multi == NULL)
+        return NULL;
+    output = (PyArrayObject *)PyArray_SimpleNew(multi->nd, multi->dimensions,
+                                                NPY_INT64);
+    if (output == NULL) {
+        Py_DECREF(multi);
+        return NULL;
+    }
+    result = (npy_int64 *)PyArray_DATA(output);
+    while (PyArray_MultiIter_NOTDONE(multi)) {
+        item = *(PyObject **)PyArray_MultiIter_DATA(multi, 1);
+        if (!_get_delta_components(item, &months, &days, &seconds))
+            break;
+        *result++ = _value_plus_delta(
+                        *(npy_int64 *)PyArray_MultiIter_DATA(multi, 0),
+                        &meta, todays,
+                        sign * months, sign * days, sign * seconds);
+        if (PyErr_Occurred())
+            break;
+        PyArray_MultiIter_NEXT(multi);
+    }
+    Py_DECREF(multi);
+    if (PyErr_Occurred()) {
+        Py_DECREF(output);
+        return NULL;
+    }
+    return (PyObject *)output;
+}
+
+
+PyObject *
+DateArray_getdatetime(PyObject *self, PyObject *args)
+{
+    int freq;
+    npy_int64 *data;
+    npy_intp i, size;
+
+    ts_metadata meta;
     ts_datetimestruct dinfo;
+    conversion_function todays;
+    PyObject *input_arg, *result, **outdata;
+    PyArrayObject *input, *output;
 
-    iterin = (PyArrayIterObject *)PyArray_IterNew((PyObject *)input);
-    iterout = (PyArrayIterObject *)PyArray_IterNew((PyObject *)output);
+    if (!PyArg_ParseTuple(args,
+                          "Oi:getdatetime(array, freq)", &input_arg, &freq))
+        return NULL;
 
-    {
-    PyObject *val, *result=NULL;
-    while (iterin->index < iterin->size) {
-        val = PyArray_GETITEM(input, iterin->dataptr);
-        result = _loop_get_datetime(PyInt_AsLong(val), freq,
-                                    todays, &meta, &dinfo);
-        PyArray_SETITEM(output, iterout->dataptr, result);
-        PyArray_ITER_NEXT(iterin);
-        PyArray_ITER_NEXT(iterout);
+    input = (PyArrayObject *)PyArray_FROMANY(input_arg, NPY_INT64, 0, 0,
+                                             NPY_CARRAY | NPY_FORCECAST);
+    if (input == NULL)
+        return NULL;
+    output = (PyArrayObject *)PyArray_SimpleNew(input->nd, input->dimensions,
+                                                NPY_OBJECT);
+    if (output == NULL) {
+        Py_DECREF(input);
+        return NULL;
+    }
+
+    // Same conventions as Date.datetime
+    init_metadata_from_unit(&meta, freq);
+    todays = get_converter_to_days(meta.unit, 1);
+    meta.convert_to_start = 0;
+
+    data = (npy_int64 *)PyArray_DATA(input);
+    outdata = (PyObject **)PyArray_DATA(output);
+    size = PyArray_SIZE(input);
+
+    for (i = 0; i < size; i++) {
+        result = _loop_get_datetime(data[i], freq, todays, &meta, &dinfo);
+        if (result == NULL) {
+            Py_DECREF(input);
+            Py_DECREF(output);
+            return NULL;
         }
+        // The output may have been initialized with None
+        Py_XDECREF(outdata[i]);
+        outdata[i] = result;
     }
-    Py_DECREF(iterin);
-    Py_DECREF(iterout);
+    Py_DECREF(input);
     return (PyObject *) output;
 }
 
 
+// Converts an array of datetime64 to dates, through the number of seconds
+// since 1970-01-01.
+static PyObject *
+_fromdatetime64(PyObject *input_arg, int freq)
+{
+    npy_int64 *data, *result, days, secs;
+    npy_intp i, size;
+
+    ts_metadata meta;
+    ts_datetimestruct dinfo;
+    PyObject *seconds, *view;
+    PyArrayObject *input, *output;
+
+    seconds = PyObject_CallMethod(input_arg, "astype", "s", "M8[s]");
+    if (seconds == NULL)
+        return NULL;
+    view = PyArray_View((PyArrayObject *)seconds,
+                        PyArray_DescrFromType(NPY_INT64), NULL);
+    Py_DECREF(seconds);
+    if (view == NULL)
+        return NULL;
+    input = (PyArrayObject *)PyArray_FROMANY(view, NPY_INT64, 0, 0,
+                                             NPY_CARRAY);
+    Py_DECREF(view);
+    if (input == NULL)
+        return NULL;
+    output = (PyArrayObject *)PyArray_SimpleNew(input->nd, input->dimensions,
+                                                NPY_INT64);
+    if (output == NULL) {
+        Py_DECREF(input);
+        return NULL;
+    }
+
+    init_metadata_from_unit(&meta, freq);
+
+    data = (npy_int64 *)PyArray_DATA(input);
+    result = (npy_int64 *)PyArray_DATA(output);
+    size = PyArray_SIZE(input);
+
+    for (i = 0; i < size; i++) {
+        secs = data[i];
+        if (secs == NPY_DATETIME_NAT) {
+            PyErr_SetString(PyExc_ValueError,
+                            "Unable to convert NaT to a Date");
+            break;
+        }
+        days = secs / 86400;
+        secs = secs % 86400;
+        if (secs < 0) {
+            secs += 86400;
+            days -= 1;
+        }
+        set_datetimestruct_from_days_and_secs(&dinfo, days + HIGHFREQ_ORIG,
+                                              secs);
+        result[i] = datetimestruct_to_tsdatetime(&meta, &dinfo);
+    }
+    Py_DECREF(input);
+    if (PyErr_Occurred()) {
+        Py_DECREF(output);
+        return NULL;
+    }
+    return (PyObject *)output;
+}
+
+
+PyObject *
+DateArray_fromdatetimes(PyObject *self, PyObject *args)
+{
+    int freq;
+    npy_int64 *result;
+    npy_intp i, size;
+
+    ts_metadata meta;
+    ts_datetimestruct dinfo;
+    PyObject *input_arg, *item, **data;
+    PyArrayObject *input, *output;
+
+    if (!PyArg_ParseTuple(args,
+                          "Oi:fromdatetimes(array, freq)", &input_arg, &freq))
+        return NULL;
+
+    // datetime64 arrays are processed without any intermediary object
+    if (PyArray_Check(input_arg) &&
+        (PyArray_TYPE((PyArrayObject *)input_arg) == NPY_DATETIME))
+        return _fromdatetime64(input_arg, freq);
+
+    input = (PyArrayObject *)PyArray_FROMANY(input_arg, NPY_OBJECT, 0, 0,
+                                             NPY_CARRAY);
+    if (input == NULL)
+        return NULL;
+    output = (PyArrayObject *)PyArray_SimpleNew(input->nd, input->dimensions,
+                                                NPY_INT64);
+    if (output == NULL) {
+        Py_DECREF(input);
+        return NULL;
+    }
+
+    init_metadata_from_unit(&meta, freq);
+
+    data = (PyObject **)PyArray_DATA(input);
+    result = (npy_int64 *)PyArray_DATA(output);
+    size = PyArray_SIZE(input);
+
+    for (i = 0; i < size; i++) {
+        item = data[i];
+        if (PyDateTime_Check(item)) {
+            dinfo.hour = PyDateTime_DATE_GET_HOUR(item);
+            dinfo.min = PyDateTime_DATE_GET_MINUTE(item);
+            dinfo.sec = PyDateTime_DATE_GET_SECOND(item);
+        }
+        else if (PyDate_Check(item)) {
+            dinfo.hour = dinfo.min = dinfo.sec = 0;
+        }
+        else {
+            PyErr_Format(PyExc_TypeError,
+                         "Expected a datetime.date(time) object, received: %s",
+                         item->ob_type->tp_name);
+            Py_DECREF(input);
+            Py_DECREF(output);
+            return NULL;
+        }
+        dinfo.year = PyDateTime_GET_YEAR(item);
+        dinfo.month = PyDateTime_GET_MONTH(item);
+        dinfo.day = PyDateTime_GET_DAY(item);
+        result[i] = datetimestruct_to_tsdatetime(&meta, &dinfo);
+    }
+    Py_DECREF(input);
+    if (PyErr_Occurred()) {
+        Py_DECREF(output);
+        return NULL;
+    }
+    return (PyObject *)output;
+}
+
+
 
 
 void import_c_dates(PyObject *m)
@@ -2689,3 +3551,128 @@ void import_c_dates(PyObject *m)
     PyModule_AddObject(m, "DateCalc_RangeError", DateCalc_RangeError);
 
 }
+
+
+static PyArrayObject *
+_new_string_array(int nd, npy_intp *dims, int width)
+{
+    PyArrayObject *output;
+    output = (PyArrayObject *)PyArray_New(&PyArray_Type, nd, dims, NPY_STRING,
+                                          NULL, NULL, width, 0, NULL);
+    if (output != NULL)
+        memset(PyArray_DATA(output), 0, PyArray_NBYTES(output));
+    return output;
+}
+
+
+/* Formats an array of dates as an array of strings.
+
+   The format is compiled once for the whole array. Consecutive dates sharing
+   the same output (same day if the format has no time directive, same value
+   otherwise) are not formatted again but copied from the previous row.
+   The width of the output is the length of the longest string.
+*/
+PyObject *
+DateArray_strftime(PyObject *self, PyObject *args)
+{
+    int freq, undefined;
+    char *fmt_str = NULL, *buffer = NULL, *row;
+    size_t length, width = 1;
+    npy_int64 *data, value, absdate = 0, key, prevkey = 0;
+    npy_intp i, j, size;
+
+    ts_metadata meta;
+    ts_strftime_format cfmt;
+    conversion_function todays;
+    PyObject *input_arg;
+    PyArrayObject *input, *output = NULL, *grown;
+
+    if (!PyArg_ParseTuple(args, "Oi|z:strftime(array, freq, format)",
+                          &input_arg, &freq, &fmt_str))
+        return NULL;
+
+    input = (PyArrayObject *)PyArray_FROMANY(input_arg, NPY_INT64, 0, 0,
+                                             NPY_CARRAY | NPY_FORCECAST);
+    if (input == NULL)
+        return NULL;
+
+    init_metadata_from_unit(&meta, freq);
+    meta.convert_to_start = 0;
+    todays = get_converter_to_days(meta.unit, 0);
+
+    // Undefined dates are represented by their value
+    undefined = ((meta.unit == FR_UND) && (fmt_str == NULL));
+    cfmt.ntokens = 0;
+    cfmt.kinds = NULL;
+    cfmt.chunks = NULL;
+    if (undefined) {
+        cfmt.daily = 0;
+        cfmt.maxlen = 32;
+    }
+    else {
+        if ((fmt_str == NULL) &&
+            ((fmt_str = _default_strftime_format(meta.unit)) == NULL)) {
+            PyErr_SetString(PyExc_ValueError, "Unrecognized frequency");
+            goto fail;
+        }
+        if (_compile_strftime_format(fmt_str, &meta, &cfmt) < 0)
+            goto fail;
+    }
+    if ((buffer = PyArray_malloc(cfmt.maxlen * sizeof(char))) == NULL) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+    if ((output = _new_string_array(input->nd, input->dimensions,
+                                    width)) == NULL)
+        goto fail;
+
+    data = (npy_int64 *)PyArray_DATA(input);
+    size = PyArray_SIZE(input);
+    for (i=0; i < size; i++) {
+        value = data[i];
+        if (undefined)
+            key = value;
+        else {
+            absdate = todays(value, &meta);
+            key = (cfmt.daily ? absdate : value);
+        }
+        // Same output as the previous date: just copy it
+        if (i && (key == prevkey)) {
+            row = PyArray_BYTES(output) + i * width;
+            memcpy(row, row - width, width);
+            continue;
+        }
+        prevkey = key;
+        if (undefined)
+            length = PyOS_snprintf(buffer, cfmt.maxlen, "%ld", (long)value);
+        else
+            length = _format_date(absdate,
+                                  _secs_from_midnight(value, meta.unit),
+                                  &cfmt, buffer);
+        // Widen the output if needed
+        if (length > width) {
+            grown = _new_string_array(input->nd, input->dimensions, length);
+            if (grown == NULL)
+                goto fail;
+            for (j=0; j < i; j++)
+                memcpy(PyArray_BYTES(grown) + j * length,
+                       PyArray_BYTES(output) + j * width, width);
+            Py_DECREF(output);
+            output = grown;
+            width = length;
+        }
+        memcpy(PyArray_BYTES(output) + i * width, buffer, length);
+    }
+
+    PyArray_free(buffer);
+    _free_strftime_format(&cfmt);
+    Py_DECREF(input);
+    return (PyObject *)output;
+
+ fail:
+    PyArray_free(buffer);
+    _free_strftime_format(&cfmt);
+    Py_DECREF(input);
+    Py_XDECREF(output);
+    return NULL;
+}
@@ -103,12 +103,109 @@ static long get_width(int fromFreq, int toFreq) {
     }
 }
 
+/* Reducers of TimeSeries_convert, applied on the values of each new period
+   instead of returning them as a 2D array */
+#define CONVERT_REDUCER_NONE  0
+#define CONVERT_REDUCER_SUM   1
+#define CONVERT_REDUCER_MEAN  2
+#define CONVERT_REDUCER_MIN   3
+#define CONVERT_REDUCER_MAX   4
+#define CONVERT_REDUCER_FIRST 5
+#define CONVERT_REDUCER_LAST  6
+#define CONVERT_REDUCER_COUNT 7
+#define CONVERT_REDUCER_STD   8
+#define CONVERT_REDUCER_OHLC  9
+
+/* Helper function for TimeSeries_convert:
+    returns the code of the reducer `name`, or INT_ERR_CODE if unknown */
+static int get_reducer(char *name) {
+
+    static char *names[] = {"sum", "mean", "min", "max", "first", "last",
+                            "count", "std", "ohlc", NULL};
+    int i;
+
+    for (i=0; names[i] != NULL; i++) {
+        if (strcmp(name, names[i]) == 0) { return i + 1; }
+    }
+    PyErr_Format(PyExc_ValueError, "unrecognized reducer: '%s'", name);
+    return INT_ERR_CODE;
+}
+
+/* Helper functions for TimeSeries_convert:
+    reduce the `size` values of `data` that are not masked in a single pass
+    and set the result and its mask (4 values for CONVERT_REDUCER_OHLC).
+    The result is masked if all the values are masked, except for
+    CONVERT_REDUCER_COUNT, and for CONVERT_REDUCER_STD if there are no more
+    than `ddof` values.
+    The values are reduced in TYPE, the type of `result`, except for
+    CONVERT_REDUCER_MEAN and CONVERT_REDUCER_STD which always give a double:
+    the integers are reduced as npy_longlong to keep their precision.
+*/
+#define REDUCE_PERIOD_LOOP(NAME, TYPE)                                        \
+static void                                                                   \
+reduce_period_##NAME(int reducer, TYPE *data, npy_bool *mask, npy_intp size,  \
+                     int ddof, char *result, npy_bool *result_mask) {         \
+                                                                              \
+    npy_intp i, count=0;                                                      \
+    TYPE val, first=0, last=0, low=0, high=0, sum=0;                          \
+    double delta, mean=0, m2=0;                                               \
+                                                                              \
+    for (i=0; i<size; i++) {                                                  \
+        if (mask[i]) { continue; }                                            \
+        val = data[i];                                                        \
+        if (count == 0) {                                                     \
+            first = low = high = val;                                         \
+        } else {                                                              \
+            if (val < low) { low = val; }                                     \
+            if (val > high) { high = val; }                                   \
+        }                                                                     \
+        last = val;                                                           \
+        count++;                                                              \
+        sum += val;                                                           \
+        delta = (double)val - mean;                                           \
+        mean += delta/count;                                                  \
+        m2 += delta*((double)val - mean);                                     \
+    }                                                                         \
+                                                                              \
+    if (reducer == CONVERT_REDUCER_COUNT) {                                   \
+        ((TYPE*)result)[0] = (TYPE)count;                                     \
+        result_mask[0] = 0;                                                   \
+        return;                                                               \
+    }                                                                         \
+    if (count == 0) { return; }                                               \
+                                                                              \
+    switch(reducer)                                                           \
+    {                                                                         \
+        case CONVERT_REDUCER_SUM: ((TYPE*)result)[0] = sum; break;            \
+        case CONVERT_REDUCER_MEAN: ((npy_double*)result)[0] = mean; break;    \
+        case CONVERT_REDUCER_MIN: ((TYPE*)result)[0] = low; break;            \
+        case CONVERT_REDUCER_MAX: ((TYPE*)result)[0] = high; break;           \
+        case CONVERT_REDUCER_FIRST: ((TYPE*)result)[0] = first; break;        \
+        case CONVERT_REDUCER_LAST: ((TYPE*)result)[0] = last; break;          \
+        case CONVERT_REDUCER_STD:                                             \
+            if (count <= ddof) { return; }                                    \
+            ((npy_double*)result)[0] = sqrt(m2/(count - ddof));               \
+            break;                                                            \
+        case CONVERT_REDUCER_OHLC:                                            \
+            ((TYPE*)result)[1] = high;                                        \
+            ((TYPE*)result)[2] = low;                                         \
+            ((TYPE*)result)[3] = last;                                        \
+            ((TYPE*)result)[0] = first;                                       \
+            result_mask[1] = result_mask[2] = result_mask[3] = 0;             \
+            break;                                                            \
+    }                                                                         \
+    result_mask[0] = 0;                                                       \
+}
+
+REDUCE_PERIOD_LOOP(double, npy_double)
+REDUCE_PERIOD_LOOP(longlong, npy_longlong)
+
 PyObject *
 TimeSeries_convert(PyObject *self, PyObject *args)
 {
-    PyObject *arrayTest;
-    PyArrayObject *array, *newArray;
-    PyArrayObject *mask, *newMask;
+    PyArrayObject *array, *newArray=NULL;
+    PyArrayObject *mask, *newMask=NULL;
+    PyArrayObject *data=NULL, *dataMask=NULL;
 
     PyObject *returnVal = NULL;
     PyObject *start_index_retval;
@@ -119,18 +216,23 @@ TimeSeries_convert(PyObject *self, PyObject *args)
     npy_int64 newEnd, newEndTemp;
     long newLen, newWidth;
     long currIndex, prevIndex;
+    npy_int64 carriedIndex;
+    int carried=0;
     long nd;
-    npy_intp *dim, *newIdx;
+    npy_intp *dim;
     long currPerLen=0;
     char *position;
     PyObject *fromFreq_arg, *toFreq_arg;
     int fromFreq, toFreq;
+    char *reducer_name=NULL;
+    int reducer=CONVERT_REDUCER_NONE;
+    int ddof=0, worktype=NPY_DOUBLE;
     char relation_from, relation_to;
-    int i;
+    npy_intp i, runEnd, size;
     conversion_function totmp, fromtmp;
+    conversion_function totmprev=NULL, fromtmprev=NULL;
     ts_metadata metato, metafrom;
-
-    PyObject *val, *valMask;
+    ts_metadata metatorev, metafromrev;
 
     // long (*asfreq_main)(long, char, asfreq_info*) = NULL;
     // long (*asfreq_endpoints)(long, char, asfreq_info*) = NULL;
@@ -139,16 +241,20 @@ TimeSeries_convert(PyObject *self, PyObject *args)
     returnVal = PyDict_New();
 
     if (!PyArg_ParseTuple(args,
-        "OOlOslO:convert(array, fromfreq, period, tofreq, position, startindex, mask)",
+        "OOlOslO|zi:convert(array, fromfreq, period, tofreq, position, startindex, mask, func, ddof)",
         &array, &fromFreq_arg, &period, &toFreq_arg,
-        &position, &startIndex, &mask)) return NULL;
+        &position, &startIndex, &mask, &reducer_name, &ddof)) return NULL;
+
+    if ((reducer_name != NULL) &&
+        ((reducer = get_reducer(reducer_name)) == INT_ERR_CODE))
+        return NULL;
 
     if((fromFreq = check_freq(fromFreq_arg)) == INT_ERR_CODE)
         return NULL;
     if((toFreq = check_freq(toFreq_arg)) == INT_ERR_CODE)
         return NULL;
 
-    if (toFreq == fromFreq) {
+    if ((toFreq == fromFreq) && (reducer == CONVERT_REDUCER_NONE)) {
         PyObject *sidx;
         newArray = (PyArrayObject *)PyArray_Copy(array);
         newMask = (PyArrayObject *)PyArray_Copy(mask);
@@ -236,9 +342,6 @@ TimeSeries_convert(PyObject *self, PyObject *args)
 
     if (newWidth > 1) {
         long tempval;
-        conversion_function totmprev, fromtmprev;
-        ts_metadata metatorev, metafromrev;
-
 
         // get_asfreq_info(toFreq, fromFreq, &af_info_rev);
         // asfreq_reverse = get_asfreq_func(toFreq, fromFreq, 0);
@@ -261,18 +364,36 @@ TimeSeries_convert(PyObject *self, PyObject *args)
         dim[1] = (npy_intp)newWidth;
     } else {
         nd = 1;
-        dim = PyDimMem_NEW(nd);
+        dim = PyDimMem_NEW(2);
         dim[0] = (npy_intp)newLen;
     }
 
-    newIdx = PyDimMem_NEW(nd);
-    arrayTest = PyArray_SimpleNew(nd, dim, array->descr->type_num);
-    if (arrayTest == NULL) { return NULL; }
-    newArray = (PyArrayObject*)arrayTest;
-    newMask  = (PyArrayObject*)PyArray_SimpleNew(nd, dim, mask->descr->type_num);
+    if (reducer == CONVERT_REDUCER_NONE) {
+        newArray = (PyArrayObject*)PyArray_SimpleNew(nd, dim,
+                                                     array->descr->type_num);
+        newMask  = (PyArrayObject*)PyArray_SimpleNew(nd, dim,
+                                                     mask->descr->type_num);
+    } else {
+        // one value per new period (4 for ohlc), whatever the width.
+        // The integers are reduced as long longs, except the uint64 that
+        // would not fit: they are reduced as doubles with the other types.
+        if ((PyArray_ISINTEGER(array) || PyArray_ISBOOL(array)) &&
+            !(PyArray_ISUNSIGNED(array) &&
+              (PyArray_ITEMSIZE(array) >= sizeof(npy_longlong))))
+            worktype = NPY_LONGLONG;
+        nd = (reducer == CONVERT_REDUCER_OHLC) ? 2 : 1;
+        dim[1] = 4;
+        newArray = (PyArrayObject*)PyArray_SimpleNew(nd, dim,
+                        ((reducer == CONVERT_REDUCER_MEAN) ||
+                         (reducer == CONVERT_REDUCER_STD)) ? NPY_DOUBLE
+                                                            : worktype);
+        newMask  = (PyArrayObject*)PyArray_SimpleNew(nd, dim, NPY_BOOL);
+    }
 
     PyDimMem_FREE(dim);
 
+    if ((newArray == NULL) || (newMask == NULL)) goto fail;
+
     PyArray_FILLWBYTE(newArray,0);
     PyArray_FILLWBYTE(newMask,1);
 
@@ -281,20 +402,122 @@ TimeSeries_convert(PyObject *self, PyObject *args)
     metafrom.convert_to_start = (relation_from == 'S');
     metato.convert_to_start = (relation_to == 'S');
 
+    if (reducer == CONVERT_REDUCER_NONE) {
+        // the values and the mask are copied as raw bytes from contiguous
+        // arrays
+        data = (PyArrayObject*)PyArray_FROMANY((PyObject*)array,
+                                               array->descr->type_num,
+                                               0, 0, NPY_CARRAY);
+        dataMask = (PyArrayObject*)PyArray_FROMANY((PyObject*)mask,
+                                                   mask->descr->type_num,
+                                                   0, 0, NPY_CARRAY);
+    } else {
+        data = (PyArrayObject*)PyArray_FROMANY((PyObject*)array, worktype,
+                                               0, 0,
+                                               NPY_CARRAY | NPY_FORCECAST);
+        dataMask = (PyArrayObject*)PyArray_FROMANY((PyObject*)mask, NPY_BOOL,
+                                                   0, 0,
+                                                   NPY_CARRAY | NPY_FORCECAST);
+    }
+    if ((data == NULL) || (dataMask == NULL)) goto fail;
 
     //set values in the new array
 
-    for (i = 0; i < array->dimensions[0]; i++) {
-
-        npy_intp idx = (npy_intp)i;
+    size = array->dimensions[0];
+    i = 0;
+    while (i < size) {
 
-        val = PyArray_GETITEM(array, PyArray_GetPtr(array, &idx));
-        valMask = PyArray_GETITEM(mask, PyArray_GetPtr(mask, &idx));
+        npy_intp first, count, col, k;
+        npy_int64 nextIndex;
+        int found=0;
+        int itemsize = PyArray_ITEMSIZE(newArray);
+        int maskItemsize = PyArray_ITEMSIZE(newMask);
+        char *newPtr, *newMaskPtr;
 
         // ERR_CHECK(currIndex = asfreq_main(startIndex + i*period, relation, &af_info));
-        ERR_CHECK(currIndex = fromtmp(totmp(startIndex + i*period, &metato), &metafrom));
+        // the first period of this run may have been converted already when
+        // looking for the end of the previous run
+        if (carried) {
+            currIndex = carriedIndex;
+            carried = 0;
+        } else {
+            currIndex = fromtmp(totmp(startIndex + i*period, &metato), &metafrom);
+            if (currIndex == INT_ERR_CODE) goto fail;
+        }
 
-        newIdx[0] = (npy_intp)(currIndex-newStart);
+        // Find the end of the run of source periods that are converted to
+        // currIndex: the first source period of the next target period gives
+        // a candidate, that is checked against the conversion of the last
+        // period of the run and of the first period after it. If the check
+        // fails, the source periods are converted one at a time.
+        runEnd = i + 1;
+        if (newWidth > 1) {
+            nextIndex = fromtmprev(totmprev(currIndex + 1, &metatorev),
+                                   &metafromrev);
+            if (nextIndex == INT_ERR_CODE) goto fail;
+            if (nextIndex > startIndex + i*period) {
+                npy_intp candidate;
+                npy_int64 last, after;
+
+                candidate = (npy_intp)((nextIndex - startIndex + period - 1)/period);
+                if (candidate > size) candidate = size;
+
+                last = fromtmp(totmp(startIndex + (candidate - 1)*period,
+                                     &metato), &metafrom);
+                if (last == INT_ERR_CODE) goto fail;
+                if (candidate < size) {
+                    after = fromtmp(totmp(startIndex + candidate*period,
+                                          &metato), &metafrom);
+                    if (after == INT_ERR_CODE) goto fail;
+                } else {
+                    after = currIndex + 1;
+                }
+                if ((last == currIndex) && (after != currIndex)) {
+                    runEnd = candidate;
+                    found = 1;
+                    if (candidate < size) {
+                        carriedIndex = after;
+                        carried = 1;
+                    }
+                }
+            }
+        }
+        while (!found && (runEnd < size)) {
+            nextIndex = fromtmp(totmp(startIndex + runEnd*period, &metato),
+                                &metafrom);
+            if (nextIndex == INT_ERR_CODE) goto fail;
+            if (nextIndex != currIndex) {
+                carriedIndex = nextIndex;
+                carried = 1;
+                break;
+            }
+            runEnd++;
+        }
+
+        if (reducer != CONVERT_REDUCER_NONE) {
+            if ((currIndex >= newStart) && (currIndex - newStart < newLen)) {
+                npy_intp offset = (npy_intp)(currIndex - newStart);
+                int nvals = (reducer == CONVERT_REDUCER_OHLC) ? 4 : 1;
+                char *result = PyArray_BYTES(newArray) +
+                               offset*nvals*PyArray_ITEMSIZE(newArray);
+                npy_bool *result_mask = (npy_bool*)PyArray_DATA(newMask) +
+                                        offset*nvals;
+
+                if (worktype == NPY_LONGLONG) {
+                    reduce_period_longlong(reducer,
+                                (npy_longlong*)PyArray_DATA(data) + i,
+                                (npy_bool*)PyArray_DATA(dataMask) + i,
+                                runEnd - i, ddof, result, result_mask);
+                } else {
+                    reduce_period_double(reducer,
+                                (npy_double*)PyArray_DATA(data) + i,
+                                (npy_bool*)PyArray_DATA(dataMask) + i,
+                                runEnd - i, ddof, result, result_mask);
+                }
+            }
+            i = runEnd;
+            continue;
+        }
 
         if (newWidth > 1) {
             if (currIndex != prevIndex) {
@@ -302,21 +525,59 @@ TimeSeries_convert(PyObject *self, PyObject *args)
                 currPerLen = 0;
                 prevIndex = currIndex;
             }
-            newIdx[1] = (npy_intp)currPerLen;
-            currPerLen++;
+            first = i;
+            count = runEnd - i;
+            col = currPerLen;
+            currPerLen += count;
+            // clip the run to the columns of the new array
+            if (col < 0) {
+                first -= col;
+                count += col;
+                col = 0;
+            }
+            if (col + count > newWidth) {
+                count = newWidth - col;
+            }
+        } else {
+            // each value overwrites the previous ones in the same period
+            first = runEnd - 1;
+            count = 1;
+            col = 0;
         }
 
-        if (newIdx[0] > -1) {
-            PyArray_SETITEM(newArray, PyArray_GetPtr(newArray, newIdx), val);
-            PyArray_SETITEM(newMask, PyArray_GetPtr(newMask, newIdx), valMask);
-        }
+        if ((currIndex >= newStart) && (currIndex - newStart < newLen) &&
+            (count > 0)) {
+
+            npy_intp offset = (npy_intp)(currIndex - newStart);
 
-        Py_DECREF(val);
-        Py_DECREF(valMask);
+            if (newWidth > 1) {
+                offset = offset*newWidth + col;
+            }
+            newPtr = PyArray_BYTES(newArray) + offset*itemsize;
+            newMaskPtr = PyArray_BYTES(newMask) + offset*maskItemsize;
+
+            if (PyDataType_REFCHK(newArray->descr)) {
+                // object arrays: the references must be handled
+                for (k=0; k<count; k++) {
+                    PyObject *val = PyArray_GETITEM(data,
+                                PyArray_BYTES(data) + (first + k)*itemsize);
+                    if (val == NULL) goto fail;
+                    PyArray_SETITEM(newArray, newPtr + k*itemsize, val);
+                    Py_DECREF(val);
+                }
+            } else {
+                memcpy(newPtr, PyArray_BYTES(data) + first*itemsize,
+                       count*itemsize);
+            }
+            memcpy(newMaskPtr, PyArray_BYTES(dataMask) + first*maskItemsize,
+                   count*maskItemsize);
+        }
 
+        i = runEnd;
     }
 
-    PyDimMem_FREE(newIdx);
+    Py_DECREF(data);
+    Py_DECREF(dataMask);
 
     start_index_retval = (PyObject*)PyInt_FromLong(newStart);
 
@@ -329,9 +590,204 @@ TimeSeries_convert(PyObject *self, PyObject *args)
     Py_DECREF(start_index_retval);
 
     return returnVal;
+
+ fail:
+    Py_XDECREF(data);
+    Py_XDECREF(dataMask);
+    Py_XDECREF(newArray);
+    Py_XDECREF(newMask);
+    Py_DECREF(returnVal);
+    return NULL;
+}
+
+/* As-of matching of two sorted arrays of dates.
+
+   For each date of `left`, returns the index of the matching date of `right`
+   (or -1 if there is none): the last date on or before it ('backward'), the
+   first date on or after it ('forward') or the closest one ('nearest', ties
+   going backward). Both arrays must be sorted; they are scanned once, with
+   one pointer per direction.
+*/
+PyObject *
+TimeSeries_asof(PyObject *self, PyObject *args)
+{
+    PyObject *left_arg, *right_arg, *tolerance_arg = Py_None;
+    PyArrayObject *left = NULL, *right = NULL, *output = NULL;
+    char *direction;
+    npy_int64 *ldata, *rdata, value, tolerance = 0;
+    npy_intp *result, nleft, nright, i, back, fwd, match;
+    int has_tolerance = 0, kind;
+
+    if (!PyArg_ParseTuple(args,
+                          "OOs|O:asof(left, right, direction, tolerance)",
+                          &left_arg, &right_arg, &direction, &tolerance_arg))
+        return NULL;
+
+    switch (direction[0]) {
+        case 'b': case 'B': kind = 0; break;
+        case 'f': case 'F': kind = 1; break;
+        case 'n': case 'N': kind = 2; break;
+        default:
+            PyErr_Format(PyExc_ValueError,
+                         "Invalid direction: '%s'", direction);
+            return NULL;
+    }
+    if (tolerance_arg != Py_None) {
+        tolerance = PyLong_AsLongLong(tolerance_arg);
+        if ((tolerance == -1) && PyErr_Occurred())
+            return NULL;
+        if (tolerance < 0) {
+            PyErr_SetString(PyExc_ValueError,
+                            "The tolerance must be positive!");
+            return NULL;
+        }
+        has_tolerance = 1;
+    }
+
+    left = (PyArrayObject *)PyArray_FROMANY(left_arg, NPY_INT64, 1, 1,
+                                            NPY_CARRAY | NPY_FORCECAST);
+    if (left == NULL)
+        goto fail;
+    right = (PyArrayObject *)PyArray_FROMANY(right_arg, NPY_INT64, 1, 1,
+                                             NPY_CARRAY | NPY_FORCECAST);
+    if (right == NULL)
+        goto fail;
+    nleft = PyArray_SIZE(left);
+    nright = PyArray_SIZE(right);
+    output = (PyArrayObject *)PyArray_SimpleNew(1, &nleft, NPY_INTP);
+    if (output == NULL)
+        goto fail;
+
+    ldata = (npy_int64 *)PyArray_DATA(left);
+    rdata = (npy_int64 *)PyArray_DATA(right);
+    result = (npy_intp *)PyArray_DATA(output);
+
+    NPY_BEGIN_ALLOW_THREADS;
+    // back: number of right dates on or before the current left date
+    // fwd: number of right dates strictly before the current left date
+    back = fwd = 0;
+    for (i=0; i < nleft; i++) {
+        value = ldata[i];
+        while ((back < nright) && (rdata[back] <= value))
+            back++;
+        while ((fwd < nright) && (rdata[fwd] < value))
+            fwd++;
+        match = -1;
+        if (kind == 0) {
+            if (back > 0)
+                match = back - 1;
+        }
+        else if (kind == 1) {
+            if (fwd < nright)
+                match = fwd;
+        }
+        else {
+            if (back > 0)
+                match = back - 1;
+            if ((fwd < nright) &&
+                ((match < 0) || (rdata[fwd] - value < value - rdata[match])))
+                match = fwd;
+        }
+        if (has_tolerance && (match >= 0)) {
+            if (((rdata[match] > value) ? rdata[match] - value :
+                                          value - rdata[match]) > tolerance)
+                match = -1;
+        }
+        result[i] = match;
+    }
+    NPY_END_ALLOW_THREADS;
+
+    Py_DECREF(left);
+    Py_DECREF(right);
+    return (PyObject *)output;
+
+ fail:
+    Py_XDECREF(left);
+    Py_XDECREF(right);
+    Py_XDECREF(output);
+    return NULL;
+}
+
+
+/* Stable counting sort of integer codes in [0, ncodes): returns the
+   permutation sorting the codes and the number of occurrences of each code */
+PyObject *
+TimeSeries_groupsort(PyObject *self, PyObject *args)
+{
+    PyObject *codes_arg, *result;
+    PyArrayObject *codes = NULL, *order = NULL, *counts = NULL;
+    npy_int64 *cdata;
+    npy_intp *odata, *ndata, *offsets = NULL, ncodes, size, i, total, tmp;
+
+    if (!PyArg_ParseTuple(args, "On:groupsort(codes, ncodes)",
+                          &codes_arg, &ncodes))
+        return NULL;
+    if (ncodes < 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "The number of codes must be positive!");
+        return NULL;
+    }
+
+    codes = (PyArrayObject *)PyArray_FROMANY(codes_arg, NPY_INT64, 1, 1,
+                                             NPY_CARRAY | NPY_FORCECAST);
+    if (codes == NULL)
+        goto fail;
+    size = PyArray_SIZE(codes);
+    order = (PyArrayObject *)PyArray_SimpleNew(1, &size, NPY_INTP);
+    if (order == NULL)
+        goto fail;
+    counts = (PyArrayObject *)PyArray_ZEROS(1, &ncodes, NPY_INTP, 0);
+    if (counts == NULL)
+        goto fail;
+    offsets = PyMem_New(npy_intp, ncodes + 1);
+    if (offsets == NULL) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+
+    cdata = (npy_int64 *)PyArray_DATA(codes);
+    odata = (npy_intp *)PyArray_DATA(order);
+    ndata = (npy_intp *)PyArray_DATA(counts);
+
+    for (i=0; i < size; i++) {
+        if ((cdata[i] < 0) || (cdata[i] >= ncodes)) {
+            PyErr_Format(PyExc_ValueError,
+                         "Invalid code at index %ld!", (long)i);
+            goto fail;
+        }
+    }
+
+    NPY_BEGIN_ALLOW_THREADS;
+    for (i=0; i < size; i++)
+        ndata[cdata[i]]++;
+    total = 0;
+    for (i=0; i < ncodes; i++) {
+        tmp = ndata[i];
+        offsets[i] = total;
+        total += tmp;
+    }
+    for (i=0; i < size; i++)
+        odata[offsets[cdata[i]]++] = i;
+    NPY_END_ALLOW_THREADS;
+
+    PyMem_Free(offsets);
+    Py_DECREF(codes);
+    result = Py_BuildValue("(OO)", order, counts);
+    Py_DECREF(order);
+    Py_DECREF(counts);
+    return result;
+
+ fail:
+    if (offsets != NULL)
+        PyMem_Free(offsets);
+    Py_XDECREF(codes);
+    Py_XDECREF(order);
+    Py_XDECREF(counts);
+    return NULL;
 }
 
 
+
 /* This function is directly copied from the numpy source  */
 /* Return typenumber from dtype2 unless it is NULL, then return
    NPY_DOUBLE if dtype1->type_num is integer or bool
@@ -364,92 +820,166 @@ _get_type_num(PyArray_Descr *dtype1, PyArray_Descr *dtype2)
 }
 
 
+/* The moving functions work on 1D arrays or on each column of 2D arrays
+   (time x variables). The typed loops walk the columns as contiguous 1D
+   buffers: _columns_contiguous returns a C contiguous copy of `arr` cast to
+   `rtype`, where each column of a 2D array is stored as a row (ie, the
+   transpose of `arr`). 1D arrays are only made contiguous. */
+static PyArrayObject*
+_columns_contiguous(PyObject *arr, int rtype)
+{
+    PyObject *tmp;
+    PyArrayObject *result;
+
+    if (PyArray_NDIM(arr) == 2) {
+        tmp = PyArray_Transpose((PyArrayObject*)arr, NULL);
+        NULL_CHECK(tmp);
+    } else {
+        Py_INCREF(arr);
+        tmp = arr;
+    }
+    result = (PyArrayObject*)PyArray_FromAny(tmp, PyArray_DescrFromType(rtype),
+                                             0, 0, NPY_CARRAY | NPY_FORCECAST,
+                                             NULL);
+    Py_DECREF(tmp);
+    return result;
+}
+
+/* Inverse of _columns_contiguous: returns `arr` with the layout of the
+   original array (as a view for 2D arrays). Steals the reference to `arr` */
+static PyObject*
+_columns_restore(PyArrayObject *arr)
+{
+    PyObject *result;
+
+    if ((arr == NULL) || (PyArray_NDIM(arr) != 2)) {
+        return (PyObject*)arr;
+    }
+    result = PyArray_Transpose(arr, NULL);
+    Py_DECREF(arr);
+    return result;
+}
+
+/* number of rows (ie, length of the time axis) and columns of a 1D or 2D
+   array */
+#define MOV_NROWS(arr) (PyArray_DIM(arr, 0))
+#define MOV_NCOLS(arr) ((PyArray_NDIM(arr) == 2) ? PyArray_DIM(arr, 1) : 1)
+
 /* validates the standard arguments to moving functions and set the original
-   mask, original ndarray, and mask for the result */
-static PyObject *
+   mask, original ndarray, and mask for the result. The original mask is
+   stored in the layout of _columns_contiguous, the mask for the result has
+   the shape of the original array. Returns INT_ERR_CODE on error */
+static int
 check_mov_args(
     PyObject *orig_arrayobj, int span, int min_win_size,
     PyObject **orig_ndarray, PyObject **orig_mask, PyObject **result_mask
 ) {
 
-    PyArrayObject **orig_ndarray_tmp, **result_mask_tmp;
+    PyArrayObject *result_mask_tmp;
+    npy_intp nrows, ncols, dims[2];
     int *raw_result_mask;
 
     if (!PyArray_Check(orig_arrayobj)) {
         PyErr_SetString(PyExc_ValueError, "array must be a valid subtype of ndarray");
-        return NULL;
+        return INT_ERR_CODE;
+    }
+
+    if ((PyArray_NDIM(orig_arrayobj) != 1) &&
+        (PyArray_NDIM(orig_arrayobj) != 2)) {
+        PyErr_SetString(PyExc_ValueError, "array must be 1 or 2 dimensional");
+        return INT_ERR_CODE;
+    }
+
+    if (span < min_win_size) {
+        PyErr_Format(PyExc_ValueError,
+                     "span must be greater than or equal to %i",
+                     min_win_size);
+        return INT_ERR_CODE;
     }
 
     // check if array has a mask, and if that mask is an array
+    // the mask is stored as a contiguous array of npy_bool, so that the
+    // typed loops can read it directly
     if (PyObject_HasAttrString(orig_arrayobj, "_mask")) {
         PyObject *tempMask = PyObject_GetAttrString(orig_arrayobj, "_mask");
-        if (PyArray_Check(tempMask)) {
-            *orig_mask = PyArray_EnsureArray(tempMask);
-        } else {
-            Py_DECREF(tempMask);
+        if (PyArray_Check(tempMask) &&
+            (PyArray_NDIM(tempMask) == PyArray_NDIM(orig_arrayobj))) {
+            *orig_mask = (PyObject*)_columns_contiguous(tempMask, NPY_BOOL);
         }
+        Py_DECREF(tempMask);
+        if (PyErr_Occurred()) goto fail;
     }
 
+    // PyArray_EnsureArray steals a reference and orig_arrayobj is borrowed
+    Py_INCREF(orig_arrayobj);
     *orig_ndarray = PyArray_EnsureArray(orig_arrayobj);
-    orig_ndarray_tmp = (PyArrayObject**)orig_ndarray;
+    if (*orig_ndarray == NULL) goto fail;
 
-    if ((*orig_ndarray_tmp)->nd != 1) {
-        PyErr_SetString(PyExc_ValueError, "array must be 1 dimensional");
-        return NULL;
-    }
+    nrows = MOV_NROWS(*orig_ndarray);
+    ncols = MOV_NCOLS(*orig_ndarray);
 
-    if (span < min_win_size) {
-        char *error_str;
-        error_str = PyArray_malloc(60 * sizeof(char));
-        MEM_CHECK(error_str);
-        sprintf(error_str,
-                "span must be greater than or equal to %i",
-                min_win_size);
-        PyErr_SetString(PyExc_ValueError, error_str);
-        free(error_str);
-        return NULL;
+    raw_result_mask = PyArray_malloc((nrows * ncols + 1) * sizeof(int));
+    if (raw_result_mask == NULL) {
+        PyErr_NoMemory();
+        goto fail;
     }
 
-    raw_result_mask = PyArray_malloc((*orig_ndarray_tmp)->dimensions[0] * sizeof(int));
-    MEM_CHECK(raw_result_mask);
-
     {
-        PyArrayObject *orig_mask_tmp;
-        int i, valid_points=0, is_masked;
+        npy_bool *raw_orig_mask=NULL;
+        npy_intp i, j, valid_points;
+        int is_masked;
 
-        orig_mask_tmp = (PyArrayObject*)(*orig_mask);
+        if (*orig_mask != NULL)
+            raw_orig_mask = (npy_bool*)PyArray_DATA(*orig_mask);
 
-        for (i=0; i<((*orig_ndarray_tmp)->dimensions[0]); i++) {
+        for (j=0; j<ncols; j++) {
 
-            npy_intp idx = (npy_intp)i;
-            is_masked=0;
+            valid_points = 0;
 
-            if (*orig_mask != NULL) {
-                PyObject *valMask;
-                valMask = PyArray_GETITEM(orig_mask_tmp,
-                                          PyArray_GetPtr(orig_mask_tmp, &idx));
-                is_masked = (int)PyInt_AsLong(valMask);
-                Py_DECREF(valMask);
-            }
+            for (i=j*nrows; i<(j+1)*nrows; i++) {
 
-            if (is_masked) {
-                valid_points=0;
-            } else {
-                if (valid_points < span) { valid_points += 1; }
-                if (valid_points < span) { is_masked = 1; }
-            }
+                is_masked=0;
+
+                if (raw_orig_mask != NULL) {
+                    is_masked = (int)(raw_orig_mask[i] != 0);
+                }
+
+                if (is_masked) {
+                    valid_points=0;
+                } else {
+                    if (valid_points < span) { valid_points += 1; }
+                    if (valid_points < span) { is_masked = 1; }
+                }
 
-            raw_result_mask[i] = is_masked;
+                raw_result_mask[i] = is_masked;
+            }
         }
     }
 
-    *result_mask = PyArray_SimpleNewFromData(
-                             1, (*orig_ndarray_tmp)->dimensions,
+    if (PyArray_NDIM(*orig_ndarray) == 2) {
+        dims[0] = ncols;
+        dims[1] = nrows;
+    } else {
+        dims[0] = nrows;
+    }
+    result_mask_tmp = (PyArrayObject*)PyArray_SimpleNewFromData(
+                             PyArray_NDIM(*orig_ndarray), dims,
                              PyArray_INT32, raw_result_mask);
-    MEM_CHECK(*result_mask);
-    result_mask_tmp = (PyArrayObject**)result_mask;
-    (*result_mask_tmp)->flags = ((*result_mask_tmp)->flags) | NPY_OWNDATA;
+    if (result_mask_tmp == NULL) {
+        PyArray_free(raw_result_mask);
+        goto fail;
+    }
+    result_mask_tmp->flags = (result_mask_tmp->flags) | NPY_OWNDATA;
+    *result_mask = _columns_restore(result_mask_tmp);
+    if (*result_mask == NULL) goto fail;
     return 0;
+
+ fail:
+    // release the arrays acquired so far, the callers just return NULL
+    Py_XDECREF(*orig_ndarray);
+    Py_XDECREF(*orig_mask);
+    *orig_ndarray = *orig_mask = NULL;
+    return INT_ERR_CODE;
 }
 
 // check if value at specified index is masked
@@ -470,11 +1000,134 @@ _is_masked(PyArrayObject *mask, npy_intp idx) {
 
 }
 
-/* computation portion of moving sum. Appropriate mask is overlayed on top
-   afterwards */
+/* computation functions working on 1D arrays, one value at a time as Python
+   objects: (data, mask, span, rtype, kind). `kind` is the rank type for the
+   moving median/min/max and is ignored otherwise */
+typedef PyObject* (*mov_object_func)(PyArrayObject*, PyArrayObject*,
+                                     int, int, char);
+
+/* Applies `func` on each column of a 2D array (or on the array itself if it
+   is 1D), for the dtypes without a typed loop. `orig_mask` is in the layout
+   of _columns_contiguous */
 static PyObject*
-calc_mov_sum(
-    PyArrayObject *orig_ndarray, PyArrayObject *orig_mask, int span, int rtype)
+_mov_object_columns(mov_object_func func, PyArrayObject *orig_ndarray,
+                    PyArrayObject *orig_mask, int span, int rtype, char kind)
+{
+    PyArrayObject *data=NULL, *result_ndarray=NULL;
+    npy_intp j;
+
+    if (orig_ndarray->nd == 1) {
+        return func(orig_ndarray, orig_mask, span, rtype, kind);
+    }
+
+    data = _columns_contiguous((PyObject*)orig_ndarray,
+                               PyArray_TYPE(orig_ndarray));
+    NULL_CHECK(data);
+
+    result_ndarray = (PyArrayObject*)PyArray_ZEROS(data->nd, data->dimensions,
+                                                   rtype, 0);
+    if (result_ndarray == NULL) goto fail;
+
+    for (j=0; j<PyArray_DIM(data, 0); j++) {
+        PyObject *col, *mask_col=NULL, *result_col;
+
+        col = PySequence_GetItem((PyObject*)data, j);
+        if (col == NULL) goto fail;
+        if (orig_mask != NULL) {
+            mask_col = PySequence_GetItem((PyObject*)orig_mask, j);
+            if (mask_col == NULL) {
+                Py_DECREF(col);
+                goto fail;
+            }
+        }
+
+        result_col = func((PyArrayObject*)col, (PyArrayObject*)mask_col,
+                          span, rtype, kind);
+        Py_DECREF(col);
+        Py_XDECREF(mask_col);
+        if (result_col == NULL) goto fail;
+
+        if (PySequence_SetItem((PyObject*)result_ndarray, j, result_col)) {
+            Py_DECREF(result_col);
+            goto fail;
+        }
+        Py_DECREF(result_col);
+    }
+
+    Py_DECREF(data);
+    return _columns_restore(result_ndarray);
+
+ fail:
+    Py_XDECREF(data);
+    Py_XDECREF(result_ndarray);
+    return NULL;
+}
+
+/* whether the moving functions have a typed loop for `rtype` */
+static int
+_has_typed_loop(int rtype)
+{
+    switch(rtype) {
+        case NPY_FLOAT:
+        case NPY_DOUBLE:
+        case NPY_INT:
+        case NPY_LONG:
+        case NPY_LONGLONG:
+            return 1;
+        default:
+            return 0;
+    }
+}
+
+/* Typed version of the moving sum loop. `data` and `result` are contiguous
+   buffers of the result type, `mask` is a contiguous buffer of npy_bool (or
+   NULL if there is no mask). Same algorithm as calc_mov_sum_object. */
+#define MOV_SUM_LOOP(NAME, TYPE)                                              \
+static void                                                                   \
+_mov_sum_##NAME(TYPE *data, npy_bool *mask, TYPE *result,                     \
+                npy_intp size, int span)                                      \
+{                                                                             \
+    npy_intp i;                                                               \
+    npy_intp non_masked=0;                                                    \
+    TYPE mov_sum_val;                                                         \
+                                                                              \
+    for (i=0; i<size; i++) {                                                  \
+        int curr_val_masked = ((mask != NULL) && mask[i]);                    \
+                                                                              \
+        if (curr_val_masked == 0) {                                           \
+            non_masked += 1;                                                  \
+        } else {                                                              \
+            non_masked = 0;                                                   \
+        }                                                                     \
+                                                                              \
+        if ((i == 0) || curr_val_masked || ((mask != NULL) && mask[i-1])) {   \
+            /* if current or previous value is masked, reset moving sum */    \
+            mov_sum_val = data[i];                                            \
+        } else {                                                              \
+            mov_sum_val = result[i-1] + data[i];                              \
+            if ((non_masked > span) &&                                        \
+                ((mask == NULL) || (mask[i-span] == 0))) {                    \
+                mov_sum_val -= data[i-span];                                  \
+            }                                                                 \
+        }                                                                     \
+        result[i] = mov_sum_val;                                              \
+    }                                                                         \
+}
+
+MOV_SUM_LOOP(float, npy_float)
+MOV_SUM_LOOP(double, npy_double)
+MOV_SUM_LOOP(int, npy_int)
+MOV_SUM_LOOP(long, npy_long)
+MOV_SUM_LOOP(longlong, npy_longlong)
+
+
+/* computation portion of moving sum for dtypes without a typed loop
+   (object, complex, long double...). Values are processed one by one as
+   Python objects. Appropriate mask is overlayed on top afterwards */
+static PyObject*
+calc_mov_sum_object(
+    PyArrayObject *orig_ndarray, PyArrayObject *orig_mask, int span, int rtype,
+    char kind)
 {
     PyArrayObject *result_ndarray=NULL;
     int i=0, non_masked=0;
@@ -554,6 +1207,75 @@ calc_mov_sum(
 
 }
 
+/* computation portion of moving sum. The loop is selected from the result
+   type: float32/float64/int32/int64 use a typed loop over raw buffers, with
+   the GIL released, other types fall back to calc_mov_sum_object.
+   Appropriate mask is overlayed on top afterwards */
+static PyObject*
+calc_mov_sum(
+    PyArrayObject *orig_ndarray, PyArrayObject *orig_mask, int span, int rtype)
+{
+    PyArrayObject *data=NULL, *result_ndarray=NULL;
+    npy_bool *mask=NULL;
+    void *raw_data, *raw_result;
+    npy_intp j, nrows, ncols;
+
+    if (!_has_typed_loop(rtype)) {
+        return _mov_object_columns(calc_mov_sum_object, orig_ndarray,
+                                   orig_mask, span, rtype, 0);
+    }
+
+    // make sure we have contiguous columns of the result type
+    data = _columns_contiguous((PyObject*)orig_ndarray, rtype);
+    NULL_CHECK(data);
+
+    result_ndarray = (PyArrayObject*)PyArray_ZEROS(data->nd, data->dimensions,
+                                                   rtype, 0);
+    if (result_ndarray == NULL) {
+        Py_DECREF(data);
+        return NULL;
+    }
+
+    if (orig_mask != NULL)
+        mask = (npy_bool*)PyArray_DATA(orig_mask);
+    raw_data = PyArray_DATA(data);
+    raw_result = PyArray_DATA(result_ndarray);
+    nrows = MOV_NROWS(orig_ndarray);
+    ncols = MOV_NCOLS(orig_ndarray);
+
+#define MOV_SUM_CALL(NAME, TYPE)                                              \
+    for (j=0; j<ncols; j++) {                                                 \
+        _mov_sum_##NAME((TYPE*)raw_data + j*nrows,                            \
+                        (mask == NULL) ? NULL : mask + j*nrows,               \
+                        (TYPE*)raw_result + j*nrows, nrows, span);            \
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    switch(rtype) {
+        case NPY_FLOAT:
+            MOV_SUM_CALL(float, npy_float);
+            break;
+        case NPY_DOUBLE:
+            MOV_SUM_CALL(double, npy_double);
+            break;
+        case NPY_INT:
+            MOV_SUM_CALL(int, npy_int);
+            break;
+        case NPY_LONG:
+            MOV_SUM_CALL(long, npy_long);
+            break;
+        case NPY_LONGLONG:
+            MOV_SUM_CALL(longlong, npy_longlong);
+            break;
+    }
+    Py_END_ALLOW_THREADS
+
+#undef MOV_SUM_CALL
+
+    Py_DECREF(data);
+    return _columns_restore(result_ndarray);
+}
+
 PyObject *
 MaskedArray_mov_sum(PyObject *self, PyObject *args, PyObject *kwds)
 {
@@ -571,8 +1293,8 @@ MaskedArray_mov_sum(PyObject *self, PyObject *args, PyObject *kwds)
                 &orig_arrayobj, &span, &type_num_double,
                 PyArray_DescrConverter2, &dtype)) return NULL;
 
-    check_mov_args(orig_arrayobj, span, 1,
-                   &orig_ndarray, &orig_mask, &result_mask);
+    ERR_CHECK(check_mov_args(orig_arrayobj, span, 1,
+                             &orig_ndarray, &orig_mask, &result_mask));
 
     if (type_num_double) {
         /* if the moving sum is being used as an intermediate step in something
@@ -596,11 +1318,260 @@ MaskedArray_mov_sum(PyObject *self, PyObject *args, PyObject *kwds)
 
     Py_DECREF(result_ndarray);
     Py_DECREF(result_mask);
+    Py_DECREF(orig_ndarray);
+    Py_XDECREF(orig_mask);
     return result_dict;
 }
 
-PyObject*
-calc_mov_ranked(PyArrayObject *orig_ndarray, int span, int rtype, char rank_type)
+/* helpers for MOV_MEDIAN_LOOP: `p` is the heap position of the value that
+   changed and is updated as the value moves through the heap */
+#define MOV_MEDIAN_SWAP(a, b)                                                 \
+    tmp = heap[a]; heap[a] = heap[b]; heap[b] = tmp;                          \
+    pos[heap[a]] = a; pos[heap[b]] = b;
+
+#define MOV_MEDIAN_MIN_UP(p)                                                  \
+    while ((p > 0) && (vals[heap[p]] < vals[heap[p/2]])) {                    \
+        MOV_MEDIAN_SWAP(p, p/2); p /= 2;                                      \
+    }
+
+#define MOV_MEDIAN_MAX_UP(p)                                                  \
+    while ((p < 0) && (vals[heap[p]] > vals[heap[p/2]])) {                    \
+        MOV_MEDIAN_SWAP(p, p/2); p /= 2;                                      \
+    }
+
+#define MOV_MEDIAN_MIN_DOWN(p)                                                \
+    while (1) {                                                               \
+        c = (p == 0) ? 1 : 2*p;                                               \
+        if (c > nhigh) break;                                                 \
+        if ((p > 0) && (c < nhigh) && (vals[heap[c+1]] < vals[heap[c]])) c++; \
+        if (!(vals[heap[c]] < vals[heap[p]])) break;                          \
+        MOV_MEDIAN_SWAP(c, p); p = c;                                         \
+    }
+
+#define MOV_MEDIAN_MAX_DOWN(p)                                                \
+    while (1) {                                                               \
+        c = (p == 0) ? -1 : 2*p;                                              \
+        if (c < -nlow) break;                                                 \
+        if ((p < 0) && (c > -nlow) && (vals[heap[c-1]] > vals[heap[c]])) c--; \
+        if (!(vals[heap[c]] > vals[heap[p]])) break;                          \
+        MOV_MEDIAN_SWAP(c, p); p = c;                                         \
+    }
+
+/* Typed moving median. The window is kept in a double heap ("mediator"): the
+   median sits at heap[0], a max-heap of the lower values at negative
+   positions and a min-heap of the upper values at positive positions. Each
+   step replaces the oldest value of the window in place and restores the
+   heap properties, which is O(log span) instead of the O(span) rescan of the
+   rank algorithm.
+
+   `vals` holds the current window (ring buffer indexed by i % span), `pos`
+   the heap position of each ring slot and `heap` the ring slot stored at each
+   heap position. For an even span, heap[0] is the lower median and heap[1]
+   the upper one. The mask is ignored here: windows with masked values are
+   masked in the result anyway. */
+#define MOV_MEDIAN_LOOP(NAME, TYPE)                                           \
+static void                                                                   \
+_mov_median_##NAME(TYPE *data, TYPE *result, npy_intp size, int span,         \
+                   TYPE *vals, int *pos, int *heap_buf)                       \
+{                                                                             \
+    int *heap = heap_buf + (span - 1)/2;                                      \
+    int nlow = (span - 1)/2, nhigh = span/2;                                  \
+    int p, c, tmp, k;                                                         \
+    npy_intp i;                                                               \
+    TYPE old_val, new_val;                                                    \
+                                                                              \
+    for (k=0; k<span; k++) {                                                  \
+        vals[k] = data[0];                                                    \
+        pos[k] = k - nlow;                                                    \
+        heap[k - nlow] = k;                                                   \
+    }                                                                         \
+                                                                              \
+    for (i=0; i<size; i++) {                                                  \
+        k = (int)(i % span);                                                  \
+        old_val = vals[k];                                                    \
+        new_val = data[i];                                                    \
+        vals[k] = new_val;                                                    \
+        p = pos[k];                                                           \
+                                                                              \
+        if ((p > 0) && (new_val < old_val)) {                                 \
+            MOV_MEDIAN_MIN_UP(p);                                             \
+            if (p == 0) { MOV_MEDIAN_MAX_DOWN(p); }                           \
+        } else if ((p < 0) && (new_val > old_val)) {                          \
+            MOV_MEDIAN_MAX_UP(p);                                             \
+            if (p == 0) { MOV_MEDIAN_MIN_DOWN(p); }                           \
+        } else if (p >= 0 && (new_val > old_val)) {                           \
+            MOV_MEDIAN_MIN_DOWN(p);                                           \
+        } else if (p <= 0 && (new_val < old_val)) {                           \
+            MOV_MEDIAN_MAX_DOWN(p);                                           \
+        }                                                                     \
+                                                                              \
+        if (i >= span - 1) {                                                  \
+            if (span % 2) {                                                   \
+                result[i] = vals[heap[0]];                                    \
+            } else {                                                          \
+                result[i] = (TYPE)(((double)vals[heap[0]] +                   \
+                                    (double)vals[heap[1]]) * 0.5);            \
+            }                                                                 \
+        }                                                                     \
+    }                                                                         \
+}
+
+MOV_MEDIAN_LOOP(float, npy_float)
+MOV_MEDIAN_LOOP(double, npy_double)
+MOV_MEDIAN_LOOP(int, npy_int)
+MOV_MEDIAN_LOOP(long, npy_long)
+MOV_MEDIAN_LOOP(longlong, npy_longlong)
+
+/* Typed moving min/max. `deque` is a ring buffer of `span` indices holding the
+   candidates of the current window, with the extremum at the front: each
+   index is pushed and popped at most once, so the loop is O(n). CMP is `<=`
+   for the minimum and `>=` for the maximum. */
+#define MOV_EXTREMUM_LOOP(NAME, TYPE, CMP)                                    \
+static void                                                                   \
+_mov_##NAME(TYPE *data, TYPE *result, npy_intp size, int span,                \
+            npy_intp *deque)                                                  \
+{                                                                             \
+    npy_intp i;                                                               \
+    int front=0, count=0;                                                     \
+                                                                              \
+    for (i=0; i<size; i++) {                                                  \
+        /* drop the index that just left the window */                        \
+        if ((count > 0) && (deque[front] <= i - span)) {                      \
+            front = (front + 1) % span;                                       \
+            count--;                                                          \
+        }                                                                     \
+        /* drop the candidates that can't be the extremum anymore */          \
+        while ((count > 0) &&                                                 \
+               (data[i] CMP data[deque[(front + count - 1) % span]])) {       \
+            count--;                                                          \
+        }                                                                     \
+        deque[(front + count) % span] = i;                                    \
+        count++;                                                              \
+        if (i >= span - 1) {                                                  \
+            result[i] = data[deque[front]];                                   \
+        }                                                                     \
+    }                                                                         \
+}
+
+MOV_EXTREMUM_LOOP(min_float, npy_float, <=)
+MOV_EXTREMUM_LOOP(min_double, npy_double, <=)
+MOV_EXTREMUM_LOOP(min_int, npy_int, <=)
+MOV_EXTREMUM_LOOP(min_long, npy_long, <=)
+MOV_EXTREMUM_LOOP(min_longlong, npy_longlong, <=)
+MOV_EXTREMUM_LOOP(max_float, npy_float, >=)
+MOV_EXTREMUM_LOOP(max_double, npy_double, >=)
+MOV_EXTREMUM_LOOP(max_int, npy_int, >=)
+MOV_EXTREMUM_LOOP(max_long, npy_long, >=)
+MOV_EXTREMUM_LOOP(max_longlong, npy_longlong, >=)
+
+/* computation portion of moving median/min/max for the dtypes with a typed
+   loop (float32/float64/int32/int64). The loops run with the GIL released */
+static PyObject*
+calc_mov_ranked_typed(PyArrayObject *orig_ndarray, int span, int rtype,
+                      char rank_type)
+{
+    PyArrayObject *data=NULL, *result_ndarray=NULL;
+    void *raw_data, *raw_result, *vals=NULL;
+    int *pos=NULL, *heap=NULL;
+    npy_intp *deque=NULL;
+    npy_intp j, nrows, ncols;
+
+    // make sure we have contiguous columns of the result type
+    data = _columns_contiguous((PyObject*)orig_ndarray, rtype);
+    NULL_CHECK(data);
+
+    result_ndarray = (PyArrayObject*)PyArray_ZEROS(data->nd, data->dimensions,
+                                                   rtype, 0);
+    if (result_ndarray == NULL) {
+        Py_DECREF(data);
+        return NULL;
+    }
+
+    nrows = MOV_NROWS(orig_ndarray);
+    ncols = MOV_NCOLS(orig_ndarray);
+    if (nrows < span) {
+        Py_DECREF(data);
+        return _columns_restore(result_ndarray);
+    }
+
+    raw_data = PyArray_DATA(data);
+    raw_result = PyArray_DATA(result_ndarray);
+
+    if (rank_type == 'E') {
+        vals = PyArray_malloc(span * PyArray_ITEMSIZE(data));
+        pos = PyArray_malloc(span * sizeof(int));
+        heap = PyArray_malloc(span * sizeof(int));
+        if ((vals == NULL) || (pos == NULL) || (heap == NULL)) {
+            PyArray_free(vals);
+            PyArray_free(pos);
+            PyArray_free(heap);
+            Py_DECREF(data);
+            Py_DECREF(result_ndarray);
+            return PyErr_NoMemory();
+        }
+    } else {
+        deque = PyArray_malloc(span * sizeof(npy_intp));
+        if (deque == NULL) {
+            Py_DECREF(data);
+            Py_DECREF(result_ndarray);
+            return PyErr_NoMemory();
+        }
+    }
+
+#define MOV_RANKED_CALL(NAME, TYPE)                                           \
+    for (j=0; j<ncols; j++) {                                                 \
+        TYPE *col_data = (TYPE*)raw_data + j*nrows;                           \
+        TYPE *col_result = (TYPE*)raw_result + j*nrows;                       \
+        switch(rank_type) {                                                   \
+            case 'E':                                                         \
+                _mov_median_##NAME(col_data, col_result, nrows, span,         \
+                                   (TYPE*)vals, pos, heap);                   \
+                break;                                                        \
+            case 'I':                                                         \
+                _mov_min_##NAME(col_data, col_result, nrows, span, deque);    \
+                break;                                                        \
+            case 'A':                                                         \
+                _mov_max_##NAME(col_data, col_result, nrows, span, deque);    \
+                break;                                                        \
+        }                                                                     \
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    switch(rtype) {
+        case NPY_FLOAT:
+            MOV_RANKED_CALL(float, npy_float);
+            break;
+        case NPY_DOUBLE:
+            MOV_RANKED_CALL(double, npy_double);
+            break;
+        case NPY_INT:
+            MOV_RANKED_CALL(int, npy_int);
+            break;
+        case NPY_LONG:
+            MOV_RANKED_CALL(long, npy_long);
+            break;
+        case NPY_LONGLONG:
+            MOV_RANKED_CALL(longlong, npy_longlong);
+            break;
+    }
+    Py_END_ALLOW_THREADS
+
+#undef MOV_RANKED_CALL
+
+    PyArray_free(vals);
+    PyArray_free(pos);
+    PyArray_free(heap);
+    PyArray_free(deque);
+    Py_DECREF(data);
+    return _columns_restore(result_ndarray);
+}
+
+/* computation portion of moving median/min/max for dtypes without a typed
+   loop (object, complex, long double...), using the O(n*span) rank
+   algorithm on Python objects */
+static PyObject*
+calc_mov_ranked_object(PyArrayObject *orig_ndarray, PyArrayObject *orig_mask,
+                       int span, int rtype, char rank_type)
 {
     PyArrayObject *result_ndarray=NULL;
     PyObject **result_array, **ref_array, **even_array=NULL;
@@ -780,6 +1751,18 @@ calc_mov_ranked(PyArrayObject *orig_ndarray, int span, int rtype, char rank_type
 
 }
 
+/* computation portion of moving median/min/max. Appropriate mask is
+   overlayed on top afterwards */
+static PyObject*
+calc_mov_ranked(PyArrayObject *orig_ndarray, int span, int rtype, char rank_type)
+{
+    if (_has_typed_loop(rtype)) {
+        return calc_mov_ranked_typed(orig_ndarray, span, rtype, rank_type);
+    }
+    return _mov_object_columns(calc_mov_ranked_object, orig_ndarray, NULL,
+                               span, rtype, rank_type);
+}
+
 PyObject *
 MaskedArray_mov_median(PyObject *self, PyObject *args, PyObject *kwds)
 {
@@ -796,8 +1779,8 @@ MaskedArray_mov_median(PyObject *self, PyObject *args, PyObject *kwds)
                 &orig_arrayobj, &span,
                 PyArray_DescrConverter2, &dtype)) return NULL;
 
-    check_mov_args(orig_arrayobj, span, 1,
-                   &orig_ndarray, &orig_mask, &result_mask);
+    ERR_CHECK(check_mov_args(orig_arrayobj, span, 1,
+                             &orig_ndarray, &orig_mask, &result_mask));
 
     if ((span % 2) == 0) {
         rtype = _get_type_num_double(((PyArrayObject*)orig_ndarray)->descr, dtype);
@@ -816,6 +1799,8 @@ MaskedArray_mov_median(PyObject *self, PyObject *args, PyObject *kwds)
 
     Py_DECREF(result_ndarray);
     Py_DECREF(result_mask);
+    Py_DECREF(orig_ndarray);
+    Py_XDECREF(orig_mask);
     return result_dict;
 }
 
@@ -835,8 +1820,8 @@ MaskedArray_mov_min(PyObject *self, PyObject *args, PyObject *kwds)
                 &orig_arrayobj, &span,
                 PyArray_DescrConverter2, &dtype)) return NULL;
 
-    check_mov_args(orig_arrayobj, span, 1,
-                   &orig_ndarray, &orig_mask, &result_mask);
+    ERR_CHECK(check_mov_args(orig_arrayobj, span, 1,
+                             &orig_ndarray, &orig_mask, &result_mask));
 
     rtype = _get_type_num(((PyArrayObject*)orig_ndarray)->descr, dtype);
 
@@ -851,6 +1836,8 @@ MaskedArray_mov_min(PyObject *self, PyObject *args, PyObject *kwds)
 
     Py_DECREF(result_ndarray);
     Py_DECREF(result_mask);
+    Py_DECREF(orig_ndarray);
+    Py_XDECREF(orig_mask);
     return result_dict;
 }
 
@@ -870,8 +1857,8 @@ MaskedArray_mov_max(PyObject *self, PyObject *args, PyObject *kwds)
                 &orig_arrayobj, &span,
                 PyArray_DescrConverter2, &dtype)) return NULL;
 
-    check_mov_args(orig_arrayobj, span, 1,
-                   &orig_ndarray, &orig_mask, &result_mask);
+    ERR_CHECK(check_mov_args(orig_arrayobj, span, 1,
+                             &orig_ndarray, &orig_mask, &result_mask));
 
     rtype = _get_type_num(((PyArrayObject*)orig_ndarray)->descr, dtype);
 
@@ -885,15 +1872,264 @@ MaskedArray_mov_max(PyObject *self, PyObject *args, PyObject *kwds)
     PyDict_SetItemString(result_dict, "mask", result_mask);
 
     Py_DECREF(result_ndarray);
+    Py_DECREF(result_mask);
+    Py_DECREF(orig_ndarray);
+    Py_XDECREF(orig_mask);
+    return result_dict;
+}
+
+/* Single pass moving mean, variance and covariance. The window statistics
+   are updated with Welford's formulas when a value enters the window and
+   with their inverse when it leaves it, which avoids the cancellation of the
+   sum-of-squares formula on series with a large mean. The values are also
+   shifted by the first value of the current run, so that the updates work on
+   small numbers. `y` may be NULL, in which case only the statistics of `x`
+   are computed. As in the moving sum, a masked value resets the
+   accumulators. */
+static void
+_mov_moments(npy_double *x, npy_double *y, npy_bool *mask, npy_intp size,
+             int span, int ddof,
+             npy_double *mean_x, npy_double *var_x,
+             npy_double *mean_y, npy_double *var_y, npy_double *cov)
+{
+    npy_intp i, n=0;
+    double mx=0, my=0, m2x=0, m2y=0, cxy=0, kx=0, ky=0;
+    double dx, dy, xi, yi, denom=(double)(span - ddof);
+
+    for (i=0; i<size; i++) {
+
+        if ((mask != NULL) && mask[i]) {
+            n = 0;
+            mx = my = m2x = m2y = cxy = 0;
+        } else {
+            if (n == span) {
+                // remove the value leaving the window
+                n -= 1;
+                if (n == 0) {
+                    mx = my = m2x = m2y = cxy = 0;
+                } else {
+                    xi = x[i-span] - kx;
+                    dx = xi - mx;
+                    mx -= dx/n;
+                    m2x -= dx*(xi - mx);
+                    if (y != NULL) {
+                        yi = y[i-span] - ky;
+                        dy = yi - my;
+                        my -= dy/n;
+                        m2y -= dy*(yi - my);
+                        cxy -= dx*(yi - my);
+                    }
+                }
+            }
+            // add the current value
+            if (n == 0) {
+                kx = x[i];
+                if (y != NULL) ky = y[i];
+            }
+            n += 1;
+            xi = x[i] - kx;
+            dx = xi - mx;
+            mx += dx/n;
+            m2x += dx*(xi - mx);
+            if (y != NULL) {
+                yi = y[i] - ky;
+                dy = yi - my;
+                my += dy/n;
+                m2y += dy*(yi - my);
+                cxy += dx*(yi - my);
+            }
+        }
+
+        mean_x[i] = mx + kx;
+        // rounding errors may leave a tiny negative sum of squares
+        var_x[i] = (m2x > 0 ? m2x : 0)/denom;
+        if (y != NULL) {
+            mean_y[i] = my + ky;
+            var_y[i] = (m2y > 0 ? m2y : 0)/denom;
+            cov[i] = cxy/denom;
+        }
+    }
+}
+
+/* Casts `arr` to `rtype` if needed and adds it to `dict` under `key`.
+   Steals the reference to `arr` */
+static int
+_set_result_item(PyObject *dict, char *key, PyObject *arr, int rtype)
+{
+    PyObject *result;
+
+    if (PyArray_TYPE(arr) != rtype) {
+        result = PyArray_Cast((PyArrayObject*)arr, rtype);
+        Py_DECREF(arr);
+        if (result == NULL) return -1;
+    } else {
+        result = arr;
+    }
+    PyDict_SetItemString(dict, key, result);
+    Py_DECREF(result);
+    return 0;
+}
+
+PyObject *
+MaskedArray_mov_moments(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *orig_arrayobj=NULL, *orig_ndarray=NULL, *orig_mask=NULL,
+             *y_obj=NULL, *result_mask=NULL, *result_dict=NULL;
+    PyArrayObject *x_arr=NULL, *y_arr=NULL;
+    PyObject *mean_x=NULL, *var_x=NULL, *mean_y=NULL, *var_y=NULL, *cov=NULL;
+    PyArray_Descr *dtype=NULL;
+    npy_bool *mask=NULL;
+    npy_double *y_data=NULL;
+    npy_intp j, nrows, ncols;
+    int rtype, span, ddof;
+
+    static char *kwlist[] = {"array", "span", "ddof", "y", "dtype", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds,
+                "Oii|OO&:mov_moments(array, span, ddof, y, dtype)", kwlist,
+                &orig_arrayobj, &span, &ddof, &y_obj,
+                PyArray_DescrConverter2, &dtype)) return NULL;
+
+    ERR_CHECK(check_mov_args(orig_arrayobj, span, 1,
+                             &orig_ndarray, &orig_mask, &result_mask));
+
+    rtype = _get_type_num_double(((PyArrayObject*)orig_ndarray)->descr, dtype);
+
+    x_arr = _columns_contiguous(orig_ndarray, NPY_DOUBLE);
+    if (x_arr == NULL) goto fail;
+    nrows = MOV_NROWS(orig_ndarray);
+    ncols = MOV_NCOLS(orig_ndarray);
+
+    if ((y_obj != NULL) && (y_obj != Py_None)) {
+        PyObject *y_tmp = PyArray_FROMANY(y_obj, NPY_DOUBLE, 0, 0, 0);
+        if (y_tmp == NULL) goto fail;
+        if (!PyArray_SAMESHAPE((PyArrayObject*)y_tmp,
+                               (PyArrayObject*)orig_ndarray)) {
+            Py_DECREF(y_tmp);
+            PyErr_SetString(PyExc_ValueError,
+                            "x and y must have the same shape");
+            goto fail;
+        }
+        y_arr = _columns_contiguous(y_tmp, NPY_DOUBLE);
+        Py_DECREF(y_tmp);
+        if (y_arr == NULL) goto fail;
+        y_data = (npy_double*)PyArray_DATA(y_arr);
+    }
+
+    mean_x = PyArray_ZEROS(x_arr->nd, x_arr->dimensions, NPY_DOUBLE, 0);
+    var_x = PyArray_ZEROS(x_arr->nd, x_arr->dimensions, NPY_DOUBLE, 0);
+    if ((mean_x == NULL) || (var_x == NULL)) goto fail;
+    if (y_arr != NULL) {
+        mean_y = PyArray_ZEROS(x_arr->nd, x_arr->dimensions, NPY_DOUBLE, 0);
+        var_y = PyArray_ZEROS(x_arr->nd, x_arr->dimensions, NPY_DOUBLE, 0);
+        cov = PyArray_ZEROS(x_arr->nd, x_arr->dimensions, NPY_DOUBLE, 0);
+        if ((mean_y == NULL) || (var_y == NULL) || (cov == NULL)) goto fail;
+    }
+
+    if (orig_mask != NULL)
+        mask = (npy_bool*)PyArray_DATA(orig_mask);
+
+#define MOV_COLUMN(arr) \
+    ((arr) == NULL ? NULL : (npy_double*)PyArray_DATA(arr) + j*nrows)
+
+    Py_BEGIN_ALLOW_THREADS
+    for (j=0; j<ncols; j++) {
+        _mov_moments((npy_double*)PyArray_DATA(x_arr) + j*nrows,
+                     (y_data == NULL) ? NULL : y_data + j*nrows,
+                     (mask == NULL) ? NULL : mask + j*nrows,
+                     nrows, span, ddof,
+                     MOV_COLUMN(mean_x), MOV_COLUMN(var_x),
+                     MOV_COLUMN(mean_y), MOV_COLUMN(var_y), MOV_COLUMN(cov));
+    }
+    Py_END_ALLOW_THREADS
+
+#undef MOV_COLUMN
+
+    Py_DECREF(x_arr);
+    Py_XDECREF(y_arr);
+    Py_DECREF(orig_ndarray);
+    Py_XDECREF(orig_mask);
+    x_arr = y_arr = NULL;
+    orig_ndarray = orig_mask = NULL;
+
+    result_dict = PyDict_New();
+    if (result_dict == NULL) goto fail;
+
+    {
+        char *keys[] = {"mean_x", "var_x", "mean_y", "var_y", "cov"};
+        PyObject *arrays[] = {mean_x, var_x, mean_y, var_y, cov};
+        int k, err=0;
+
+        mean_x = var_x = mean_y = var_y = cov = NULL;
+        for (k=0; k<5; k++) {
+            if (arrays[k] == NULL) continue;
+            if (err) {
+                Py_DECREF(arrays[k]);
+            } else {
+                arrays[k] = _columns_restore((PyArrayObject*)arrays[k]);
+                err = ((arrays[k] == NULL) ||
+                       _set_result_item(result_dict, keys[k], arrays[k], rtype));
+            }
+        }
+        if (err) goto fail;
+    }
+    PyDict_SetItemString(result_dict, "mask", result_mask);
+
     Py_DECREF(result_mask);
     return result_dict;
+
+ fail:
+    Py_XDECREF(x_arr);
+    Py_XDECREF(y_arr);
+    Py_XDECREF(orig_ndarray);
+    Py_XDECREF(orig_mask);
+    Py_XDECREF(mean_x);
+    Py_XDECREF(var_x);
+    Py_XDECREF(mean_y);
+    Py_XDECREF(var_y);
+    Py_XDECREF(cov);
+    Py_XDECREF(result_dict);
+    Py_XDECREF(result_mask);
+    return NULL;
+}
+
+/* Typed version of the exponentially weighted moving average loop, same
+   algorithm as calc_mov_average_expw_object */
+#define MOV_AVERAGE_EXPW_LOOP(NAME, TYPE)                                     \
+static void                                                                   \
+_mov_average_expw_##NAME(TYPE *data, npy_bool *mask, TYPE *result,            \
+                         npy_intp size, int span)                             \
+{                                                                             \
+    npy_intp i;                                                               \
+    int initialized=0;                                                        \
+    double decay_factor = 2.0/((double)(span + 1));                           \
+                                                                              \
+    for (i=0; i<size; i++) {                                                  \
+        int curr_val_masked = ((mask != NULL) && mask[i]);                    \
+                                                                              \
+        if (initialized == 0) {                                               \
+            result[i] = data[i];                                              \
+            if (curr_val_masked == 0) {                                       \
+                initialized = 1;                                              \
+            }                                                                 \
+        } else if (curr_val_masked == 0) {                                    \
+            result[i] = (TYPE)(result[i-1] +                                  \
+                               decay_factor*(data[i] - result[i-1]));         \
+        } else {                                                              \
+            result[i] = result[i-1];                                          \
+        }                                                                     \
+    }                                                                         \
 }
 
-/* computation portion of exponentially weighted moving average. Appropriate
-   mask is overlayed on top afterwards */
+MOV_AVERAGE_EXPW_LOOP(float, npy_float)
+MOV_AVERAGE_EXPW_LOOP(double, npy_double)
+
+/* computation portion of exponentially weighted moving average for dtypes
+   without a typed loop, one value at a time as Python objects */
 static PyObject*
-calc_mov_average_expw(
-    PyArrayObject *orig_ndarray, PyArrayObject *orig_mask, int span, int rtype)
+calc_mov_average_expw_object(
+    PyArrayObject *orig_ndarray, PyArrayObject *orig_mask, int span, int rtype,
+    char kind)
 {
     PyArrayObject *result_ndarray=NULL;
     PyObject *decay_factor=NULL;
@@ -958,6 +2194,61 @@ calc_mov_average_expw(
 
 }
 
+/* computation portion of exponentially weighted moving average. float32 and
+   float64 results use a typed loop with the GIL released. Appropriate mask is
+   overlayed on top afterwards */
+static PyObject*
+calc_mov_average_expw(
+    PyArrayObject *orig_ndarray, PyArrayObject *orig_mask, int span, int rtype)
+{
+    PyArrayObject *data=NULL, *result_ndarray=NULL;
+    npy_bool *mask=NULL;
+    void *raw_data, *raw_result;
+    npy_intp j, nrows, ncols;
+
+    if ((rtype != NPY_FLOAT) && (rtype != NPY_DOUBLE)) {
+        return _mov_object_columns(calc_mov_average_expw_object, orig_ndarray,
+                                   orig_mask, span, rtype, 0);
+    }
+
+    // make sure we have contiguous columns of the result type
+    data = _columns_contiguous((PyObject*)orig_ndarray, rtype);
+    NULL_CHECK(data);
+
+    result_ndarray = (PyArrayObject*)PyArray_ZEROS(data->nd, data->dimensions,
+                                                   rtype, 0);
+    if (result_ndarray == NULL) {
+        Py_DECREF(data);
+        return NULL;
+    }
+
+    if (orig_mask != NULL)
+        mask = (npy_bool*)PyArray_DATA(orig_mask);
+    raw_data = PyArray_DATA(data);
+    raw_result = PyArray_DATA(result_ndarray);
+    nrows = MOV_NROWS(orig_ndarray);
+    ncols = MOV_NCOLS(orig_ndarray);
+
+    Py_BEGIN_ALLOW_THREADS
+    for (j=0; j<ncols; j++) {
+        if (rtype == NPY_FLOAT) {
+            _mov_average_expw_float((npy_float*)raw_data + j*nrows,
+                                    (mask == NULL) ? NULL : mask + j*nrows,
+                                    (npy_float*)raw_result + j*nrows,
+                                    nrows, span);
+        } else {
+            _mov_average_expw_double((npy_double*)raw_data + j*nrows,
+                                     (mask == NULL) ? NULL : mask + j*nrows,
+                                     (npy_double*)raw_result + j*nrows,
+                                     nrows, span);
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    Py_DECREF(data);
+    return _columns_restore(result_ndarray);
+}
+
 PyObject *
 MaskedArray_mov_average_expw(PyObject *self, PyObject *args, PyObject *kwds)
 {
@@ -976,8 +2267,8 @@ MaskedArray_mov_average_expw(PyObject *self, PyObject *args, PyObject *kwds)
                 PyArray_DescrConverter2, &dtype)) return NULL;
 
     // note: we do not actually use the "result_mask" in this case
-    check_mov_args(orig_arrayobj, span, 1,
-                   &orig_ndarray, &orig_mask, &result_mask);
+    ERR_CHECK(check_mov_args(orig_arrayobj, span, 1,
+                             &orig_ndarray, &orig_mask, &result_mask));
 
     rtype = _get_type_num_double(((PyArrayObject*)orig_ndarray)->descr, dtype);
 
@@ -993,6 +2284,8 @@ MaskedArray_mov_average_expw(PyObject *self, PyObject *args, PyObject *kwds)
 
     Py_DECREF(result_ndarray);
     Py_DECREF(result_mask);
+    Py_DECREF(orig_ndarray);
+    Py_XDECREF(orig_mask);
     return result_dict;
 }
 
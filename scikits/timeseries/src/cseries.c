@@ -10,6 +10,8 @@ static PyMethodDef cseries_methods[] = {
 
     {"MA_mov_sum", (PyCFunction)MaskedArray_mov_sum,
      METH_VARARGS | METH_KEYWORDS, ""},
+    {"MA_mov_moments", (PyCFunction)MaskedArray_mov_moments,
+     METH_VARARGS | METH_KEYWORDS, ""},
     {"MA_mov_median", (PyCFunction)MaskedArray_mov_median,
      METH_VARARGS | METH_KEYWORDS, ""},
     {"MA_mov_min", (PyCFunction)MaskedArray_mov_min,
@@ -21,11 +23,27 @@ static PyMethodDef cseries_methods[] = {
 
     {"TS_convert", (PyCFunction)TimeSeries_convert,
      METH_VARARGS, ""},
+    {"TS_asof", (PyCFunction)TimeSeries_asof,
+     METH_VARARGS, ""},
+    {"TS_groupsort", (PyCFunction)TimeSeries_groupsort,
+     METH_VARARGS, ""},
 
     {"DateArray_asfreq", (PyCFunction)DateArray_asfreq,
      METH_VARARGS, ""},
+    {"DateArray_getaffinecoefs", (PyCFunction)DateArray_getaffinecoefs,
+     METH_VARARGS, ""},
     {"DateArray_getdateinfo", (PyCFunction)DateArray_getdateinfo,
      METH_VARARGS, ""},
+    {"DateArray_getdatefields", (PyCFunction)DateArray_getdatefields,
+     METH_VARARGS, ""},
+    {"DateArray_fromstrings", (PyCFunction)DateArray_fromstrings,
+     METH_VARARGS, ""},
+    {"DateArray_fromdatetimes", (PyCFunction)DateArray_fromdatetimes,
+     METH_VARARGS, ""},
+    {"DateArray_addtimedelta", (PyCFunction)DateArray_addtimedelta,
+     METH_VARARGS, ""},
+    {"DateArray_strftime", (PyCFunction)DateArray_strftime,
+     METH_VARARGS, ""},
     {"DateArray_getdatetime", (PyCFunction)DateArray_getdatetime,
      METH_VARARGS, ""},
 
@@ -74,6 +92,7 @@ initcseries(void)
 
     import_c_lib(m);
     import_c_freqs(m);
+    import_c_convert(m);
     import_c_dates(m);
     import_c_datearray(m);
     import_c_tseries(m);
@@ -24,7 +24,7 @@ from numpy import ndarray
 import numpy.core.numerictypes as ntypes
 from numpy.core.numerictypes import generic
 
-from parser import DateFromString, DateTimeFromString
+from parser import DateFromString, DateTimeFromString, DateTimeParser
 
 import const as _c
 import cseries
@@ -35,6 +35,7 @@ from cseries import Date, TimeDelta, DateCalc_Error, DateCalc_RangeError, \
                     now, check_freq, check_freq_str, get_freq_group
 
 __all__ = ['ArithmeticDateError',
+           'BusinessCalendar',
            'Date', 'DateArray', 'DateCalc_Error', 'DateCalc_RangeError',
            'DateError',
            'FrequencyDateError',
@@ -42,12 +43,13 @@ __all__ = ['ArithmeticDateError',
            'TimeDelta',
            'check_freq', 'check_freq_str', 'convert_to_float',
            'date_array', 'day', 'day_of_year',
-           'get_freq_group',
+           'get_calendar', 'get_freq_group',
            'hour',
            'minute', 'month',
            'nodates', 'now',
            'period_break', 'prevbusday',
            'quarter',
+           'register_calendar',
            'second',
            'weekday',
            'week',
@@ -150,7 +152,104 @@ def _check_chronological_order(dates):
 ufunc_dateOK = ['add', 'subtract',
                 'equal', 'not_equal', 'less', 'less_equal',
                 'greater', 'greater_equal',
-                'isnan']
+                'isnan', 'isinf', 'isfinite']
+
+# Codes of the date fields, as used by cseries.DateArray_getdatefields
+_date_fields = dict(year='Y', years='Y', qyear='F', qyears='F',
+                    quarter='Q', quarters='Q', month='M', months='M',
+                    week='I', weeks='I', day='D', days='D',
+                    day_of_week='W', weekday='W', weekdays='W',
+                    day_of_year='R', yeardays='R',
+                    hour='H', hours='H', minute='T', minutes='T',
+                    second='S', seconds='S', ordinal='O', ordinals='O')
+
+class _DerivedCache(dict):
+    """
+    Derived arrays (fields, conversions) cached for the dates of a DateArray.
+
+    The keys are also listed in order of use in the `order` attribute, the
+    least recently used first.
+    """
+    __slots__ = ('order',)
+
+    def __init__(self):
+        dict.__init__(self)
+        self.order = []
+
+    def copy(self):
+        "Returns a (shallow) copy of the cache."
+        new = _DerivedCache()
+        new.update(self)
+        new.order = self.order[:]
+        return new
+
+    def use(self, key):
+        "Returns the array cached under `key` (or None) and marks it as used."
+        value = self.get(key)
+        if value is not None:
+            self.order.remove(key)
+            self.order.append(key)
+        return value
+
+    def add(self, key, value, maxsize):
+        """
+    Caches `value` under `key`, discarding the least recently used array if
+    there are already `maxsize` of them.
+        """
+        if key in self:
+            self.order.remove(key)
+        elif len(self) >= maxsize:
+            del self[self.order.pop(0)]
+        self[key] = value
+        self.order.append(key)
+
+
+
+class _DateArrayCache(object):
+    """
+    Cached information about the dates of a DateArray.
+
+    The same object is shared by the views of the same dates, and copied
+    only when a view describes different dates (slices, reshaped or
+    transposed arrays...).
+    For convenience, the information is also accessible as items.
+    """
+    __slots__ = ('toobj', 'tostr', 'toord', 'steps', 'full', 'hasdups',
+                 'chronidx', 'ischrono', 'derived', 'regular')
+
+    def __init__(self):
+        self.clear()
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def update(self, *args, **kwargs):
+        "Updates the information from a dictionary and/or keywords."
+        for (key, value) in dict(*args, **kwargs).iteritems():
+            setattr(self, key, value)
+
+    def clear(self):
+        "Resets all the information."
+        self.toobj = self.tostr = self.toord = None
+        self.steps = self.full = self.hasdups = None
+        self.chronidx = self.ischrono = None
+        self.derived = self.regular = None
+
+    def copy(self):
+        "Returns a (shallow) copy of the information."
+        new = _DateArrayCache.__new__(_DateArrayCache)
+        (new.toobj, new.tostr, new.toord) = (self.toobj, self.tostr,
+                                             self.toord)
+        (new.steps, new.full, new.hasdups) = (self.steps, self.full,
+                                              self.hasdups)
+        (new.chronidx, new.ischrono) = (self.chronidx, self.ischrono)
+        (new.derived, new.regular) = (self.derived, self.regular)
+        return new
+
+
 
 class _datearithmetics(object):
     """
@@ -159,6 +258,8 @@ class _datearithmetics(object):
     object is called instead.
     If `asdates` is True, a DateArray object is returned , else a regular ndarray
     is returned.
+    Adding (or subtracting) a TimeDelta, a datetime.timedelta or an array of
+    them shifts the dates directly in C and always returns a DateArray.
     """
     def __init__ (self, methodname, asdates=True):
         """
@@ -195,6 +296,15 @@ class _datearithmetics(object):
                 raise FrequencyDateError("Cannot operate on dates", \
                                          freq, other.freq)
             other_val = other.value
+        elif isinstance(other, (TimeDelta, dt.timedelta)) or \
+             (isinstance(other, ndarray) and other.dtype.kind == 'O'):
+            # Shift the dates by some deltas, all at once
+            if self.methodname not in ('__add__', '__sub__'):
+                raise ArithmeticDateError
+            sign = {'__add__': 1, '__sub__':-1}[self.methodname]
+            values = cseries.DateArray_addtimedelta(instance, freq,
+                                                    other, sign)
+            return instance.__class__(values, freq=freq)
         elif isinstance(other, ndarray):
             if other.dtype.kind not in ['i', 'f']:
                 raise ArithmeticDateError
@@ -223,6 +333,8 @@ class DateArray(ndarray):
 
     accesses the array element by element. Therefore, `d` is a :class:`Date` object.
     """
+    # Maximum number of derived arrays (fields, conversions) cached per instance
+    _maxderived = 16
 
     def __new__(cls, dates=None, unit=None, freq=None, copy=False, timestep=None):
         # 
@@ -243,44 +355,103 @@ class DateArray(ndarray):
         _dates._unit = _unit
         _dates._timestep = _timestep
         #
-        _cached = _dates._cachedinfo
-        if _cached['ischrono'] is None:
-            sortidx = _dates.__array__().ravel().argsort()
-            sortflag = (sortidx == np.arange(_dates.size)).all()
-            if sortflag:
-                _cached['chronidx'] = None
-            else:
-                _cached['chronidx'] = sortidx
-            _cached['ischrono'] = sortflag
+        # Check the chronological order (the sorting indices are lazy)
+        _dates.is_chronological()
         return _dates
 
     def _reset_cachedinfo(self):
-        "Reset the internal cache information"
-        self._cachedinfo = dict(toobj=None, tostr=None, toord=None,
-                                steps=None, full=None, hasdups=None,
-                                chronidx=None, ischrono=None)
+        """
+    Reset the internal cache information, for the instance and the views of
+    the same dates.
+        """
+        _cached = getattr(self, '_cachedinfo', None)
+        if _cached is None:
+            self._cachedinfo = _DateArrayCache()
+        else:
+            _cached.clear()
+
+    def _get_derived(self, key):
+        """
+    Returns the derived array cached under `key`, a tuple
+    ``(info, relation, freq)``, or None if it is not cached.
+        """
+        derived = self._cachedinfo['derived']
+        if not derived:
+            return None
+        return derived.use(key)
+
+    def _set_derived(self, key, value):
+        """
+    Caches the derived array `value` under `key` and returns it.
+    Only the last `_maxderived` arrays are kept.
+        """
+        derived = self._cachedinfo['derived']
+        if derived is None:
+            derived = self._cachedinfo['derived'] = _DerivedCache()
+        derived.add(key, value, self._maxderived)
+        return value
+
+    def _set_regular(self, start, step):
+        """
+    Marks the (1D) instance as regularly spaced, the i-th date having the
+    value ``start + i*step``, and sets the cached information accordingly.
+        """
+        multiple = (self.size > 1)
+        _cached = self._cachedinfo
+        _cached.regular = (start, step)
+        _cached.ischrono = (not multiple or step >= 0)
+        _cached.chronidx = None
+        _cached.full = (not multiple or abs(step) == self._timestep)
+        _cached.hasdups = (multiple and step == 0)
 
     def __array_wrap__(self, obj, context=None):
         if context is None:
             return self
         elif context[0].__name__ not in ufunc_dateOK:
             raise ArithmeticDateError, "(function %s)" % context[0].__name__
+        # The dates were modified in place
+        if obj is self:
+            self._reset_cachedinfo()
+            return self
+        # The output may have been prepared as a DateArray w/ our cached info:
+        # drop it, _datearithmetics sets the type of the result by itself
+        return obj.view(ndarray)
 
     def __array_finalize__(self, obj):
         self._unit = getattr(obj, '_unit', _c.FR_UND)
         self._timestep = getattr(obj, '_timestep', 1)
-        self._reset_cachedinfo()
-        self._cachedinfo.update(getattr(obj, '_cachedinfo', {}))
+        _cached = getattr(obj, '_cachedinfo', None)
+        if _cached is None:
+            self._cachedinfo = _DateArrayCache()
+            return
+        shape = obj.shape
+        if (shape == self.shape) and (obj.strides == self.strides) and \
+           np.may_share_memory(obj, self):
+            # A view of the same dates: share the cache
+            self._cachedinfo = _cached
+            return
+        _cached = self._cachedinfo = _cached.copy()
+        # The derived arrays are only valid for a view of the same dates
+        _cached.derived = None
+        if shape != self.shape:
+            _cached.regular = None
         return
 
     def _get_unsorted(self):
-        "Returns the indices of the dates in chronological order"
-        chronidx = self._cachedinfo['chronidx']
-        if chronidx is None:
-            flag = self.is_chronological()
-            chronidx = self._cachedinfo['chronidx']
-        if np.size(chronidx) < 1:
+        """
+    Returns the indices of the dates in chronological order, or None if the
+    dates are already sorted.
+    The indices are computed (with a stable sort) the first time they are
+    needed.
+        """
+        if self.is_chronological():
             return None
+        _cached = self._cachedinfo
+        chronidx = _cached['chronidx']
+        if (chronidx is None) or (np.size(chronidx) < 1):
+            chronidx = ndarray.argsort(self.__array__(), axis=None,
+                                       kind='mergesort')
+            _cached['chronidx'] = chronidx
         return chronidx
     def _set_unsorted(self, value):
         "Sets the indices of the dates in chronological order"
@@ -315,24 +486,60 @@ class DateArray(ndarray):
             # or some other subclass of ndarray with wierd getitem
             # behaviour
             return Date(self._unit, value=r.item())
-        else:
-            if hasattr(r, '_cachedinfo'):
-                _cache = r._cachedinfo
-                # Select the appropriate cached representations
-                _cache.update(dict([(k, _cache[k][indx])
-                                    for k in ('toobj', 'tostr', 'toord')
-                                    if _cache[k] is not None]))
-                # Reset the ischrono flag if needed
-                if not (keep_chrono and _cache['ischrono']):
-                    _cache['ischrono'] = None
-                # Reset the sorting indices
-                _cache['chronidx'] = None
-                # Reset the steps
-                _cache['steps'] = None
-                if reset_full:
-                    _cache['full'] = None
-                    _cache['hasdups'] = None
+        _cache = getattr(r, '_cachedinfo', None)
+        if (_cache is None) or (_cache is self._cachedinfo):
+            # Not a DateArray, or a view of the same dates sharing our cache
             return r
+        _cached = self._cachedinfo
+        # Select the appropriate cached representations
+        if _cached.toobj is not None:
+            _cache.toobj = _cached.toobj[indx]
+        if _cached.tostr is not None:
+            _cache.tostr = _cached.tostr[indx]
+        if _cached.toord is not None:
+            _cache.toord = _cached.toord[indx]
+        _derived = _cached.derived
+        if _derived:
+            _cache.derived = derived = _derived.copy()
+            shape = self.shape
+            for (k, v) in _derived.iteritems():
+                if v.shape != shape:
+                    v = v.reshape(shape)
+                derived[k] = v[indx]
+        # Reset the sorting indices and the steps
+        _cache.chronidx = _cache.steps = None
+        if keep_chrono and (self.ndim == 1):
+            (first, last, step) = indx.indices(self.size)
+            if (step > 0) and _cached.ischrono:
+                # Slices in increasing order keep the chronological order...
+                _cache.chronidx = _cached.chronidx
+                if step == 1:
+                    # ... and the contiguous ones the steps and no gaps
+                    if (_cached.steps is not None) and (r.size > 1):
+                        _cache.steps = _cached.steps[first:last - 1]
+                    if not _cache.full:
+                        _cache.full = None
+                else:
+                    _cache.full = None
+            else:
+                _cache.ischrono = _cache.full = None
+            # ... and no slice adds duplicates
+            if _cache.hasdups:
+                _cache.hasdups = None
+            # (get_steps computes full and hasdups along with the steps)
+            if (_cache.full is None) or (_cache.hasdups is None):
+                _cache.steps = None
+            # A slice of regular dates is still regular
+            _regular = _cached.regular
+            if (_regular is not None) and r.size:
+                r._set_regular(_regular[0] + first * _regular[1],
+                               step * _regular[1])
+        else:
+            if not (keep_chrono and _cache.ischrono):
+                _cache.ischrono = None
+            if reset_full:
+                _cache.full = _cache.hasdups = None
+        return r
 
     def __getslice__(self, i, j):
         """
@@ -340,6 +547,16 @@ class DateArray(ndarray):
         """
         return self.__getitem__(slice(i, j))
 
+    def __setitem__(self, indx, value):
+        ndarray.__setitem__(self, indx, value)
+        self._reset_cachedinfo()
+
+    def __setslice__(self, i, j, value):
+        """
+    Sets a slice of the date_array
+        """
+        self.__setitem__(slice(i, j), value)
+
 
     def __repr__(self):
         return ndarray.__repr__(self)[:-1] + \
@@ -358,6 +575,8 @@ class DateArray(ndarray):
         datenum = np.array(date, dtype=self.dtype)
         if datenum.ndim != 0:
             raise ValueError("Cannot check containment of multiple dates")
+        if self._cachedinfo['regular'] is not None:
+            return bool(self._search_dates(datenum)[1])
         return datenum in self.view(np.ndarray)
 
     #......................................................
@@ -471,11 +690,74 @@ class DateArray(ndarray):
     def ordinals(self):
         return self.__getdateinfo__('O')
     def __getdateinfo__(self, info):
-        return np.asarray(cseries.DateArray_getdateinfo(self,
-                                                        self.freq, info,
-                                                        int(self.is_full())),
-                          dtype=int)
+        return self._get_fields_info(info)[info].copy()
     __getDateInfo = __getdateinfo__
+
+    def _get_fields_info(self, codes):
+        """
+    Returns a dictionary {code: values} of the date fields of `codes`.
+    The fields are cached as derived arrays, under the key
+    ``(code, None, freq)``: the fields that are not cached yet are computed
+    all at once.
+        """
+        unit = self._unit
+        _fields = {}
+        for code in codes:
+            value = self._get_derived((code, None, unit))
+            if value is not None:
+                _fields[code] = value
+        missing = ''.join(sorted(set(codes).difference(_fields)))
+        if missing:
+            values = cseries.DateArray_getdatefields(self.__array__(),
+                                                     unit, missing)
+            for (i, code) in enumerate(missing):
+                _fields[code] = self._set_derived((code, None, unit),
+                                                  values[..., i])
+        # The instance may have been reshaped in place
+        for (code, value) in _fields.items():
+            if value.shape != self.shape:
+                _fields[code] = value.reshape(self.shape)
+        return _fields
+
+    def fields(self, names):
+        """
+    Returns several fields of the dates at once.
+
+    Each date is decomposed only once, whatever the number of fields, and
+    the fields are cached.
+
+    Parameters
+    ----------
+    names : {string, sequence of strings}
+        Names of the fields, as the corresponding properties of the instance
+        ('year', 'qyear', 'quarter', 'month', 'week', 'day', 'day_of_week',
+        'day_of_year', 'hour', 'minute', 'second', 'ordinal'...).
+
+    Returns
+    -------
+    fields : ndarray
+        A structured array with the shape of the instance and one integer
+        field per name.
+
+    Examples
+    --------
+    >>> d = ts.date_array(start_date=ts.Date('D', '2001-01-30'), length=3)
+    >>> d.fields(['month', 'day'])
+    array([(1, 30), (1, 31), (2,  1)],
+          dtype=[('month', '<i8'), ('day', '<i8')])
+
+        """
+        if isinstance(names, basestring):
+            names = [names]
+        try:
+            codes = [_date_fields[name] for name in names]
+        except KeyError, err:
+            raise ValueError("Unrecognized date field: %s" % err.args[0])
+        _fields = self._get_fields_info(codes)
+        result = np.empty(self.shape, dtype=[(name, int) for name in names])
+        for (name, code) in zip(names, codes):
+            result[name] = _fields[code]
+        return result
     @property
     def datetime(self):
         return cseries.DateArray_getdatetime(self, self.freq)
@@ -548,6 +830,34 @@ class DateArray(ndarray):
         """
         return self.datetime.tolist()
     #
+    def todatetime64(self):
+        """
+    Converts the dates to a :class:`~numpy.ndarray` of 
+    :class:`~numpy.datetime64`.
+
+    The dates are expressed in days (``'M8[D]'``) for frequencies lower than
+    or equal to daily, using the same day as :attr:`datetime`, and in seconds
+    (``'M8[s]'``) otherwise.
+
+    Examples
+    --------
+    >>> d = ts.date_array(start_date=ts.Date('M', '2001-01'), length=3)
+    >>> d.todatetime64()
+    array(['2001-01-31', '2001-02-28', '2001-03-31'], dtype='datetime64[D]')
+
+        """
+        unit = self._unit
+        values = self.__array__()
+        if unit == _c.FR_UND:
+            return (values - _datetime64_epoch).view('M8[D]')
+        elif unit <= _c.FR_DAY:
+            if unit != _c.FR_DAY:
+                values = cseries.DateArray_asfreq(values, unit, _c.FR_DAY, 'E')
+            return (values - _datetime64_epoch).view('M8[D]')
+        if unit != _c.FR_SEC:
+            values = cseries.DateArray_asfreq(values, unit, _c.FR_SEC, 'S')
+        return values.view('M8[s]')
+    #
     def tostring(self):
         """
     Converts the dates to a :class:`~numpy.ndarray` of strings.
@@ -565,16 +875,34 @@ class DateArray(ndarray):
         """
         # Note: we better cache the result
         if self._cachedinfo['tostr'] is None:
-            firststr = str(self[0])
-            if self.size:
-                ncharsize = len(firststr)
-                tostr = np.fromiter((str(d) for d in self),
-                                    dtype='|S%i' % ncharsize)
-            else:
-                tostr = firststr
+            tostr = cseries.DateArray_strftime(self.__array__(), self._unit)
             self._cachedinfo['tostr'] = tostr
         return self._cachedinfo['tostr']
     #
+    def strftime(self, format):
+        """
+    Converts the dates to a :class:`~numpy.ndarray` of strings, following the
+    given format.
+
+    The format is processed once for all the dates, with the same directives
+    as :meth:`Date.strftime`. The width of the strings is the length of the
+    longest result.
+
+    Parameters
+    ----------
+    format : string
+        Format of the output, as a string containing one or several directives.
+
+    Examples
+    --------
+    >>> d = ts.date_array(start_date=ts.Date('M', '2001-01'), length=3)
+    >>> d.strftime('%b %Y (Q%q)')
+    array(['Jan 2001 (Q1)', 'Feb 2001 (Q1)', 'Mar 2001 (Q1)'], 
+          dtype='|S13')
+
+        """
+        return cseries.DateArray_strftime(self.__array__(), self._unit, format)
+    #
     def todays(self):
         return self.day
     #
@@ -597,10 +925,15 @@ class DateArray(ndarray):
         For example, if converting a monthly date to a daily date, specifying
         'START' ('END') would result in the first (last) day in the month.
 
+    Notes
+    -----
+    The conversions are cached as derived arrays, under the key
+    ``('asfreq', relation, freq)``: the output is a copy of the cached
+    conversion, which keeps the fields already computed.
+
         """
         if unit is None:
             unit = freq
-        # Note: As we define a new object, we don't need caching
         if (unit is None) or (unit == _c.FR_UND):
             return self
         tounit = check_freq(unit)
@@ -612,14 +945,39 @@ class DateArray(ndarray):
             errmsg = "Invalid specification for the 'relation' parameter: %s"
             raise ValueError(errmsg % relation)
 
+        key = ('asfreq', relation[0], tounit)
+        converted = self._get_derived(key)
+        if converted is None:
+            converted = self._set_derived(key, self._asunit(tounit,
+                                                            relation[0]))
+        new = converted.copy()
+        # Don't share the cache: the output may be modified through a view
+        _derived = converted._cachedinfo['derived']
+        if _derived:
+            new._cachedinfo['derived'] = _derived.copy()
+        return new
+    asfreq = asunit
+
+    def _asunit(self, tounit, relation):
+        "Converts the dates to the (valid) frequency `tounit`."
         fromunit = self._unit
         if fromunit == _c.FR_UND:
             new = self.__array__()
         else:
             new = cseries.DateArray_asfreq(self.__array__(),
-                                           fromunit, tounit, relation[0])
-        return DateArray(new, unit=unit)
-    asfreq = asunit
+                                           fromunit, tounit, relation)
+            # An affine conversion keeps the dates regular
+            _regular = self._cachedinfo['regular']
+            if _regular is not None:
+                coefs = cseries.DateArray_getaffinecoefs(fromunit, tounit,
+                                                         relation)
+                if coefs is not None:
+                    (k, c) = coefs
+                    new = new.view(DateArray)
+                    new._unit = tounit
+                    new._set_regular(_regular[0] * k + c, _regular[1] * k)
+                    return new
+        return DateArray(new, unit=tounit)
 
     def _get_unit(self):
         return self._unit
@@ -629,6 +987,7 @@ class DateArray(ndarray):
         else:
             self.flat = self.asunit(*unit).flat
         self._unit = unit
+        self._reset_cachedinfo()
     freq = unit = property(fget=_get_unit, fset=_set_unit, doc="Frequency")
 
     #......................................................
@@ -660,6 +1019,7 @@ class DateArray(ndarray):
         (ver, shp, typ, isf, raw, frq) = state
         ndarray.__setstate__(self, (shp, typ, isf, raw))
         self._unit = frq
+        self._reset_cachedinfo()
 
     def __reduce__(self):
         """Returns a 3-tuple for pickling a DateArray."""
@@ -692,46 +1052,72 @@ class DateArray(ndarray):
                 return flatten_sequence(args)
 
         ifreq = self._unit
-        c = np.zeros(self.shape, dtype=bool)
+        values = []
         for d in flatargs(*dates):
             if d.freq != ifreq:
                 d = d.asfreq(ifreq)
-            c += (self == d.value)
-        c = c.nonzero()
-        if np.size(c) == 0:
+            values.append(d.value)
+        values = np.array(values, dtype=int)
+        # Find the range of matching dates in chronological order
+        _dates = self.__array__().ravel()
+        sorter = self._unsorted
+        first = _dates.searchsorted(values, 'left', sorter=sorter)
+        counts = _dates.searchsorted(values, 'right', sorter=sorter) - first
+        total = counts.sum()
+        if not total:
             raise IndexError("Date out of bounds!")
-        return c
+        indx = np.arange(total) + np.repeat(first - counts.cumsum() + counts,
+                                            counts)
+        if sorter is not None:
+            indx = sorter[indx]
+        return np.unravel_index(np.unique(indx), self.shape)
+
+    def _search_dates(self, values):
+        """
+    Returns the indices of the integers `values` in the flattened instance
+    (the first ones in case of duplicates), and a boolean array indicating
+    whether each value was found.
+    The search is performed in chronological order, with a binary search.
+        """
+        _dates = self.__array__().ravel()
+        values = np.asarray(values)
+        if not _dates.size:
+            return (np.zeros(values.shape, dtype=int),
+                    np.zeros(values.shape, dtype=bool))
+        # Regular dates: no search needed
+        _regular = self._cachedinfo['regular']
+        if (_regular is not None) and (_regular[1] > 0):
+            (indx, offset) = divmod(values - _regular[0], _regular[1])
+            found = (offset == 0) & (indx >= 0) & (indx < _dates.size)
+            return (np.clip(indx, 0, _dates.size - 1), found)
+        sorter = self._unsorted
+        indx = _dates.searchsorted(values, sorter=sorter)
+        indx = np.minimum(indx, _dates.size - 1)
+        if sorter is not None:
+            indx = sorter[indx]
+        return (indx, _dates[indx] == values)
 
     def date_to_index(self, dates):
         """
    Returns the index corresponding to one given date, as an integer.
         """
-        values = self.__array__()
         # Transform a string into a Date
         if isinstance(dates, basestring):
             dates = Date(self._unit, dates)
         # Just one date ?
         if isinstance(dates, Date):
-            _val = dates.value
-            if _val not in values:
+            (indx, found) = self._search_dates(dates.value)
+            if not found:
                 raise IndexError("Date '%s' is out of bounds" % dates)
-            if self.is_valid():
-                return (_val - values[0]) / self._timestep
-            else:
-                return np.where(values == _val)[0][0]
+            return int(indx)
         #
         _dates = date_array(dates, freq=self.freq).__array__()
-        if self.is_valid():
-            indx = (_dates - values[0]) / self._timestep
-            err_cond = (indx < 0) | (indx > self.size)
-            if err_cond.any():
-                err_indx = np.compress(err_cond, _dates)[0]
-                err_msg = "Date '%s' is out of bounds '%s' <= date <= '%s'"
-                raise IndexError(err_msg % (err_indx, self[0], self[-1]))
-            return indx
-        vals = values.tolist()
-        indx = np.array([vals.index(d) for d in _dates])
-        #
+        (indx, found) = self._search_dates(_dates)
+        if not found.all():
+            err_date = Date(self._unit, value=int(_dates[~found][0]))
+            err_msg = "Date '%s' is out of bounds '%s' <= date <= '%s'"
+            raise IndexError(err_msg % (err_date,
+                                        self.start_date, self.end_date))
         return indx
 
 
@@ -742,13 +1128,11 @@ class DateArray(ndarray):
         _cached = self._cachedinfo
         chronoflag = _cached['ischrono']
         if chronoflag is None:
-            sortidx = ndarray.argsort(self.__array__(), axis=None)
-            chronoflag = (sortidx == np.arange(self.size)).all()
+            # Single pass: the sorting indices are only computed if needed
+            values = self.__array__().ravel()
+            chronoflag = bool((values[1:] >= values[:-1]).all())
             _cached['ischrono'] = chronoflag
-            if chronoflag:
-                _cached['chronidx'] = np.array([], dtype=int)
-            else:
-                _cached['chronidx'] = sortidx
+            _cached['chronidx'] = None
         return chronoflag
 
     def sort_chronologically(self):
@@ -768,11 +1152,15 @@ class DateArray(ndarray):
     the frequency of the instance.
         """
         _cached = self._cachedinfo
+        if (_cached['steps'] is None) and (_cached['regular'] is not None):
+            steps = np.empty(max(self.size - 1, 0), dtype=int)
+            steps.fill(abs(_cached['regular'][1]))
+            _cached['steps'] = steps
         if _cached['steps'] is None:
             if self.size > 1:
                 val = self.__array__().ravel()
                 if not self.is_chronological():
-                    val = val[_cached['chronidx']]
+                    val = val[self._unsorted]
                 steps = val[1:] - val[:-1]
                 u = np.unique(steps)
                 _cached['full'] = (u.size < 3) & (u[-1] == self.timestep)
@@ -826,8 +1214,7 @@ class DateArray(ndarray):
         if self.size:
             if self.is_chronological():
                 return self[0]
-            _sortidx = self._cachedinfo['chronidx']
-            return self[_sortidx[0]]
+            return Date(self._unit, value=int(self.__array__().min()))
         return None
 
     @property
@@ -836,8 +1223,7 @@ class DateArray(ndarray):
         if self.size:
             if self.is_chronological():
                 return self[-1]
-            _sortidx = self._cachedinfo['chronidx']
-            return self[_sortidx[-1]]
+            return Date(self._unit, value=int(self.__array__().max()))
         return None
 
     #-----------------------------
@@ -857,7 +1243,8 @@ class DateArray(ndarray):
         "(This docstring should be overwritten)"
         ndarray.sort(self, axis=axis, kind=kind, order=order)
         _cached = self._cachedinfo
-        kwargs = dict(toobj=None, toord=None, tostr=None)
+        kwargs = dict(toobj=None, toord=None, tostr=None, derived=None,
+                      regular=None)
         if self.ndim == 1:
             kwargs.update(ischrono=True, chronidx=np.array([], dtype=int))
         _cached.update(**kwargs)
@@ -865,7 +1252,7 @@ class DateArray(ndarray):
     sort.__doc__ = ndarray.sort.__doc__
 
 
-def fill_missing_dates(dates, freq=None):
+def fill_missing_dates(dates, freq=None, calendar=None):
     """
     Finds and fills the missing dates in a :class:`DateArray`.
 
@@ -876,6 +1263,10 @@ def fill_missing_dates(dates, freq=None):
     freq : {freq_spec}, optional
         Frequency of result. 
         If not specified, the frequency of the input is used.
+    calendar : {None, BusinessCalendar, string}, optional
+        Business calendar (or name of a registered calendar).
+        If given, only the missing business days of the calendar are filled:
+        the holidays are skipped, unless they are already present.
     """
     # Check the frequency ........
     orig_freq = freq
@@ -894,6 +1285,16 @@ def fill_missing_dates(dates, freq=None):
     # Flatten the array
     if dates.ndim != 1:
         dates = dates.ravel()
+    # Only fill the business days of the calendar
+    if (calendar is not None) and dates.size:
+        values = np.unique(dates.tovalues())
+        filled = date_array(start_date=Date(dates.freq, value=values[0]),
+                            end_date=Date(dates.freq, value=values[-1]),
+                            calendar=calendar)
+        newvalues = np.union1d(values, filled.tovalues())
+        if newvalues.size == values.size:
+            return dates
+        return DateArray(newvalues, freq=dates.freq)
     # Skip if there's no need to fill
     if not dates.has_missing_dates():
         return dates
@@ -905,22 +1306,366 @@ DateArray.fill_missing_dates = fill_missing_dates
 nodates = DateArray([])
 
 
+#####---------------------------------------------------------------------------
+#---- --- Business calendars ---
+#####---------------------------------------------------------------------------
+class BusinessCalendar(object):
+    """
+    Defines a calendar of business days: the weekdays that are not holidays.
+
+    The holidays are stored as a sorted array of business-day values, along
+    with the cumulative count of holidays over the span they cover.
+    The business days of the calendar are then numbered consecutively, and
+    the index of any date is obtained in constant time, without loops.
+
+    Parameters
+    ----------
+    holidays : {None, sequence, DateArray}, optional
+        Holidays of the calendar, as a :class:`DateArray` or as any sequence
+        accepted by :func:`date_array` with a daily frequency.
+        The holidays falling on a weekend are discarded.
+    name : {None, string}, optional
+        Name of the calendar.
+
+    """
+    def __init__(self, holidays=None, name=None):
+        self.name = name
+        self._holidays = np.array([], dtype=np.int64)
+        self._update_index()
+        if holidays is not None:
+            self.add_holidays(holidays)
+
+    def __repr__(self):
+        return "<BusinessCalendar %s (%i holidays)>" % (self.name or '',
+                                                        self._holidays.size)
+
+    def _update_index(self):
+        "Precomputes the cumulative count of holidays and the inverse table."
+        holidays = self._holidays
+        if holidays.size:
+            (first, last) = holidays[[0, -1]]
+            isholiday = np.zeros(last - first + 1, dtype=bool)
+            isholiday[holidays - first] = True
+            self._isholiday = isholiday
+            self._cumcount = isholiday.cumsum()
+            self._busdays = np.arange(first, last + 1,
+                                      dtype=np.int64)[~isholiday]
+        else:
+            self._isholiday = self._cumcount = self._busdays = None
+
+    @property
+    def holidays(self):
+        "Returns the holidays of the calendar as a daily :class:`DateArray`."
+        return DateArray(self._holidays, freq=_c.FR_BUS).asfreq(_c.FR_DAY)
+
+    def add_holidays(self, holidays):
+        """
+    Adds some holidays to the calendar.
+
+    Parameters
+    ----------
+    holidays : {sequence, DateArray}
+        New holidays, as a :class:`DateArray` or as any sequence accepted by
+        :func:`date_array` with a daily frequency.
+        """
+        if isinstance(holidays, Date):
+            holidays = DateArray([holidays], freq=holidays.freq)
+        elif not isinstance(holidays, DateArray):
+            holidays = date_array(holidays, freq=_c.FR_DAY)
+        holidays = holidays.ravel()
+        if get_freq_group(holidays.freq) != _c.FR_BUS:
+            holidays = holidays.asfreq(_c.FR_DAY)
+            holidays = holidays[holidays.weekday < 5].asfreq(_c.FR_BUS)
+        values = np.concatenate((self._holidays, holidays.tovalues()))
+        self._holidays = np.unique(values.astype(np.int64))
+        self._update_index()
+
+
+    def _tobusiness(self, dates, relation):
+        """
+    Returns the business-day values of some dates, and whether they fall on a
+    weekday. Dates falling on a weekend are rolled to the following Monday
+    if ``relation`` is 'END', or to the preceding Friday otherwise.
+        """
+        if isinstance(dates, Date):
+            dates = DateArray([dates], freq=dates.freq)
+        elif not isinstance(dates, DateArray):
+            dates = date_array(dates, freq=_c.FR_DAY)
+        base = get_freq_group(dates.freq)
+        if base == _c.FR_BUS:
+            return (dates.tovalues(), True)
+        if base > _c.FR_DAY:
+            dates = dates.asfreq(_c.FR_DAY, relation)
+        if base >= _c.FR_DAY:
+            onweekday = (dates.weekday < 5)
+        else:
+            onweekday = True
+        return (dates.asfreq(_c.FR_BUS, relation).tovalues(), onweekday)
+
+    def _count(self, values):
+        "Returns the number of holidays up to (and including) each value."
+        holidays = self._holidays
+        (first, last) = holidays[[0, -1]]
+        position = np.clip(values - first, 0, last - first)
+        return np.where(values < first, 0,
+                        np.where(values > last, holidays.size,
+                                 self._cumcount[position]))
+
+    def _flag(self, values):
+        "Returns whether each business-day value is a holiday."
+        holidays = self._holidays
+        if not holidays.size:
+            return np.zeros(np.shape(values), dtype=bool)
+        (first, last) = holidays[[0, -1]]
+        position = np.clip(values - first, 0, last - first)
+        return ((values >= first) & (values <= last) &
+                self._isholiday[position])
+
+    def _asindex(self, values, relation):
+        "Returns the business index of some business-day values."
+        values = np.asarray(values, dtype=np.int64)
+        if not self._holidays.size:
+            return values.copy()
+        index = values - self._count(values)
+        if relation == 'E':
+            index += self._flag(values)
+        return index
+
+    def _fromindex(self, index):
+        "Returns the business-day values corresponding to business indices."
+        index = np.asarray(index, dtype=np.int64)
+        holidays = self._holidays
+        if not holidays.size:
+            return index.copy()
+        (first, nbdays) = (holidays[0], self._busdays.size)
+        if not nbdays:
+            return np.where(index < first, index, index + holidays.size)
+        position = np.clip(index - first, 0, nbdays - 1)
+        return np.where(index < first, index,
+                        np.where(index >= first + nbdays,
+                                 index + holidays.size,
+                                 self._busdays[position]))
+
+    def is_holiday(self, dates):
+        """
+    Returns whether some dates are holidays of the calendar.
+
+    Parameters
+    ----------
+    dates : {Date, DateArray, sequence}
+        Input dates, with a business, daily or higher frequency.
+        """
+        (values, onweekday) = self._tobusiness(dates, 'E')
+        result = self._flag(values) & onweekday
+        if isinstance(dates, Date):
+            return result[0]
+        return result
+
+    def is_busday(self, dates):
+        """
+    Returns whether some dates are business days of the calendar, that is,
+    weekdays that are not holidays.
+
+    Parameters
+    ----------
+    dates : {Date, DateArray, sequence}
+        Input dates, with a business, daily or higher frequency.
+        """
+        (values, onweekday) = self._tobusiness(dates, 'E')
+        result = ~self._flag(values) & onweekday
+        if isinstance(dates, Date):
+            return result[0]
+        return result
+
+    def busday_index(self, dates, relation='END'):
+        """
+    Returns the index of some dates among the business days of the calendar.
+
+    Consecutive business days have consecutive indices.
+    Outside the span covered by the holidays, the index of a date is the
+    value of the corresponding date at a business frequency.
+
+    Parameters
+    ----------
+    dates : {Date, DateArray, sequence}
+        Input dates.
+    relation : {'END', 'START'}, optional
+        Whether a date that is not a business day should be associated with
+        the following business day ('END') or the preceding one ('START').
+        """
+        relation = relation.upper()[0]
+        (values, _) = self._tobusiness(dates, relation)
+        index = self._asindex(values, relation)
+        if isinstance(dates, Date):
+            return int(index[0])
+        return index
+
+    def from_busday_index(self, index, freq=_c.FR_BUS):
+        """
+    Returns the business days corresponding to some indices.
+
+    Parameters
+    ----------
+    index : {int, sequence}
+        Indices of business days, as given by :meth:`busday_index`.
+    freq : {'B', freq_spec}, optional
+        Frequency of the output.
+        """
+        result = DateArray(self._fromindex(index), freq=_c.FR_BUS)
+        freq = check_freq(freq)
+        if freq != _c.FR_BUS:
+            result = result.asfreq(freq)
+        if np.isscalar(index):
+            return result[0]
+        return result
+
+    def rollforward(self, dates):
+        """
+    Returns the first business day of the calendar on or after each date,
+    at a business frequency.
+        """
+        return self.from_busday_index(self.busday_index(dates, 'END'))
+
+    def rollback(self, dates):
+        """
+    Returns the last business day of the calendar on or before each date,
+    at a business frequency.
+        """
+        return self.from_busday_index(self.busday_index(dates, 'START'))
+
+    def offset(self, dates, n=1):
+        """
+    Shifts some dates by ``n`` business days of the calendar.
+    The dates that are not business days are first rolled forward if ``n``
+    is positive, and backward otherwise.
+        """
+        relation = (n < 0) and 'START' or 'END'
+        return self.from_busday_index(self.busday_index(dates, relation) + n)
+
+    def date_range(self, start_date, end_date=None, length=None, timestep=1):
+        """
+    Returns the business days of the calendar from ``start_date``, as a
+    :class:`DateArray` with the frequency of ``start_date`` (business or
+    daily).
+    One of the ``end_date`` or ``length`` parameters must be given.
+        """
+        freq = start_date.freq
+        if end_date is None:
+            if length is None:
+                length = 1
+            length = length * timestep
+        else:
+            end_date = Date(freq, end_date)
+            if (end_date < start_date):
+                (start_date, end_date) = (end_date, start_date)
+            end = self.busday_index(end_date, 'START')
+        start = self.busday_index(start_date, 'END')
+        if end_date is not None:
+            length = max(end - start + 1, 0)
+        index = np.arange(start, start + length, timestep, dtype=np.int64)
+        dates = DateArray(self._fromindex(index), freq=_c.FR_BUS)
+        if get_freq_group(freq) != _c.FR_BUS:
+            dates = dates.asfreq(freq)
+        dates._timestep = timestep
+        return dates
+
+
+_calendars = {}
+
+def register_calendar(name, holidays=None):
+    """
+    Registers a :class:`BusinessCalendar` under a given name, so that it can
+    be referred to by its name in :func:`date_array`, :func:`fill_missing_dates`
+    or :func:`~scikits.timeseries.convert`.
+
+    Parameters
+    ----------
+    name : string
+        Name of the calendar.
+    holidays : {None, sequence, DateArray, BusinessCalendar}, optional
+        Holidays of the calendar, or an existing calendar.
+
+    Returns
+    -------
+    calendar : BusinessCalendar
+        The registered calendar.
+    """
+    if isinstance(holidays, BusinessCalendar):
+        calendar = holidays
+    else:
+        calendar = BusinessCalendar(holidays, name=name)
+    _calendars[name] = calendar
+    return calendar
+
+def get_calendar(calendar):
+    """
+    Returns a :class:`BusinessCalendar` from a calendar or from the name of a
+    registered calendar.
+    """
+    if isinstance(calendar, BusinessCalendar):
+        return calendar
+    try:
+        return _calendars[calendar]
+    except (KeyError, TypeError):
+        raise ValueError("Unrecognized calendar '%s'" % (calendar,))
+
+
 #####---------------------------------------------------------------------------
 #---- --- DateArray functions ---
 #####---------------------------------------------------------------------------
-def _listparser(dlist, freq=None):
+def _stringparser(dlist, freq=None, format=None):
+    """
+    Returns the values of the dates corresponding to an array of strings.
+
+    The strings following the ISO-8601 formats 'YYYY-MM-DD', 'YYYYMMDD'
+    (optionally followed by a ' HH:MM:SS' time) or the given strptime-like
+    :keyword:`format` are parsed in a single pass.
+    The other strings are processed by a :class:`DateTimeParser`, which
+    locks onto the format of the first string.
+    """
+    freq = check_freq(freq)
+    strings = dlist
+    if dlist.dtype.kind == 'U':
+        try:
+            strings = dlist.astype(np.string_)
+        except UnicodeError:
+            strings = None
+    if strings is None:
+        values = np.zeros(dlist.shape, dtype=np.int64)
+        parsed = np.zeros(dlist.shape, dtype=bool)
+    else:
+        (values, parsed) = cseries.DateArray_fromstrings(strings, freq, format)
+    if not parsed.all():
+        missing = ~parsed
+        parse = DateTimeParser(dateonly=(freq <= _c.FR_DAY))
+        values[missing] = [Date(freq, datetime=parse(s)).value
+                           for s in dlist[missing]]
+    return values
+
+
+# Proleptic Gregorian ordinal of the datetime64 epoch (1970-01-01)
+_datetime64_epoch = dt.date(1970, 1, 1).toordinal()
+
+def _listparser(dlist, freq=None, format=None):
     "Constructs a DateArray from a list."
-    dlist = np.array(dlist, copy=False, ndmin=1)
+    # Skip the guess of the dtype for a list of datetime objects
+    if isinstance(dlist, (list, tuple)) and len(dlist) and \
+       isinstance(dlist[0], dt.date):
+        dlist = np.array(dlist, dtype=object)
+    else:
+        dlist = np.array(dlist, copy=False, ndmin=1)
     # Case #1: dates as strings .................
     if dlist.dtype.kind in 'SU':
         #...construct a list of dates
-        dlist = np.fromiter((Date(freq, string=s).value for s in dlist),
-                            dtype=int)
+        dlist = _stringparser(dlist, freq, format)
     # Case #2: dates as numbers .................
     elif dlist.dtype.kind in 'if':
         #...hopefully, they are values
         dlist = dlist.astype(int)
-    # Case #3: dates as objects .................
+    # Case #3: dates as datetime64 ..............
+    elif dlist.dtype.kind == 'M':
+        dlist = cseries.DateArray_fromdatetimes(dlist, check_freq(freq))
+    # Case #4: dates as objects .................
     elif dlist.dtype.kind == 'O':
         template = dlist[0]
         #...as Date objects
@@ -934,8 +1679,7 @@ def _listparser(dlist, freq=None):
                                 dtype=int)
         #...as datetime objects
         elif hasattr(template, 'toordinal'):
-            dlist = np.fromiter((Date(freq, datetime=d) for d in dlist),
-                                dtype=int)
+            dlist = cseries.DateArray_fromdatetimes(dlist, check_freq(freq))
     #
     result = dlist.view(DateArray)
     result._unit = freq
@@ -943,7 +1687,8 @@ def _listparser(dlist, freq=None):
 
 
 def date_array(dlist=None, start_date=None, end_date=None, length=None,
-               freq=None, timestep=1, autosort=False):
+               freq=None, timestep=1, autosort=False, format=None,
+               calendar=None):
     """
     Factory function for constructing a :class:`DateArray`.
 
@@ -980,6 +1725,18 @@ def date_array(dlist=None, start_date=None, end_date=None, length=None,
         a continuous :class:`DateArray` at regular intervals.
     autosort : {True, False}, optional
         Whether the input dates must be sorted in chronological order.
+    format : {None, string}, optional
+        Format of the dates, when :keyword:`dlist` is a sequence of strings.
+        Only the ``%Y``, ``%y``, ``%m``, ``%d``, ``%H``, ``%M`` and ``%S``
+        directives are recognized.
+        The strings that do not match the format are processed by the generic
+        date parser.
+    calendar : {None, BusinessCalendar, string}, optional
+        Business calendar (or name of a registered calendar).
+        Use this parameter in combination with :keyword:`start_date` to create
+        a :class:`DateArray` of the business days of the calendar only,
+        skipping the weekends and holidays.
+        The frequency of the output must be business or daily.
 
     Notes
     -----
@@ -1012,7 +1769,7 @@ def date_array(dlist=None, start_date=None, end_date=None, length=None,
             return dlist
         # Make sure it's a sequence, else that's a start_date
         if hasattr(dlist, '__len__') and not isinstance(dlist, basestring):
-            dlist = _listparser(dlist, freq=freq)
+            dlist = _listparser(dlist, freq=freq, format=format)
 #####            print "PARSED"
             if autosort:
                 dlist.sort_chronologically()
@@ -1037,6 +1794,19 @@ def date_array(dlist=None, start_date=None, end_date=None, length=None,
             dmsg = "Starting date should be a valid Date instance! "
             dmsg += "(got '%s' instead)" % type(start_date)
             raise DateError, dmsg
+    # Skip the holidays if we have a calendar
+    if calendar is not None:
+        if get_freq_group(start_date.freq) not in (_c.FR_BUS, _c.FR_DAY):
+            errmsg = "Business calendars require a business or daily "\
+                     "frequency (got %s)."
+            raise ValueError(errmsg % check_freq_str(start_date.freq))
+        if end_date is not None:
+            try:
+                end_date = Date(start_date.freq, end_date)
+            except:
+                raise DateError, "Ending date should be a valid Date instance!"
+        calendar = get_calendar(calendar)
+        return calendar.date_range(start_date, end_date, length, timestep)
     # Check if we have an end_date
     if end_date is None:
         if length is None:
@@ -1061,8 +1831,7 @@ def date_array(dlist=None, start_date=None, end_date=None, length=None,
     dates = dlist.view(DateArray)
     dates._unit = freq
     dates._timestep = timestep
-    dates._cachedinfo.update(ischrono=True, hasdups=False, full=True,
-                             chronidx=np.array([], dtype=int))
+    dates._set_regular(start_date.value, timestep)
     return dates
 
 
@@ -21,7 +21,8 @@ from numpy.ma.testutils import assert_equal, assert_array_equal
 import scikits.timeseries as ts
 from scikits.timeseries import const as C, Date, DateArray, TimeDelta, now, date_array
 from scikits.timeseries.cseries import freq_dict
-from scikits.timeseries.tdates import convert_to_float
+from scikits.timeseries.tdates import convert_to_float, \
+     ArithmeticDateError, FrequencyDateError
 
 
 
@@ -100,6 +101,22 @@ class TestDates(TestCase):
         test = d.asfreq('S', 'S')
         assert_equal(test.datetime, dt.datetime(1900, 1, 1, 0, 0, 0))
 
+    def test_calendar_tables_bounds(self):
+        "Test dates around the bounds of the calendar tables"
+        first_year = ts.cseries.calendar_tables_info['first_year']
+        last_year = ts.cseries.calendar_tables_info['last_year']
+        for (year, month, day) in ((first_year - 1, 12, 31),
+                                   (first_year, 1, 1),
+                                   (last_year, 12, 31),
+                                   (last_year + 1, 1, 1)):
+            pydate = dt.date(year, month, day)
+            d = Date('D', year=year, month=month, day=day)
+            assert_equal(d.value - Date('D', '1970-01-01').value,
+                         (pydate - dt.date(1970, 1, 1)).days)
+            assert_equal((d.year, d.month, d.day, d.day_of_year),
+                         (year, month, day, pydate.timetuple().tm_yday))
+            assert_equal(d.asfreq('M').asfreq('D', 'S').day, 1)
+
     def test_highfreq_offset_epoch(self):
         "Test offset epoch"
         test = Date('D', '1970-01-01')
@@ -168,6 +185,55 @@ class TestCreation(TestCase):
         assert_equal(dates, dvals)
 
 
+    def test_fromstrings_fixedformats(self):
+        "Tests creation from strings w/ fixed formats and fallbacks"
+        dlist = ['2007-01-05', '20070106', '2007-01-07 13:45:12',
+                 '2007-01-08T06:30', '9-jan-2007', '1900-02-15 01:02:03']
+        for freq in ('A', 'Q-NOV', 'M', 'W', 'B', 'D', 'H', 'T', 'S'):
+            control = [Date(freq, string=s).value for s in dlist]
+            dates = date_array(dlist, freq=freq)
+            assert_equal(dates.tovalue(), control)
+            dates = date_array(np.array(dlist, dtype=unicode), freq=freq)
+            assert_equal(dates.tovalue(), control)
+        # Explicit format
+        dlist = ['01/05/2007 13:45', '1/6/2007 1:05', '2007-01-07']
+        dates = date_array(dlist, freq='T', format='%m/%d/%Y %H:%M')
+        control = [Date('T', string=s).value
+                   for s in ('2007-01-05 13:45', '2007-01-06 01:05',
+                             '2007-01-07')]
+        assert_equal(dates.tovalue(), control)
+        self.failUnlessRaises(ValueError, date_array, dlist, freq='T',
+                              format='%b %Y')
+
+
+    def test_datetimeparser(self):
+        "Tests the memoizing parser of date strings"
+        from scikits.timeseries.parser import DateTimeParser, \
+                                              DateTimeFromString
+        dlist = ['5-jan-2005 12:00', '6-jan-2005 13:30', '5-jan-2005 12:00',
+                 '2005-01-07', 'sep 6 2000', '7-jan-2005']
+        parse = DateTimeParser(maxsize=2)
+        for s in dlist:
+            assert_equal(parse(s), DateTimeFromString(s))
+        assert_equal((parse.hits, parse.misses, parse.fallbacks), (1, 5, 3))
+        assert_equal(parse.datestyle, 'lit')
+        assert_equal(len(parse._cache), 2)
+        # The least recently used string is discarded first
+        parse = DateTimeParser(maxsize=2)
+        for s in ('2005-01-05', '2005-01-06', '2005-01-05', '2005-01-07'):
+            parse(s)
+        assert_equal(sorted(parse._cache.keys()), ['2005-01-05', '2005-01-07'])
+        for i in range(10):
+            parse('2005-01-05')
+        self.failUnless(len(parse._order) <= 4)
+        parse.clear()
+        assert_equal((parse.hits, parse.misses, parse.datestyle),
+                     (0, 0, None))
+        # Date only
+        parse = DateTimeParser(dateonly=True)
+        assert_equal(parse('6-jan-2005 13:30'), dt.datetime(2005, 1, 6))
+
+
     def test_from_startend_dates_strings(self):
         "Test creating from a starting & ending dates as strings"
         control = DateArray(np.arange(366) + 733042, freq='D')
@@ -234,6 +300,27 @@ class TestCreation(TestCase):
         assert_equal(_dt, _tsdt)
 
 
+    def test_from_datetime_arrays(self):
+        "Test creation from sequences of datetime objects or datetime64"
+        dlist = [dt.datetime(1969, 12, 31, 23, 59, 58),
+                 dt.datetime(2007, 1, 6, 13, 45, 12), dt.date(2007, 1, 7)]
+        d64 = np.array(dlist, dtype='M8[us]')
+        for freq in ('A-MAR', 'Q-NOV', 'M', 'W-WED', 'B', 'D', 'H', 'S'):
+            control = [Date(freq, datetime=d).value for d in dlist]
+            assert_equal(date_array(dlist, freq=freq).tovalue(), control)
+            assert_equal(date_array(d64, freq=freq).tovalue(), control)
+            dates = date_array(control, freq=freq)
+            assert_equal(dates.tolist(),
+                         [Date(freq, value=v).datetime for v in control])
+            assert_equal(date_array(dates.todatetime64(), freq=freq).tovalue(),
+                         control)
+        dates = date_array(start_date=Date('M', '2001-01'), length=2)
+        assert_equal(dates.todatetime64(),
+                     np.array(['2001-01-31', '2001-02-28'], dtype='M8[D]'))
+        self.failUnlessRaises(ValueError, date_array,
+                              np.array(['NaT'], dtype='M8[s]'), freq='D')
+
+
     def test_consistent_value(self):
         "Tests that values don't get mutated when constructing dates from a value"
         freqs = [x[0] for x in freq_dict.values() if x[0] != 'U']
@@ -1290,6 +1377,23 @@ class TestMethods(TestCase):
         assert_equal(d.date_to_index(dates), [0, 24, 48, 72])
 
 
+    def test_date_to_index_unsorted(self):
+        "Test date_to_index/find_dates on unsorted dates w/ duplicates"
+        dates = DateArray([5, 3, 9, 3, 7, 1], freq='D')
+        assert_equal(dates.is_chronological(), False)
+        assert_equal(dates.date_to_index(Date('D', value=3)), 1)
+        assert_equal(dates.date_to_index(DateArray([7, 1, 3], freq='D')),
+                     [4, 5, 1])
+        self.failUnlessRaises(IndexError, dates.date_to_index,
+                              Date('D', value=4))
+        self.failUnlessRaises(IndexError, dates.date_to_index,
+                              DateArray([7, 10], freq='D'))
+        test = dates.find_dates(Date('D', value=3), Date('D', value=1))
+        assert_equal(test, ([1, 3, 5],))
+        self.failUnlessRaises(IndexError, dates.find_dates,
+                              Date('D', value=4))
+
+
     def test_contains(self):
         dt = ts.now('d')
         darr = date_array(start_date=dt, length=5)
@@ -1343,6 +1447,168 @@ class TestMethods(TestCase):
         assert_equal(dates.has_duplicated_dates(), True)
 
 
+    def test_regular_dates(self):
+        "Test the cached description of regularly spaced dates"
+        dates = date_array(start_date=Date('D', '2001-01-01'), length=20,
+                           timestep=2)
+        assert_equal(dates._cachedinfo['regular'], (730486, 2))
+        assert_equal(dates.date_to_index(Date('D', '2001-01-05')), 2)
+        self.failUnlessRaises(IndexError, dates.date_to_index,
+                              Date('D', '2001-01-04'))
+        self.failUnless(Date('D', '2001-02-08') in dates)
+        self.failUnless(Date('D', '2001-01-02') not in dates)
+        # Slices
+        test = dates[::-3]
+        assert_equal(test._cachedinfo['regular'], (730524, -6))
+        assert_equal(test.tovalue(), dates.tovalue()[::-3])
+        self.failUnless(not test.is_chronological())
+        self.failUnless(test.has_missing_dates())
+        assert_equal(test.get_steps(), [6] * 6)
+        self.failUnless(dates[5:6:-1]._cachedinfo['regular'] is None)
+        self.failUnless(dates[[0, 1]]._cachedinfo['regular'] is None)
+        # Affine conversions keep the dates regular
+        test = dates.asfreq('H', 'S')
+        assert_equal(test._cachedinfo['regular'], (271752, 48))
+        assert_equal(test.date_to_index(Date('H', '2001-01-03 00:00')), 1)
+        self.failUnless(dates.asfreq('M')._cachedinfo['regular'] is None)
+
+
+    def test_lazy_chronidx(self):
+        "Test that the sorting indices are only computed when needed"
+        dates = ts.DateArray([2002, 2000, 2001, 2000], freq='A')
+        assert_equal(dates._cachedinfo['ischrono'], False)
+        assert_equal(dates._cachedinfo['chronidx'], None)
+        assert_equal(dates._unsorted, [1, 3, 2, 0])
+        assert_equal(dates.start_date, Date('A', 2000))
+        assert_equal(dates.end_date, Date('A', 2002))
+        dates = ts.DateArray([2000, 2000, 2001], freq='A')
+        assert_equal(dates.is_chronological(), True)
+        assert_equal(dates._unsorted, None)
+
+
+    def test_asfreq(self):
+        "Test asfreq on DateArrays w/ and w/o affine conversions"
+        for (freq, tofreq) in (('D', 'H'), ('H', 'T'), ('T', 'S'), ('W', 'D'),
+                               ('W-WED', 'H'), ('H', 'D'), ('D', 'M'),
+                               ('M', 'B'), ('Q-NOV', 'D')):
+            start_date = Date(freq, '1969-12-01 12:00')
+            dates = date_array(start_date=start_date, length=100, timestep=3)
+            dates.shape = (4, 25)
+            for relation in ('START', 'END'):
+                test = dates.asfreq(tofreq, relation)
+                assert_equal(test.freq, ts.check_freq(tofreq))
+                assert_equal(test.shape, (4, 25))
+                ctrl = [d.asfreq(tofreq, relation).value for d in dates.ravel()]
+                assert_equal(test.tovalues().ravel(), ctrl)
+
+
+    def test_fields(self):
+        "Test retrieving several fields at once"
+        dates = date_array(start_date=Date('H', '2000-12-30 20:00'),
+                           length=120, timestep=5)
+        names = ['year', 'month', 'day', 'day_of_week', 'hour', 'week']
+        test = dates.fields(names)
+        assert_equal(test.shape, dates.shape)
+        assert_equal(test.dtype.names, tuple(names))
+        for name in names:
+            assert_equal(test[name], getattr(dates, name))
+        # The fields are cached and follow the slices
+        keys = [(c, None, C.FR_HR) for c in ('D', 'H', 'I', 'M', 'W', 'Y')]
+        assert_equal(sorted(dates._cachedinfo['derived'].keys()), keys)
+        sliced = dates[10:20]
+        assert_equal(sorted(sliced._cachedinfo['derived'].keys()), keys)
+        assert_equal(sliced.fields('hour')['hour'], dates.hour[10:20])
+        # The fields are reset when the dates change
+        dates.shape = (10, 12)
+        assert_equal(dates.ravel()._cachedinfo['derived'], None)
+        assert_equal(dates.fields(['day']).shape, (10, 12))
+        dates.freq = C.FR_MTH
+        ctrl = DateArray(dates.tovalues(), freq='M')
+        assert_equal(dates.fields('day')['day'], ctrl.day)
+        self.failUnlessRaises(ValueError, dates.fields, ['days_in_month'])
+
+    def test_derived_cache(self):
+        "Test the cache of fields and conversions"
+        dates = date_array(start_date=Date('D', '2001-12-30'), length=4)
+        converted = dates.asfreq('M')
+        assert_equal(converted, [24012, 24012, 24013, 24013])
+        assert_equal(converted.year, [2001, 2001, 2002, 2002])
+        _derived = dates._cachedinfo['derived']
+        self.failUnless(('asfreq', 'E', C.FR_MTH) in _derived)
+        # The output can be modified w/o corrupting the cache
+        converted[0] = 0
+        assert_equal(converted._cachedinfo['derived'], None)
+        assert_equal(converted.year[0], 0)
+        assert_equal(dates.asfreq('M'), [24012, 24012, 24013, 24013])
+        assert_equal(dates.asfreq('M').year, [2001, 2001, 2002, 2002])
+        # Views of the same dates share the cache, not the copies
+        dates.day
+        self.failUnless(dates.view()._cachedinfo['derived'] is _derived)
+        assert_equal(dates.copy()._cachedinfo['derived'], None)
+        assert_equal(dates.take([3, 2])._cachedinfo['derived'], None)
+        # The cache is bounded
+        dates._maxderived = 3
+        for f in ('A', 'Q', 'W', 'B'):
+            dates.asfreq(f)
+        assert_equal(_derived.order, [('asfreq', 'E', C.FR_QTR),
+                                      ('asfreq', 'E', C.FR_WK),
+                                      ('asfreq', 'E', C.FR_BUS)])
+        dates.asfreq('Q')
+        dates.asfreq('A')
+        assert_equal(sorted(_derived.keys()), [('asfreq', 'E', C.FR_ANN),
+                                               ('asfreq', 'E', C.FR_QTR),
+                                               ('asfreq', 'E', C.FR_BUS)])
+        # The cache is reset when the dates are modified in place
+        dates += 1
+        assert_equal(dates._cachedinfo['derived'], None)
+        assert_equal(dates.day, [31, 1, 2, 3])
+        dates.year
+        dates[:2] = dates[2:]
+        assert_equal(dates.year, [2002] * 4)
+
+    def test_cache_on_views(self):
+        "Test the propagation of the cached information to views and slices"
+        dlist = ['2001-01-%02i' % i for i in (1, 2, 3, 5, 6, 7, 8)]
+        dates = date_array(dlist, freq='D')
+        _cached = dates._cachedinfo
+        assert_equal(dates.get_steps(), [1, 1, 2, 1, 1, 1])
+        dstr = dates.tostring()
+        # Views of the same dates share the cache...
+        self.failUnless(dates.view()._cachedinfo is _cached)
+        self.failUnless(dates[:]._cachedinfo is _cached)
+        # ... but not the other views
+        self.failUnless(dates.reshape(7, 1)._cachedinfo is not _cached)
+        # Contiguous slices keep the chronological order and the steps
+        test = dates[3:]
+        _test = test._cachedinfo
+        assert_equal((_test['ischrono'], _test['hasdups']), (True, False))
+        assert_equal(_test['steps'], None)
+        self.failUnless(test.is_full())
+        assert_equal(test._cachedinfo['tostr'], dstr[3:])
+        test = dates[3:]
+        test.get_steps()
+        assert_equal(test[1:]._cachedinfo['full'], True)
+        assert_equal(test[1:]._cachedinfo['steps'], [1, 1])
+        # Other slices only keep what is still valid
+        test = dates[::2]
+        assert_equal(test._cachedinfo['ischrono'], True)
+        assert_equal(test._cachedinfo['full'], None)
+        assert_equal(test.get_steps(), [2, 3, 2])
+        test = dates[::-1]
+        assert_equal(test._cachedinfo['ischrono'], None)
+        assert_equal(test.is_chronological(), False)
+        dates = date_array(dlist[::-1], freq='D', autosort=False)
+        dates.get_steps()
+        test = dates[1:3]
+        assert_equal(test._cachedinfo['ischrono'], None)
+        assert_equal(test.get_steps(), [1])
+        # Modifying the dates in place resets the shared cache
+        view = dates.view()
+        view[0] = view[1]
+        assert_equal(dates._cachedinfo['tostr'], None)
+        self.failUnless(dates.has_duplicated_dates())
+
+
     def test_minmax(self):
         "Test min and max on DateArrays"
         start_date = Date("M", "2001-01")
@@ -1362,6 +1628,29 @@ class TestMethods(TestCase):
         assert_equal(test, dates[-1])
         assert(isinstance(test, DateArray))
 
+    def test_strftime(self):
+        "Test the conversion of DateArrays to strings"
+        for freq in ('A', 'Q', 'M', 'W', 'B', 'D', 'H', 'T', 'S', 'U'):
+            dates = date_array(start_date=Date(freq, value=730000), length=10)
+            assert_equal(dates.tostring(), [str(d) for d in dates])
+        # W/ a format
+        dates = date_array(start_date=Date('T', '2001-12-31 23:58'),
+                           length=4)
+        fmt = '%a %d %B %Y (%F-Q%q) %H:%M %%q'
+        test = dates.strftime(fmt)
+        assert_equal(test, [d.strftime(fmt) for d in dates])
+        assert_equal(test[1], 'Mon 31 December 2001 (2001-Q4) 23:59 %q')
+        assert_equal(test[2], 'Tue 01 January 2002 (2002-Q1) 00:00 %q')
+        assert_equal(test.dtype.itemsize, len(test[1]))
+        # The same label is reused for consecutive dates
+        test = dates.strftime('%j:%A')
+        assert_equal(test, ['365:Monday', '365:Monday',
+                            '001:Tuesday', '001:Tuesday'])
+        # nD and empty arrays
+        dates.shape = (2, 2)
+        assert_equal(dates.strftime('%d').shape, (2, 2))
+        assert_equal(dates[:0].ravel().strftime('%d').size, 0)
+
 
 
 
@@ -1524,8 +1813,145 @@ class TestTimeDelta(TestCase):
         assert_equal(test, Date("H", "2000-12-31 21:00"))
         test = date - TimeDelta('H', years=31, hours=3)
         assert_equal(test, Date("H", "1969-12-31 21:00"))
+        test = date - dt.timedelta(0, 3600)
+        assert_equal(test, Date("H", "2000-12-31 23:00"))
+
+    def test_add_to_datearray(self):
+        "Test adding TimeDeltas to a DateArray"
+        dates = date_array(['2001-01-31', '2000-02-29', '2001-12-31'],
+                           freq='D')
+        test = dates + TimeDelta('D', months=1)
+        self.failUnless(isinstance(test, DateArray))
+        assert_equal(test.freqstr, 'D')
+        assert_equal(test, date_array(['2001-02-28', '2000-03-29',
+                                       '2002-01-31'], freq='D'))
+        test = dates - TimeDelta('D', years=1)
+        assert_equal(test, date_array(['2000-01-31', '1999-02-28',
+                                       '2000-12-31'], freq='D'))
+        test = dates + dt.timedelta(1)
+        assert_equal(test, date_array(['2001-02-01', '2000-03-01',
+                                       '2002-01-01'], freq='D'))
+        # Array of deltas
+        deltas = np.array([TimeDelta('D', 1), TimeDelta('M', 1),
+                           dt.timedelta(-1)], dtype=object)
+        test = dates + deltas
+        assert_equal(test, date_array(['2001-02-01', '2000-03-29',
+                                       '2001-12-30'], freq='D'))
+        assert_equal(dates - deltas,
+                     [(d - t).value for (d, t) in zip(dates, deltas)])
+        # Same results as with Dates
+        for freq in ('A-MAR', 'Q', 'M', 'W', 'B', 'H', 'S'):
+            dates = date_array(start_date=Date(freq, '2000-01-31 23:59:59'),
+                               length=50)
+            for delta in (TimeDelta('M', 1), TimeDelta('D', days=-3),
+                          TimeDelta('S', years=-1, hours=5, seconds=-7)):
+                assert_equal(dates + delta,
+                             [(d + delta).value for d in dates])
+                assert_equal(dates - delta,
+                             [(d - delta).value for d in dates])
+        # Only TimeDeltas can be subtracted from dates
+        self.failUnlessRaises(ArithmeticDateError,
+                              lambda : TimeDelta('D', 1) - dates)
+        # Difference of DateArrays
+        dates = date_array(start_date=Date('D', '2001-01-01'), length=5)
+        test = dates - dates[::-1]
+        self.failUnless(not isinstance(test, DateArray))
+        assert_equal(test, [-4, -2, 0, 2, 4])
+        self.failUnlessRaises(FrequencyDateError,
+                              lambda : dates - dates.asfreq('M'))
+
 
 
+class TestBusinessCalendar(TestCase):
+    "Test the business calendars"
+    #
+    def setUp(self):
+        "Setup"
+        self.calendar = ts.BusinessCalendar(['2001-01-01', '2001-01-06',
+                                             '2001-01-15', '2001-01-16'])
+    #
+    def test_holidays(self):
+        "Test the storage of the holidays"
+        calendar = self.calendar
+        # The holiday falling on a saturday is discarded
+        assert_equal(calendar.holidays,
+                     date_array(['2001-01-01', '2001-01-15', '2001-01-16'],
+                                freq='D'))
+        calendar.add_holidays(date_array(['2001-01-15', '2001-02-01'],
+                                         freq='D').asfreq('B'))
+        assert_equal(calendar.holidays.tostring(),
+                     ['01-Jan-2001', '15-Jan-2001', '16-Jan-2001',
+                      '01-Feb-2001'])
+    #
+    def test_busday(self):
+        "Test is_busday, is_holiday and busday_index"
+        calendar = self.calendar
+        dates = date_array(start_date=Date('D', '2000-12-28'), length=25)
+        test = calendar.is_busday(dates)
+        ctrl = (dates.weekday < 5)
+        ctrl[[4, 18, 19]] = False
+        assert_equal(test, ctrl)
+        assert_equal(calendar.is_holiday(dates).nonzero()[0], [4, 18, 19])
+        assert(not calendar.is_busday(Date('D', '2001-01-01')))
+        assert(calendar.is_busday(Date('B', '2001-01-02')))
+        # Consecutive business days have consecutive indices
+        bdates = dates[test]
+        assert_equal(np.diff(calendar.busday_index(bdates)), 1)
+        # The other dates are rolled forward or backward
+        assert_equal(calendar.rollforward(dates[2:6]).tostring(),
+                     ['02-Jan-2001'] * 4)
+        assert_equal(calendar.rollback(dates[2:6]).tostring(),
+                     ['29-Dec-2000'] * 3 + ['02-Jan-2001'])
+        # Shifting by business days
+        assert_equal(calendar.offset(Date('D', '2001-01-12'), 1),
+                     Date('B', '2001-01-17'))
+        assert_equal(calendar.offset(Date('D', '2001-01-16'), -1),
+                     Date('B', '2001-01-11'))
+        # Round-trip through the index, before and after the holidays too
+        bdates = date_array(start_date=Date('B', '2000-11-01'), length=120)
+        bdates = bdates[calendar.is_busday(bdates)]
+        index = calendar.busday_index(bdates)
+        assert_equal(calendar.from_busday_index(index), bdates)
+        assert_equal(calendar.from_busday_index(index, 'D'), bdates.asfreq('D'))
+    #
+    def test_date_array_w_calendar(self):
+        "Test date_array and fill_missing_dates w/ a calendar"
+        calendar = ts.register_calendar('_test', self.calendar)
+        assert(ts.get_calendar('_test') is calendar)
+        self.failUnlessRaises(ValueError, ts.get_calendar, '_nocalendar')
+        #
+        test = date_array(start_date='2000-12-30', end_date='2001-01-19',
+                          freq='B', calendar='_test')
+        ctrl = date_array(start_date='2000-12-30', end_date='2001-01-19',
+                          freq='B')
+        assert_equal(test, ctrl[calendar.is_busday(ctrl)])
+        test = date_array(start_date='2000-12-29', length=4, freq='D',
+                          calendar=calendar)
+        assert_equal(test.freq, C.FR_DAY)
+        assert_equal(test.tostring(), ['29-Dec-2000', '02-Jan-2001',
+                                       '03-Jan-2001', '04-Jan-2001'])
+        self.failUnlessRaises(ValueError, date_array, start_date='2001-01',
+                              freq='M', length=3, calendar=calendar)
+        #
+        dates = date_array(['2000-12-29', '2001-01-01', '2001-01-05',
+                            '2001-01-17'], freq='D')
+        test = dates.fill_missing_dates(calendar=calendar)
+        ctrl = date_array(start_date='2000-12-29', end_date='2001-01-17',
+                          freq='D', calendar=calendar)
+        assert_equal(test, np.union1d(ctrl, dates))
+        # Unsorted and duplicated dates
+        dates = date_array(['2001-01-17', '2001-01-05', '2000-12-29',
+                            '2001-01-05'], freq='D', autosort=False)
+        test = dates.fill_missing_dates(calendar=calendar)
+        assert_equal(test, np.union1d(ctrl, dates))
+        dates = date_array(['2001-01-03', '2001-01-02', '2001-01-02'],
+                           freq='D', autosort=False)
+        self.failUnless(dates.fill_missing_dates(calendar=calendar) is dates)
+        dates = date_array(['2001-01-04', '2001-01-02', '2001-01-02'],
+                           freq='D', autosort=False)
+        test = dates.fill_missing_dates(calendar=calendar)
+        assert_equal(test.tostring(), ['02-Jan-2001', '03-Jan-2001',
+                                       '04-Jan-2001'])
 
 
 
@@ -246,6 +246,21 @@ class TestCreation(TestCase):
                               [ 3., 4., 5.],
                               [ 0., 1., 2.]])
 
+    def test_sort_chronologically_w_views(self):
+        "Test that sorting a series in place keeps its views consistent"
+        dates = date_array(['2001-01-%02i' % _ for _ in (4, 3, 2, 1)],
+                           freq='D', autosort=False)
+        series = time_series([4, 3, 2, 1], dates=dates, autosort=False)
+        view = series.view()
+        shared = TimeSeries(series._data, dates=series._dates, copy=False,
+                            autosort=False)
+        series.sort_chronologically()
+        assert_equal(series, [1, 2, 3, 4])
+        for other in (view, shared):
+            assert_equal(other, [1, 2, 3, 4])
+            assert_equal(other.dates, series.dates)
+            self.failUnless(other.dates.is_chronological())
+
     def test_setdates_w_timestep(self):
         "Define a timeseries w/ a regular timesteps"
         s = time_series(np.arange(96),
@@ -1011,6 +1026,214 @@ class TestFunctions(TestCase):
         assert_equal(a[-5:], series[:5])
         assert_equal(b[:5], series[-5:])
     #
+    def test_join(self):
+        "Tests join"
+        a = time_series([1, 2, 3, 4], start_date=Date('D', '2001-01-01'),
+                        mask=[0, 1, 0, 0])
+        b = time_series([10., 20.], start_date=Date('D', '2001-01-03'))
+        c = time_series([100, 200],
+                        dates=date_array(['2001-01-02', '2001-01-08'],
+                                         freq='D'))
+        #
+        test = ts.join([a, b, c])
+        assert_equal(test.shape, (5, 3))
+        assert_equal(test.dtype, float)
+        assert_equal(test.dates.tovalues(),
+                     date_array(['2001-01-%02i' % i for i in (1, 2, 3, 4, 8)],
+                                freq='D').tovalues())
+        ctrl = ma.array([[1, 2, 3, 4, 0], [0, 0, 10, 20, 0],
+                         [0, 100, 0, 0, 200]],
+                        mask=[[0, 1, 0, 0, 1], [1, 1, 0, 0, 1],
+                              [1, 0, 1, 1, 0]]).T
+        assert_equal(test, ctrl)
+        # Compare w/ align_series
+        test = ts.join([a, b, c], fill_missing=True, split=True)
+        for (column, aligned) in zip(test, align_series(a, b, c)):
+            assert_equal(column, aligned)
+        #
+        test = ts.join([a, b, c], how='inner')
+        assert_equal(test.size, 0)
+        test = ts.join([a, b, c], how='inner', fill_missing=True)
+        assert_equal(test.size, 0)
+        test = ts.join([a, b], how='inner')
+        assert_equal(test, [[3, 10], [4, 20]])
+        test = ts.join([b, c], how='left')
+        assert_equal(test.dates, b.dates)
+        assert_equal(test.mask, [[0, 1], [0, 1]])
+        self.failUnlessRaises(ValueError, ts.join, [a, b], how='right')
+        # Zero-copy columns
+        (ca, cb) = ts.join([a, b], split=True)
+        assert_equal(ca.dates, a.dates)
+        block = ca.mask.base
+        assert(cb.mask.base is block)
+        assert_equal(block.shape, (4, 2))
+        cb[0] = 0
+        assert_equal(block[:, 1], [0, 1, 0, 0])
+        ca[0] = ts.masked
+        assert_equal(block[:, 0], [1, 1, 0, 0])
+        # Conversion
+        monthly = time_series([5, 6], start_date=Date('M', '2001-01'))
+        test = ts.join([a, monthly], freq='M', func='sum')
+        assert_equal(test, [[8, 5], [0, 6]])
+        assert_equal(test.mask, [[0, 0], [1, 0]])
+        # Series w/o autosort, w/ dense and sparse dates
+        for step in (1, 10000):
+            dates = [1 * step, 3 * step, 2 * step, 4 * step]
+            u = time_series([1, 3, 2, 4], dates=dates, freq='U',
+                            autosort=False)
+            v = time_series([20, 40, 10], dates=[2 * step, 4 * step, step],
+                            freq='U', mask=[0, 1, 0], autosort=False)
+            test = ts.join([u, v])
+            assert_equal(test.dates.tovalues(), np.arange(1, 5) * step)
+            assert_equal(test, ma.array([[1, 2, 3, 4], [10, 20, 0, 40]],
+                                        mask=[[0, 0, 0, 0], [0, 0, 1, 1]]).T)
+            test = ts.join([u, v], how='left')
+            assert_equal(test.dates.tovalues(), np.arange(1, 5) * step)
+            assert_equal(test[:, 1], ma.array([10, 20, 0, 40],
+                                              mask=[0, 0, 1, 1]))
+            test = ts.join([u, v, u], how='inner')
+            assert_equal(test.dates.tovalues(), np.array([1, 2, 4]) * step)
+            assert_equal(test[:, 0], [1, 2, 4])
+    #
+    def test_asof_join(self):
+        "Tests asof_join"
+        right = time_series([1., 2, 3, 4], dates=[1, 5, 5, 9], freq='U',
+                            mask=[0, 0, 0, 1])
+        left = time_series(np.zeros(6), dates=[9, 0, 5, 6, 8, 12], freq='U')
+        test = ts.asof_join(left, right)
+        assert_equal(test.dates, left.dates)
+        assert_equal(test, ma.array([0, 3, 3, 3, 3, 3],
+                                    mask=[1, 0, 0, 0, 0, 0]))
+        test = ts.asof_join(left, right, 'forward')
+        assert_equal(test, ma.array([1, 2, 0, 0, 0, 0],
+                                    mask=[0, 0, 1, 1, 1, 1]))
+        test = ts.asof_join(left, right, 'nearest', tolerance=1)
+        assert_equal(test, ma.array([1, 3, 3, 0, 0, 0],
+                                    mask=[0, 0, 0, 1, 1, 1]))
+        self.failUnlessRaises(ValueError, ts.asof_join, left, right, 'next')
+        # Unsorted dates on the left
+        dates = ts.DateArray([9, 0, 6], freq='U')
+        test = ts.asof_join(dates, right, 'nearest')
+        assert_equal(test.dates, [0, 6, 9])
+        assert_equal(test, [1, 3, 3])
+        # Unsorted dates on the right
+        unsorted = time_series([4., 2, 1, 3], dates=[9, 5, 1, 5], freq='U',
+                               mask=[1, 0, 0, 0], autosort=False)
+        for direction in ('backward', 'forward', 'nearest'):
+            test = ts.asof_join(left, unsorted, direction)
+            ctrl = ts.asof_join(left, right, direction)
+            assert_equal(test, ctrl)
+            assert_equal(test.mask, ctrl.mask)
+        # Empty right side
+        test = ts.asof_join(left, time_series([], freq='U'))
+        assert_equal(test.mask, [1] * 6)
+        # Different frequencies: the last monthly values on daily dates
+        monthly = time_series([1, 2, 3], start_date=Date('M', '2001-01'))
+        daily = date_array(['2001-01-15', '2001-02-28', '2001-03-01'],
+                           freq='D')
+        test = ts.asof_join(daily, monthly)
+        assert_equal(test, ma.array([0, 2, 2], mask=[1, 0, 0]))
+        test = ts.asof_join(daily, monthly, position='START')
+        assert_equal(test, [1, 2, 3])
+        # ... or the last quotes of the day on daily dates
+        quotes = time_series(np.arange(6.).reshape(3, 2),
+                             start_date=Date('T', '2001-01-01 09:30'))
+        test = ts.asof_join(daily[:1], quotes)
+        assert_equal(test, [[4, 5]])
+        self.failUnlessRaises(TimeSeriesError, ts.asof_join, daily, right)
+    #
+    def test_groupby(self):
+        "Tests groupby"
+        series = time_series(np.arange(60.), start_date=Date('D', '2001-01-01'))
+        series[0] = series[31:59] = masked
+        grouped = series.groupby('month')
+        assert_equal(grouped.keys, [1, 2, 3])
+        assert_equal(grouped.counts, [31, 28, 1])
+        for (key, group) in grouped:
+            assert_equal(group, series[series.month == key])
+        january = series[1:31]._series.compressed()
+        control = ma.array([0, 0, 59.], mask=[0, 1, 0])
+        for (func, first, last) in [('sum', january.sum(), 59),
+                                    ('mean', january.mean(), 59),
+                                    ('min', 1, 59), ('max', 30, 59),
+                                    ('first', 1, 59), ('last', 30, 59),
+                                    ('std', january.std(), 0)]:
+            control[[0, 2]] = (first, last)
+            test = grouped.agg(func)
+            assert_almost_equal(test, control)
+            assert_equal(test.mask, control.mask)
+        control[[0, 2]] = (january.std(ddof=1), 0)
+        control.mask = [0, 1, 1]
+        assert_almost_equal(grouped.agg('std', ddof=1), control)
+        assert_equal(grouped.agg('count'), [30, 0, 1])
+        assert_equal(grouped.agg(ma.median), [15.5, 0, 59])
+        assert_equal(grouped.agg(ma.median).mask, [0, 1, 0])
+        self.failUnlessRaises(ValueError, grouped.agg, 'mode')
+        self.failUnlessRaises(ValueError, series.groupby, 'moon')
+        # Several fields, functions and sequences as keys
+        grouped = series.groupby(['month', 'day'])
+        assert_equal(grouped.keys['day'][:3], [1, 2, 3])
+        assert_equal(grouped.agg('count').sum(), 31)
+        grouped = series.groupby(lambda dates: dates.day_of_week >= 5)
+        assert_equal(grouped.keys, [False, True])
+        assert_equal(grouped.counts, [44, 16])
+        grouped = series.groupby(np.arange(60) % 2)
+        assert_equal(grouped.agg('first'), [2, 1])
+        # Series w/ several variables
+        series = time_series(np.arange(20).reshape(10, 2),
+                             start_date=Date('D', '2001-01-30'))
+        series[0, 1] = masked
+        grouped = series.groupby('month')
+        test = grouped.agg('sum')
+        assert_equal(test, [[2, 3], [88, 96]])
+        assert_equal(test.dtype, series.dtype)
+        assert_equal(grouped.agg('first'), [[0, 3], [4, 5]])
+        assert_equal(grouped.agg(ma.mean), [[1, 3], [11, 12]])
+        assert_equal(grouped.agg(lambda x: x.max() - x.min()), [[2, 0], [14, 14]])
+        def failing(x, axis=None):
+            raise TypeError("Failing on purpose")
+        self.failUnlessRaises(TypeError, grouped.agg, failing)
+        # nD/1V series
+        dates = date_array(start_date=Date('M', '2001-01'), length=6)
+        dates.shape = (2, 3)
+        series = time_series(np.arange(6).reshape(2, 3), dates=dates)
+        grouped = series.groupby('month')
+        assert_equal(grouped.keys, [1, 2, 3, 4, 5, 6])
+        for (key, group) in grouped:
+            assert_equal(group, [key - 1])
+            assert_equal(group.dates.month, [key])
+        # Empty series
+        assert_equal(len(time_series([], freq='D').groupby('month')), 0)
+    #
+    def test_resample(self):
+        "Tests resample on series w/ missing, duplicated or unsorted dates"
+        series = time_series([1, 2, 3, 4, 5], freq='D',
+                             dates=['2001-01-05', '2001-01-01', '2001-03-02',
+                                    '2001-01-01', '2001-03-30'])
+        series[-1] = masked
+        test = series.resample('M', 'sum')
+        assert_equal(test.dates, date_array(['2001-01', '2001-03'], freq='M'))
+        assert_equal(test, [7, 3])
+        assert_equal(test.dtype, series.dtype)
+        assert_equal(ts.resample(series, 'M', 'last'), [1, 3])
+        test = series.resample('M', 'count', fill_missing=True)
+        assert_equal(test, ma.array([3, 0, 1], mask=[0, 1, 0]))
+        test = series.resample('H', position='START')
+        assert_equal(test.dates[0], Date('H', '2001-01-01 00:00'))
+        assert_equal(test[:2], [3, 1])
+        # Series w/ several variables
+        test = time_series(np.arange(10).reshape(5, 2), dates=series.dates)
+        assert_equal(test.resample('M', 'max'), [[4, 5], [8, 9]])
+        # Series w/ undefined frequency
+        events = time_series([1., 2, 3, 4], freq='U',
+                             dates=[86400 * 2 + 60, 60, 86400 * 2, 120])
+        test = events.resample('D', 'sum', unit='S')
+        assert_equal(test, [6, 4])
+        assert_equal(test.dates,
+                     date_array(['1970-01-01', '1970-01-03'], freq='D'))
+        self.failUnlessRaises(TimeSeriesError, events.resample, 'D')
+        self.failUnlessRaises(TimeSeriesError, series.resample, 'U')
+    #
     def test_tshift(self):
         "Test tshift function"
         series = self.d[0]
@@ -1108,6 +1331,33 @@ class TestFunctions(TestCase):
                                  dtype=ndtype,
                                  start_date=ts.Date('U', 1))
         assert_equal(test, control)
+    #
+    def test_fill_missing_dates_w_timestep(self):
+        "Test fill_missing_dates on series w/ timestep or unsorted dates"
+        dates = date_array(start_date=Date('T', '2001-01-01 00:00'),
+                           length=10, timestep=15)
+        series = time_series(np.arange(10), dates)[[0, 1, 4, 9]]
+        test = series.fill_missing_dates()
+        assert_equal(test.dates, dates)
+        assert_equal(test.dates.timestep, 15)
+        assert_equal(test.mask, [0, 0, 1, 1, 0, 1, 1, 1, 1, 0])
+        assert_equal(test.compressed(), [0, 1, 4, 9])
+        # Dates off the grid of the timestep
+        offgrid = ts.DateArray(dates[:3].tovalues() + [0, 0, 1], freq="T",
+                               timestep=15)
+        series = time_series([1, 2, 3], dates=offgrid)
+        test = series.fill_missing_dates()
+        assert_equal(test.dates.timestep, 1)
+        assert_equal(test.size, 32)
+        assert_equal(test.compressed(), [1, 2, 3])
+        # Unsorted dates
+        dates = date_array(['2001-01-05', '2001-01-01', '2001-01-03'],
+                           freq='D')
+        test = fill_missing_dates(np.array([3, 1, 2]), dates=dates)
+        assert_equal(test, ma.array([1, 0, 2, 0, 3], mask=[0, 1, 0, 1, 0]))
+        # Duplicated dates
+        series = time_series([1, 2, 3], dates=dates[[0, 0, 1]])
+        self.failUnlessRaises(TimeSeriesError, fill_missing_dates, series)
 
 
     def test_pickling(self):
@@ -1578,6 +1828,96 @@ test_dates test suite.
         assert_equal(ctrl.mask, h._series.mask)
 
 
+    def test_convert_partial_periods(self):
+        "Test convert on series starting/ending in the middle of a period"
+        s = time_series(np.arange(150), start_date=Date('S', '2001-01-01 00:00:30'))
+        s[45] = ma.masked
+        ctrl = ma.masked_all((3, 60), dtype=int)
+        ctrl.flat[30:180] = np.arange(150)
+        ctrl[1, 15] = ma.masked
+        for dtype in (int, float, object):
+            test = s.astype(dtype).convert('T')
+            assert_equal(test.dates[0], Date('T', '2001-01-01 00:00'))
+            assert_equal(test._series, ctrl)
+            assert_equal(test._series.mask, ctrl.mask)
+
+
+    def test_convert_with_reducers(self):
+        "Test convert w/ named reducers"
+        s = time_series(np.arange(90.) ** 1.5, start_date=Date('D', '2001-01-01'))
+        s[[3, 10, 40]] = ma.masked
+        s[59:] = ma.masked
+        grouped = s.convert('M')
+        for (name, func) in (('sum', ma.sum), ('mean', ma.mean),
+                             ('min', ma.min), ('max', ma.max),
+                             ('first', ts.first_unmasked_val),
+                             ('last', ts.last_unmasked_val),
+                             ('std', ma.std)):
+            test = s.convert('M', func=name)
+            ctrl = s.convert('M', func=func)
+            assert_equal(test.start_date, ctrl.start_date)
+            assert_almost_equal(test._series, ctrl._series)
+            assert_equal(test._series.mask, [0, 0, 1])
+        test = s.convert('M', func='count')
+        assert_equal(test._series, grouped.count(-1))
+        assert_equal(test._series.mask, [0, 0, 0])
+        test = s.convert('M', func='ohlc')
+        assert_equal(test.shape, (3, 4))
+        assert_equal(test[0], [0, 30. ** 1.5, 0, 30. ** 1.5])
+        assert_equal(test._series.mask[-1], [1, 1, 1, 1])
+        self.failUnlessRaises(ValueError, s.convert, 'M', func='median')
+        # Same frequency
+        test = s.convert('D', func='count')
+        assert_equal(test, 1 - ma.getmaskarray(s))
+        test = s.convert('D', func='ohlc')
+        assert_equal(test.shape, (90, 4))
+        assert_equal(test[:, 3], s)
+        assert_equal(test.mask[:, 0], s.mask)
+        # Extra arguments
+        test = s.convert('M', func='std', ddof=1)
+        ctrl = s.convert('M', func=ma.std, ddof=1)
+        assert_almost_equal(test._series, ctrl._series)
+        self.failUnlessRaises(TypeError, s.convert, 'M', func='sum', ddof=1)
+        self.failUnlessRaises(TypeError, s.convert, 'M', 'sum', 'END', 1)
+        # Large integers keep their precision
+        s = time_series(2 ** 57 + np.arange(90, dtype=np.int64),
+                        start_date=Date('D', '2001-01-01'))
+        for (name, func) in (('min', ma.min), ('max', ma.max),
+                             ('first', ts.first_unmasked_val),
+                             ('last', ts.last_unmasked_val)):
+            test = s.convert('M', func=name)
+            ctrl = s.convert('M', func=func)
+            assert_equal(test.dtype, np.int64)
+            assert_equal(test._series, ctrl._series)
+        test = s.convert('M', func='sum')
+        assert_equal(test[0], 31 * 2 ** 57 + 465)
+
+    def test_convert_with_calendar(self):
+        "Test convert and fill_missing_dates w/ a business calendar"
+        calendar = ts.BusinessCalendar(['2001-01-01', '2001-01-15'])
+        s = time_series(np.arange(20), start_date=Date('D', '2000-12-29'))
+        test = s.convert('B', calendar=calendar)
+        ctrl = s.convert('B')
+        assert_equal(test.dates, ctrl.dates)
+        assert_equal(test.mask.nonzero()[0], [1, 11])
+        assert_equal(test.compressed(), ctrl[[0] + range(2, 11) + [12, 13]])
+        test = s.convert('M', func='count', calendar=calendar)
+        assert_equal(test, [3, 17 - 2])
+        # Business series w/o holidays
+        dates = date_array(start_date='2001-01-12', length=3, freq='B',
+                           calendar=calendar)
+        s = time_series([1, 2, 3], dates=dates)
+        self.failUnless(s.has_missing_dates())
+        self.failUnless(s.fill_missing_dates(calendar=calendar) is s)
+        test = fill_missing_dates(s[[0, 2]], calendar=calendar)
+        assert_equal(test.dates, dates)
+        assert_equal(test, ma.array([1, 2, 3], mask=[0, 1, 0]))
+        # Duplicated dates
+        s = time_series([1, 2, 3], dates=dates[[0, 0, 2]])
+        self.failUnlessRaises(TimeSeriesError, fill_missing_dates, s,
+                              calendar=calendar)
+
+
     def test_change_timestep_to_one(self):
         "Test change to a timestep of 1"
         s_min = self.s_min
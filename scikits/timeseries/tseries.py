@@ -24,6 +24,7 @@ __author__ = "Pierre GF Gerard-Marchant & Matt Knox"
 __revision__ = "$Revision$"
 __date__ = '$Date$'
 
+import inspect
 import sys
 import warnings
 
@@ -41,25 +42,28 @@ from numpy.ma import MaskedArray, MAError, masked, nomask, \
 import tdates
 from tdates import \
     DateError, FrequencyDateError, InsufficientDateError, Date, DateArray, \
-    date_array, now, check_freq, check_freq_str, nodates
+    date_array, now, check_freq, check_freq_str, get_calendar, get_freq_group, \
+    nodates
 
 import const as _c
 import cseries
 
 __all__ = ['TimeSeries', 'TimeSeriesCompatibilityError', 'TimeSeriesError',
            'adjust_endpoints', 'align_series', 'align_with', 'aligned',
-           'asrecords',
+           'asof_join', 'asrecords',
            'compressed', 'concatenate', 'convert',
            'day', 'day_of_year',
            'empty_like',
            'fill_missing_dates', 'find_duplicated_dates', 'first_unmasked_val',
            'flatten',
+           'groupby',
            'hour',
+           'join',
            'last_unmasked_val',
            'minute', 'month',
            'pct', 'pct_log', 'pct_symmetric',
            'quarter',
-           'remove_duplicated_dates',
+           'remove_duplicated_dates', 'resample',
            'second', 'split', 'stack',
            'time_series', 'tofile', 'tshift', 'masked', 'nomask',
            'week', 'weekday',
@@ -534,6 +538,9 @@ class TimeSeries(MaskedArray, object):
         # Set the dates
         _data._dates = dates
         if autosort:
+            if not dates.is_chronological():
+                # Sort a copy of the dates, which may be the caller's
+                _data._dates = dates.copy()
             _data.sort_chronologically()
         return _data
 
@@ -641,7 +648,8 @@ class TimeSeries(MaskedArray, object):
                                                _dates.freq, bound.freq)
         # this allows for slicing with dates outside the end points of the
         # series and slicing on series with missing dates
-        return np.sum(self._dates < bound)
+        return int(_dates.__array__().ravel().searchsorted(bound.value,
+                                                           sorter=_dates._unsorted))
 
 
     def __getitem__(self, indx):
@@ -828,8 +836,7 @@ class TimeSeries(MaskedArray, object):
         _dates = self._dates
         _series = self._series
         if not _dates.is_chronological():
-            _cached = _dates._cachedinfo
-            idx = _cached['chronidx']
+            idx = _dates._unsorted
             if not self._varshape:
                 flatseries = _series.flat
                 flatseries[:] = flatseries[idx]
@@ -838,9 +845,12 @@ class TimeSeries(MaskedArray, object):
                 _series.shape = tuple([-1, ] + list(self._varshape))
                 _series[:] = _series[idx]
                 _series.shape = inishape
-            # Sort the dates and reset the cache
+            # Sort the dates in place (they may be shared with other objects
+            # that share the data) and reset the cache
             flatdates = _dates.ravel()
             flatdates[:] = flatdates[idx]
+            _dates._reset_cachedinfo()
+            _cached = _dates._cachedinfo
             _cached['chronidx'] = np.array([], dtype=int)
             _cached['ischrono'] = True
 
@@ -1530,7 +1540,7 @@ def tofile(series, fileobject, format=None,
     if format is None:
         tmpfiller[:, 0] = _dates.ravel().tostring()
     else:
-        tmpfiller[:, 0] = [_.strftime(format) for _ in _dates.ravel()]
+        tmpfiller[:, 0] = _dates.ravel().strftime(format)
     return scipy.io.write_array(fileobject, tmpfiller, **optpars)
 
 
@@ -1891,14 +1901,655 @@ def align_with(*series):
     return [adjust_endpoints(x, dates[0], dates[-1]) for x in series[1:]]
 
 
+def join(series, how='outer', freq=None, func=None, fill_missing=False,
+         split=False):
+    """
+    Joins several series on their dates into a single 2D series.
+
+    The dates of the result are computed once, and the data of each series are
+    scattered into their own column(s) of a single preallocated masked array.
+    The dates missing from a series are masked in its column(s).
+
+    Parameters
+    ----------
+    series : {sequence}
+        Sequence of time series to join.
+        The series must not have duplicated dates.
+    how : {'outer', 'inner', 'left'}, optional
+        Which dates to keep: the union of the dates of the series ('outer'),
+        their intersection ('inner') or the dates of the first series ('left').
+    freq : {None, freq_spec}, optional
+        Frequency of the result.
+        If None, all the series must have the same frequency.
+        Otherwise, the series with a different frequency are first converted
+        with :func:`convert`.
+    func : {None, function, string}, optional
+        Function used to convert the series to a lower frequency
+        (see :func:`convert`).
+    fill_missing : {False, True}, optional
+        Whether to fill the missing dates of the result with masked values.
+    split : {False, True}, optional
+        Whether to return a list of 1D series (one per column) instead of a
+        2D series. The 1D series are views on the columns of the 2D block.
+
+    Returns
+    -------
+    joined : {TimeSeries, list}
+        A 2D series (dates x columns), or a list of 1D series if ``split``
+        is True.
+
+    Examples
+    --------
+    >>> a = time_series([1, 2, 3], start_date=Date('D', '2001-01-01'))
+    >>> b = time_series([10, 20], start_date=Date('D', '2001-01-02'))
+    >>> join([a, b])
+    timeseries(
+     [[1 --]
+     [2 10]
+     [3 20]],
+        dates =
+     [01-Jan-2001 ... 03-Jan-2001],
+        freq  = D)
+    <BLANKLINE>
+    >>> join([a, b], how='inner').dates
+    DateArray([02-Jan-2001, 03-Jan-2001],
+              freq='D')
+
+    """
+    if how not in ('outer', 'inner', 'left'):
+        raise ValueError("Invalid value for the 'how' parameter: %s" % how)
+    if not len(series):
+        raise ValueError("At least one series is required!")
+    for ser in series:
+        if not isinstance(ser, TimeSeries):
+            raise TimeSeriesError("Only TimeSeries objects can be joined!")
+    # Check the frequencies ......
+    if freq is None:
+        freq = check_freq(_compare_frequencies(*series))
+    else:
+        freq = check_freq(freq)
+        series = [convert(ser, freq, func) for ser in series]
+    # Get the dates and 2D views of the data and mask of each series
+    (values, datas, masks) = ([], [], [])
+    for ser in series:
+        if ser.has_duplicated_dates():
+            raise TimeSeriesError("Cannot join series with duplicated dates!")
+        value = ser._dates.tovalues().ravel()
+        data = ser._data.reshape(value.size, -1)
+        mask = ser._mask
+        if mask is not nomask:
+            mask = mask.reshape(value.size, -1)
+        # Put the series in chronological order (if built w/o autosort)
+        idx = ser._dates._unsorted
+        if idx is not None:
+            value = value[idx]
+            data = data[idx]
+            if mask is not nomask:
+                mask = mask[idx]
+        values.append(value)
+        datas.append(data)
+        masks.append(mask)
+    allvalues = np.concatenate(values)
+    # Get the dates of the result ...
+    # When the dates are not too sparse, count them on a table covering
+    # their span: that avoids sorting them and gives the new positions.
+    rank = None
+    if allvalues.size:
+        (vmin, vmax) = (allvalues.min(), allvalues.max())
+        span = vmax - vmin + 1
+        if span <= 4 * allvalues.size + 1024:
+            if how == 'left':
+                present = np.zeros(span, dtype=bool_)
+                present[values[0] - vmin] = True
+            elif how == 'outer':
+                present = np.zeros(span, dtype=bool_)
+                present[allvalues - vmin] = True
+            else:
+                present = (np.bincount(allvalues - vmin, minlength=span)
+                           == len(values))
+            newvalues = present.nonzero()[0] + vmin
+            if fill_missing and newvalues.size:
+                present[newvalues[0] - vmin:newvalues[-1] - vmin + 1] = True
+                newvalues = np.arange(newvalues[0], newvalues[-1] + 1)
+            rank = present.cumsum() - 1
+            rank[~present] = -1
+    if rank is None:
+        if how == 'left':
+            newvalues = values[0]
+        elif how == 'outer':
+            newvalues = np.unique(allvalues)
+        else:
+            # The dates are unique in each series: once sorted, the dates
+            # common to all the series are repeated len(values) times
+            svalues = np.sort(allvalues)
+            nrep = len(values) - 1
+            nkeep = max(svalues.size - nrep, 0)
+            newvalues = svalues[nrep:][svalues[nrep:] == svalues[:nkeep]]
+        if fill_missing and newvalues.size:
+            newvalues = np.arange(newvalues[0], newvalues[-1] + 1)
+    newdates = DateArray(newvalues, freq=freq)
+    # Scatter the data into the block
+    nsize = newvalues.size
+    ncols = sum(data.shape[-1] for data in datas)
+    dtype = np.result_type(*[data.dtype for data in datas])
+    newdata = np.empty((nsize, ncols), dtype=dtype, order='F')
+    newmask = np.ones((nsize, ncols), dtype=bool_, order='F')
+    icol = 0
+    for (value, data, mask) in zip(values, datas, masks):
+        width = data.shape[-1]
+        if nsize and value.size:
+            if rank is not None:
+                position = rank[value - vmin]
+                found = (position >= 0)
+            else:
+                position = newvalues.searchsorted(value)
+                found = (newvalues.take(position, mode='clip') == value)
+            if not found.all():
+                position = position[found]
+                data = data[found]
+                if mask is not nomask:
+                    mask = mask[found]
+            # The dates are sorted: use a slice if they are consecutive
+            if position.size and \
+               (position[-1] - position[0] == position.size - 1):
+                position = slice(position[0], position[-1] + 1)
+            for k in range(width):
+                newdata[:, icol + k][position] = data[:, k]
+                if mask is nomask:
+                    newmask[:, icol + k][position] = False
+                else:
+                    newmask[:, icol + k][position] = mask[:, k]
+        icol += width
+    _data = masked_array(newdata, mask=newmask, copy=False)
+    joined = time_series(_data, dates=newdates)
+    if split:
+        columns = [joined[:, i] for i in range(ncols)]
+        # Make sure the columns keep sharing the mask of the block
+        for column in columns:
+            column._sharedmask = False
+        return columns
+    return joined
+
+
+def asof_join(left, right, direction='backward', tolerance=None,
+              position='END'):
+    """
+    Attaches to each date of `left` the latest (or next, or closest) available
+    value of `right`.
+
+    The dates of both sides are compared as integers, and scanned only once.
+    Masked values of `right` are not available, and are skipped.
+
+    Parameters
+    ----------
+    left : {TimeSeries, DateArray}
+        Series (or dates) to which the values of `right` are attached.
+    right : TimeSeries
+        Series providing the values.
+    direction : {'backward', 'forward', 'nearest'}, optional
+        Which date of `right` is matched to a date of `left`: the last one on
+        or before it ('backward'), the first one on or after it ('forward'),
+        or the closest one ('nearest').
+        In that last case, ties are resolved backward.
+    tolerance : {None, int}, optional
+        Maximum distance between two matching dates, as a number of periods
+        at the frequency used for the comparison.
+    position : {'END', 'START'}, optional
+        When the two sides have different frequencies, the dates with the
+        lower frequency are converted to the higher one: this parameter
+        selects where they fall in the new periods (see :func:`convert`).
+
+    Returns
+    -------
+    matched : TimeSeries
+        A series with the dates of `left` and the values of `right`.
+        The dates without any match are masked.
+
+    Notes
+    -----
+    Use ``join([left, matched], how='left')`` to get both the values of
+    `left` and the matched values in a single 2D series.
+
+    Examples
+    --------
+    >>> monthly = time_series([1, 2, 3], start_date=Date('M', '2001-01'))
+    >>> daily = date_array(['2001-01-15', '2001-02-28', '2001-03-01'],
+    ...                    freq='D')
+    >>> asof_join(daily, monthly)
+    timeseries([-- 2 2],
+       dates = [15-Jan-2001 28-Feb-2001 01-Mar-2001],
+       freq  = D)
+    <BLANKLINE>
+    >>> asof_join(daily, monthly, position='START')
+    timeseries([1 2 3],
+       dates = [15-Jan-2001 28-Feb-2001 01-Mar-2001],
+       freq  = D)
+    <BLANKLINE>
+
+    """
+    if isinstance(left, TimeSeries):
+        ldates = left._dates
+    elif isinstance(left, DateArray):
+        ldates = left
+    else:
+        raise TimeSeriesError("The left side should be a TimeSeries or a "
+                              "DateArray (got %s instead)" % type(left))
+    if not isinstance(right, TimeSeries):
+        raise TimeSeriesError("The right side should be a TimeSeries "
+                              "(got %s instead)" % type(right))
+    if direction not in ('backward', 'forward', 'nearest'):
+        raise ValueError("Invalid value for the 'direction' parameter: %s" %
+                         direction)
+    ldates = ldates.ravel()
+    rdates = right._dates.ravel()
+    # Compare the dates at the highest frequency .........
+    (lunit, runit) = (ldates._unit, rdates._unit)
+    (lvalues, rvalues) = (ldates.tovalues(), rdates.tovalues())
+    if lunit != runit:
+        if _c.FR_UND in (lunit, runit):
+            raise TimeSeriesError("Cannot match dates with an undefined "
+                                  "frequency to dates with another frequency!")
+        if get_freq_group(lunit) < get_freq_group(runit):
+            lvalues = ldates.asfreq(runit, position).tovalues()
+        else:
+            rvalues = rdates.asfreq(lunit, position).tovalues()
+    # Keep the available values of right, in chronological order
+    rmask = getmaskarray(right)
+    if rmask.ndim > 1:
+        rmask = rmask.reshape(rvalues.size, -1).all(axis=-1)
+    available = rdates._unsorted
+    if rmask.any():
+        if available is None:
+            available = (~rmask).nonzero()[0]
+        else:
+            available = available[~rmask[available]]
+    if available is not None:
+        rvalues = rvalues[available]
+    # Match the dates (the left ones must be sorted too) .
+    order = None
+    if not ldates.is_chronological():
+        order = lvalues.argsort(kind='mergesort')
+        lvalues = lvalues[order]
+    indices = cseries.TS_asof(lvalues, rvalues, direction, tolerance)
+    if order is not None:
+        indices[order] = indices.copy()
+    found = (indices >= 0)
+    if available is not None:
+        indices[found] = available[indices[found]]
+    # Build the result ...................................
+    series = right._series
+    if series.shape[0]:
+        matched = series[indices.clip(0)]
+    else:
+        matched = ma.empty((indices.size,) + series.shape[1:],
+                           dtype=series.dtype)
+    if not found.all():
+        matched[~found] = masked
+    return time_series(matched, dates=ldates, **_attrib_dict(right))
+
+
+def _accepts_axis(func):
+    """
+    Returns whether the function `func` takes an ``axis`` argument.
+    Ufuncs and the callables whose signature cannot be inspected are assumed
+    not to.
+    """
+    if isinstance(func, np.ufunc):
+        return False
+    target = func
+    if not (inspect.isfunction(func) or inspect.ismethod(func)):
+        target = getattr(func, '__call__', None)
+    try:
+        (args, varargs, varkw, defaults) = inspect.getargspec(target)
+    except TypeError:
+        return False
+    return ('axis' in args) or (varkw is not None)
+
+
+class TimeSeriesGroupBy(object):
+    """
+    Groups the values of a series that share the same key.
+
+    The keys are computed once, and the values are sorted once by key: each
+    group is then a contiguous segment of the sorted values, reduced in a
+    single pass with the ``reduceat`` method of the ufuncs.
+
+    Parameters
+    ----------
+    series : TimeSeries
+        The series to group.
+    key : {string, sequence of strings, function, sequence}
+        Name(s) of date fields ('month', 'day_of_week', 'hour'...), function
+        taking the :class:`DateArray` of the series and returning one key per
+        date, or sequence of keys with one key per date.
+
+    Attributes
+    ----------
+    keys : ndarray
+        The sorted keys of the groups. The keys made from several fields are
+        stored in a structured array, with one field per name.
+    counts : ndarray
+        The number of dates of each group.
+
+    """
+    def __init__(self, series, key):
+        if not isinstance(series, TimeSeries):
+            raise TimeSeriesError("A TimeSeries is required (got %s instead)"
+                                  % type(series))
+        dates = series._dates
+        if series._varshape == ():
+            # nD/1V: group the values one by one
+            (dates, data) = (dates.ravel(), series._series.ravel())
+        else:
+            data = series._series.reshape((dates.size,) + series._varshape)
+            dates = dates.ravel()
+        # Get one key per date ...........................
+        if isinstance(key, basestring):
+            if key not in tdates._date_fields:
+                raise ValueError("Unrecognized date field: %s" % key)
+            code = tdates._date_fields[key]
+            keys = dates._get_fields_info([code])[code]
+        elif callable(key):
+            keys = np.asarray(key(dates))
+        else:
+            keys = np.asarray(key)
+            if keys.size and (keys.dtype.char in 'SU') and \
+               np.all([k in tdates._date_fields for k in keys.flat]):
+                keys = dates.fields(keys.tolist())
+        if keys.shape != dates.shape:
+            keys = keys.reshape(dates.shape)
+        # Flat series of the values, indexed by the sorting permutation
+        flat = data.view(type(series))
+        flat._varshape = series._varshape
+        flat._dates = dates
+        flat._update_from(series)
+        self._series = flat
+        self._data = data
+        # Sort the keys ..................................
+        (self._order, self._starts, self.counts) = self._sort_keys(keys)
+        self.keys = keys[self._order[self._starts]]
+
+    def _sort_keys(self, keys):
+        """
+    Returns the stable permutation sorting the keys, the starting index of
+    each group in the sorted keys, and the number of dates of each group.
+        """
+        size = keys.size
+        if not size:
+            empty = np.array([], dtype=int)
+            return (empty, empty, empty)
+        if keys.dtype.names:
+            # Several fields: combine them into a single integer
+            codes = np.zeros(size, dtype=int)
+            for name in keys.dtype.names:
+                field = keys[name]
+                (fmin, fmax) = (field.min(), field.max())
+                codes *= (fmax - fmin + 1)
+                codes += (field - fmin)
+        elif keys.dtype.kind in 'biu':
+            codes = keys.astype(int, copy=False)
+        else:
+            codes = np.unique(keys, return_inverse=True)[-1]
+        (cmin, cmax) = (codes.min(), codes.max())
+        if (cmax - cmin) <= 4 * size + 1024:
+            # Small span: counting sort
+            (order, counts) = cseries.TS_groupsort(codes - cmin,
+                                                   cmax - cmin + 1)
+            counts = counts[counts.nonzero()]
+        else:
+            order = codes.argsort(kind='mergesort')
+            sortedcodes = codes[order]
+            flag = np.ones(size, dtype=bool)
+            flag[1:] = (sortedcodes[1:] != sortedcodes[:-1])
+            counts = np.diff(np.r_[flag.nonzero()[0], size])
+        starts = np.r_[0, counts[:-1].cumsum()]
+        return (order, starts, counts)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        ends = self._starts + self.counts
+        for (key, start, end) in zip(self.keys, self._starts, ends):
+            yield (key, self._series[self._order[start:end]])
+
+    def agg(self, func, *args, **kwargs):
+        """
+    Reduces the values of each group.
+
+    Parameters
+    ----------
+    func : {string, function}
+        Reduction to perform on each group.
+        The strings 'sum', 'prod', 'mean', 'var', 'std', 'min', 'max',
+        'first', 'last' and 'count' select a reduction performed on all the
+        groups at once, skipping the masked values. The result of a group is
+        masked when all its values are masked ('count' gives 0 instead).
+        An optional ``ddof`` keyword (0 by default) sets the delta degrees
+        of freedom of 'var' and 'std'.
+        Otherwise, the function is called on each group (as a
+        :class:`~numpy.ma.MaskedArray`). When the series has several
+        variables, it is called with an ``axis=0`` keyword if its signature
+        accepts one, and along each variable otherwise.
+    *args : {extra arguments for func parameter}, optional
+        Mandatory parameters of the :keyword:`func` function.
+    **kwargs : {extra keyword arguments for func parameter}, optional
+        Optional keyword parameters of the :keyword:`func` function.
+
+    Returns
+    -------
+    result : MaskedArray
+        One row per group, in the order of the :attr:`keys`.
+
+        """
+        (order, starts) = (self._order, self._starts)
+        data = ma.getdata(self._data)[order]
+        mask = getmaskarray(self._data)[order]
+        if not isinstance(func, basestring):
+            results = []
+            withaxis = (data.ndim > 1) and _accepts_axis(func)
+            for (start, end) in zip(starts, starts + self.counts):
+                group = masked_array(data[start:end], mask=mask[start:end])
+                if withaxis:
+                    result = func(group, axis=0, *args, **kwargs)
+                elif group.ndim > 1:
+                    result = ma.apply_along_axis(func, 0, group,
+                                                 *args, **kwargs)
+                else:
+                    result = func(group, *args, **kwargs)
+                results.append(ma.asarray(result))
+            if not results:
+                return masked_array([])
+            return masked_array([ma.getdata(r) for r in results],
+                                mask=[getmaskarray(r) for r in results])
+        #
+        reducer = func.lower()
+        valid = ~mask
+        if not len(starts):
+            dtype = data.dtype
+            if reducer == 'count':
+                dtype = int
+            elif reducer in ('mean', 'var', 'std'):
+                dtype = float
+            return masked_array(np.empty(data.shape, dtype=dtype))
+        count = np.add.reduceat(valid, starts, axis=0, dtype=int)
+        if reducer == 'count':
+            return masked_array(count)
+        if reducer in ('sum', 'prod', 'mean', 'var', 'std'):
+            if reducer == 'prod':
+                (ufunc, neutral) = (np.multiply, 1)
+            else:
+                (ufunc, neutral) = (np.add, 0)
+            dtype = np.sum(np.empty(0, dtype=data.dtype)).dtype
+            if reducer != 'sum' and reducer != 'prod':
+                dtype = np.result_type(dtype, float)
+            values = np.where(valid, data, neutral).astype(dtype)
+            result = ufunc.reduceat(values, starts, axis=0)
+            if reducer in ('mean', 'var', 'std'):
+                result /= np.where(count, count, 1)
+            if reducer in ('var', 'std'):
+                ddof = kwargs.get('ddof', 0)
+                values -= np.repeat(result, self.counts, axis=0)
+                values[mask] = 0
+                values = umath.absolute(values) ** 2
+                result = np.add.reduceat(values, starts, axis=0)
+                count = count - ddof
+                result /= np.where(count > 0, count, 1)
+                if reducer == 'std':
+                    result = umath.sqrt(result)
+        elif reducer in ('min', 'max'):
+            if reducer == 'min':
+                (ufunc, fill) = (np.minimum, ma.minimum_fill_value(data))
+            else:
+                (ufunc, fill) = (np.maximum, ma.maximum_fill_value(data))
+            result = ufunc.reduceat(np.where(valid, data, fill), starts,
+                                    axis=0).astype(data.dtype)
+        elif reducer in ('first', 'last'):
+            size = len(data)
+            position = np.arange(size).reshape((size,) + (1,) * (data.ndim - 1))
+            if reducer == 'first':
+                position = np.where(valid, position, size)
+                position = np.minimum.reduceat(position, starts, axis=0)
+            else:
+                position = np.where(valid, position, -1)
+                position = np.maximum.reduceat(position, starts, axis=0)
+            position = position.clip(0, size - 1)
+            flat = data.reshape(size, -1)
+            columns = np.arange(flat.shape[1])
+            result = flat[position.reshape(len(starts), -1), columns]
+            result.shape = position.shape
+        else:
+            raise ValueError("Unrecognized reducer: %s" % func)
+        return masked_array(result, mask=(count <= 0))
+
+
+def groupby(series, key):
+    """
+    Groups the values of a series by key, usually a field of the dates.
+
+    Parameters
+    ----------
+    series : TimeSeries
+        Series to group. Skip this parameter if you are calling this as
+        a method of the TimeSeries object instead of the module function.
+    key : {string, sequence of strings, function, sequence}
+        Name(s) of date fields ('month', 'day_of_week', 'hour'...), function
+        taking the :class:`DateArray` of the series and returning one key per
+        date, or sequence of keys with one key per date.
+
+    Returns
+    -------
+    grouped : TimeSeriesGroupBy
+        An object whose :meth:`~TimeSeriesGroupBy.agg` method reduces each
+        group, the groups being sorted by key.
+
+    Examples
+    --------
+    >>> series = time_series(np.arange(60.), start_date=Date('D', '2001-01-01'))
+    >>> grouped = series.groupby('month')
+    >>> grouped.keys
+    array([1, 2, 3])
+    >>> grouped.agg('mean')
+    masked_array(data = [15.0 44.5 59.0],
+                 mask = [False False False],
+           fill_value = 1e+20)
+    <BLANKLINE>
+
+    """
+    return TimeSeriesGroupBy(series, key)
+TimeSeries.groupby = groupby
+
+
+def resample(series, freq, how='mean', position='END', unit=None,
+             fill_missing=False):
+    """
+    Aggregates the values of a series on the periods of a new frequency.
+
+    Contrary to :func:`convert`, the dates of the series may be missing,
+    duplicated or unsorted.
+    Each date is converted once to the new frequency, and the values falling
+    in the same period are reduced together (see :meth:`TimeSeriesGroupBy.agg`):
+    the series is never filled to a regular series at its own frequency.
+
+    Parameters
+    ----------
+    series : TimeSeries
+        Series to resample. Skip this parameter if you are calling this as
+        a method of the TimeSeries object instead of the module function.
+    freq : freq_spec
+        Frequency of the new periods.
+    how : {string, function}, optional
+        Reduction of the values of each period: one of the strings 'sum',
+        'prod', 'mean', 'var', 'std', 'min', 'max', 'first', 'last' and
+        'count' (the masked values are then skipped), or a function called on
+        each period.
+    position : {'END', 'START'}, optional
+        When the new frequency is higher than the frequency of the series,
+        selects the period in which the values fall.
+    unit : {None, freq_spec}, optional
+        Frequency of the dates of a series with an undefined frequency, whose
+        values are then read as dates at this frequency.
+    fill_missing : {False, True}, optional
+        Whether to add the periods without any value, as masked values.
+
+    Returns
+    -------
+    resampled : TimeSeries
+        A series at the new frequency, in chronological order and without
+        duplicated dates.
+
+    Examples
+    --------
+    >>> events = time_series([1., 2, 3, 4], freq='U',
+    ...                      dates=[86400 * 2 + 60, 60, 86400 * 2, 120])
+    >>> resample(events, 'D', 'sum', unit='S')
+    timeseries([6.0 4.0],
+       dates = [01-Jan-1970 03-Jan-1970],
+       freq  = D)
+    <BLANKLINE>
+
+    """
+    if not isinstance(series, TimeSeries):
+        raise TimeSeriesError("A TimeSeries is required (got %s instead)"
+                              % type(series))
+    to_freq = check_freq(freq)
+    if to_freq == _c.FR_UND:
+        raise TimeSeriesError("Cannot resample a series to UNDEFINED "
+                              "frequency.")
+    position = position.upper()
+    if position not in ('END', 'START'):
+        err_msg = "Invalid value for position argument: (%s). "\
+                  "Should be in ['END','START']," % str(position)
+        raise ValueError(err_msg)
+    dates = series._dates
+    if dates._unit == _c.FR_UND:
+        if unit is None:
+            raise TimeSeriesError("Cannot resample a series with UNDEFINED "
+                                  "frequency without a unit.")
+        dates = DateArray(dates.tovalues(), freq=unit)
+    # Find the new period of each date, and reduce each period
+    newdates = dates.asfreq(to_freq, position)
+    grouped = TimeSeriesGroupBy(series, newdates.tovalues())
+    result = grouped.agg(how)
+    newdates = DateArray(grouped.keys, freq=to_freq)
+    if result.dtype == series.dtype:
+        result = time_series(result, dates=newdates, **_attrib_dict(series))
+    else:
+        result = time_series(result, dates=newdates)
+    if fill_missing:
+        result = fill_missing_dates(result)
+    return result
+TimeSeries.resample = resample
+
+
 #....................................................................
 def _convert1d(series, freq, func, position, *args, **kwargs):
     "helper function for `convert` function"
     # Check the frequencies ..........................
     to_freq = check_freq(freq)
     from_freq = series._unit
-    # Don't do anything if not needed
-    if from_freq == to_freq:
+    # Don't do anything if not needed (the named reducers still apply)
+    if (from_freq == to_freq) and not isinstance(func, basestring):
         return series
     if from_freq == _c.FR_UND:
         err_msg = "Cannot convert a series with UNDEFINED frequency."
@@ -1930,24 +2581,47 @@ def _convert1d(series, freq, func, position, *args, **kwargs):
     if (data_.size // series._dates.size) > 1:
         raise TimeSeriesError("convert works with 1D data only !")
 
-    cdictresult = cseries.TS_convert(data_, from_freq, series._timestep,
-                                     to_freq, position, int(start_date), mask_)
-    start_date = Date(freq=to_freq, value=cdictresult['startindex'])
-    data_ = masked_array(cdictresult['values'], mask=cdictresult['mask'])
-
-    if data_.ndim == 2:
-        if func is None:
-            newvarshape = data_.shape[1:]
-        else:
-            # Try to use an axis argument
-            try:
-                data_ = func(data_, axis= -1, *args, **kwargs)
-            # Fall back to apply_along_axis (slower)
-            except TypeError:
-                data_ = ma.apply_along_axis(func, -1, data_, *args, **kwargs)
+    if isinstance(func, basestring):
+        # Named reducer: aggregate each new period directly in C
+        reducer = func.lower()
+        ddof = kwargs.pop('ddof', 0)
+        if args or kwargs or (ddof and reducer != 'std'):
+            raise TypeError("The named reducers do not take any extra "
+                            "argument, except ddof for 'std'.")
+        cdictresult = cseries.TS_convert(data_, from_freq, series._timestep,
+                                         to_freq, position, int(start_date),
+                                         mask_, reducer, ddof)
+        start_date = Date(freq=to_freq, value=cdictresult['startindex'])
+        values = cdictresult['values']
+        if reducer == 'count':
+            values = values.astype(int)
+        elif reducer == 'sum':
+            values = values.astype(np.sum(np.empty(0, dtype=data_.dtype)).dtype)
+        elif reducer not in ('mean', 'std'):
+            values = values.astype(data_.dtype)
+        data_ = masked_array(values, mask=cdictresult['mask'])
+        newvarshape = data_.shape[1:]
+    else:
+        cdictresult = cseries.TS_convert(data_, from_freq, series._timestep,
+                                         to_freq, position, int(start_date),
+                                         mask_)
+        start_date = Date(freq=to_freq, value=cdictresult['startindex'])
+        data_ = masked_array(cdictresult['values'], mask=cdictresult['mask'])
+
+        if data_.ndim == 2:
+            if func is None:
+                newvarshape = data_.shape[1:]
+            else:
+                # Try to use an axis argument
+                try:
+                    data_ = func(data_, axis= -1, *args, **kwargs)
+                # Fall back to apply_along_axis (slower)
+                except TypeError:
+                    data_ = ma.apply_along_axis(func, -1, data_,
+                                                *args, **kwargs)
+                newvarshape = ()
+        elif data_.ndim == 1:
             newvarshape = ()
-    elif data_.ndim == 1:
-        newvarshape = ()
 
     newdates = DateArray(np.arange(len(data_)) + start_date, freq=to_freq)
 
@@ -1966,6 +2640,7 @@ def convert(series, freq, func=None, position='END', *args, **kwargs):
 
     If the input series has any missing dates, it will first be filled in with
     masked values prior to doing the conversion.
+    Use :func:`resample` instead for series with duplicated dates.
 
     Parameters
     ----------
@@ -1975,7 +2650,7 @@ def convert(series, freq, func=None, position='END', *args, **kwargs):
     freq : freq_spec
         Frequency to convert the TimeSeries to. Accepts any valid frequency
         specification (string or integer)
-    func : function, optional
+    func : {function, string}, optional
         When converting a series to a lower frequency, the :keyword:`func`
         parameter to perform a calculation on each period of values
         to aggregate results.
@@ -1984,6 +2659,21 @@ def convert(series, freq, func=None, position='END', *args, **kwargs):
         If the first or last value from a period, the functions
         :func:`~scikits.timeseries.first_unmasked_val` and
         :func:`~scikits.timeseries.last_unmasked_val` should be used instead.
+        :keyword:`func` can also be one of the strings 'sum', 'mean', 'min',
+        'max', 'first', 'last', 'count', 'std' or 'ohlc': the masked values
+        are then skipped and each period is reduced in a single pass, without
+        building the intermediary 2D series. The result of a period is masked
+        when all its values are masked ('count' gives 0 instead).
+        With 'ohlc', the series has 4 columns (first, max, min and last
+        values). The standard deviation is computed with ``ddof=0``, unless
+        a ``ddof`` keyword is given: the named reducers take no other extra
+        argument. Integers are reduced as 64-bit integers, but uint64 values
+        are reduced as doubles and lose their precision above 2**53.
+        The named reducers see all the values of each new period, and are
+        also applied when the frequency does not change ('count' then gives
+        1 or 0, 'ohlc' repeats each value). A function gets the rows of the
+        2D series instead, whose width is the largest number of periods of
+        the series in a new period: the values beyond it are dropped.
         If :keyword:`func` is not given, the output series group the points
         of the initial series that share the same new date. Thus, if the
         initial series has a daily frequency and is 1D, the output series is
@@ -1998,6 +2688,11 @@ def convert(series, freq, func=None, position='END', *args, **kwargs):
         Mandatory parameters of the :keyword:`func` function.
     **kwargs : {extra keyword arguments for func parameter}, optional
         Optional keyword parameters of the :keyword:`func` function.
+        The ``calendar`` keyword is reserved: it gives a
+        :class:`~scikits.timeseries.BusinessCalendar` (or the name of a
+        registered calendar). In that case, the values of a business or daily
+        series falling on a holiday are masked before the conversion, and the
+        holidays of a business or daily result are masked as well.
 
     Returns
     -------
@@ -2020,6 +2715,11 @@ def convert(series, freq, func=None, position='END', *args, **kwargs):
         # can only convert continuous time series, so fill in missing dates
         series = fill_missing_dates(series)
 
+    calendar = kwargs.pop('calendar', None)
+    if calendar is not None:
+        calendar = get_calendar(calendar)
+        series = _mask_holidays(series, calendar)
+
     if series.ndim == 1:
         obj = _convert1d(series, freq, func, position, *args, **kwargs)
     elif series.ndim == 2:
@@ -2028,16 +2728,32 @@ def convert(series, freq, func=None, position='END', *args, **kwargs):
                                           *args, **kwargs)._series
                                for m in series.split()]).view(type(series))
         obj._dates = base._dates
-        if func is None:
+        if (func is None) or (func == 'ohlc'):
             shp = obj.shape
             ncols = base.shape[-1]
             obj.shape = (shp[0], shp[-1] // ncols, ncols)
             obj = np.swapaxes(obj, 1, 2)
 
+    if calendar is not None:
+        obj = _mask_holidays(obj, calendar)
     return obj
 TimeSeries.convert = convert
 
 
+def _mask_holidays(series, calendar):
+    "Masks the values of a business or daily series falling on holidays."
+    if get_freq_group(series._unit) not in (_c.FR_BUS, _c.FR_DAY):
+        return series
+    holidays = calendar.is_holiday(series._dates)
+    if not holidays.any():
+        return series
+    mask = getmaskarray(series).copy()
+    mask[holidays] = True
+    series = series.copy()
+    series.mask = mask
+    return series
+
+
 
 def change_timestep(series, newstep, func=None, *args, **kwargs):
     """
@@ -2311,7 +3027,8 @@ TimeSeries.pct_symmetric = pct_symmetric
 
 
 
-def fill_missing_dates(data, dates=None, freq=None, fill_value=None):
+def fill_missing_dates(data, dates=None, freq=None, fill_value=None,
+                       calendar=None):
     """
     Finds and fills the missing dates in a time series. The data
     corresponding to the initially missing dates are masked, or filled to
@@ -2329,6 +3046,10 @@ def fill_missing_dates(data, dates=None, freq=None, fill_value=None):
     fill_value : {scalar of type data.dtype} (optional)
         Default value for missing data. If Not specified, the data are just
         masked.
+    calendar : {None, BusinessCalendar, string} (optional)
+        Business calendar (or name of a registered calendar).
+        If given, only the missing business days of the calendar are filled:
+        the holidays are skipped, unless they are already present.
 
     """
     # Check the frequency ........
@@ -2347,7 +3068,12 @@ def fill_missing_dates(data, dates=None, freq=None, fill_value=None):
         if not isinstance(dates, DateArray):
             dates = DateArray(dates, freq)
     dflat = dates.asfreq(freq).ravel()
-    if not dflat.has_missing_dates():
+    if calendar is not None:
+        newdates = tdates.fill_missing_dates(dflat, calendar=calendar)
+        nomissing = (newdates is dflat)
+    else:
+        nomissing = not dflat.has_missing_dates()
+    if nomissing:
         if isinstance(data, TimeSeries):
             return data
         data = data.view(TimeSeries)
@@ -2367,6 +3093,7 @@ def fill_missing_dates(data, dates=None, freq=None, fill_value=None):
         datad = np.asarray(data)
         datam = nomask
         datat = TimeSeries
+        datas = ()
     # Check whether we need to flatten the data
     if data.ndim > 1:
         if (not datas):
@@ -2375,42 +3102,36 @@ def fill_missing_dates(data, dates=None, freq=None, fill_value=None):
             err_msg = "fill_missing_dates is not yet implemented for nD series!"
             raise NotImplementedError(err_msg)
     # ...and now, fill it ! ......
-    (tstart, tend) = dflat[[0, -1]]
-    newdates = date_array(start_date=tstart, end_date=tend)
-    (osize, nsize) = (dflat.size, newdates.size)
-    #.............................
-    # Get the steps between consecutive data.
-    delta = dflat.get_steps() - 1
-    gap = delta.nonzero()
-    slcid = np.concatenate(([0, ], np.arange(1, osize)[gap], [osize, ]))
-    oldslc = np.array([slice(i, e)
-                       for (i, e) in np.broadcast(slcid[:-1], slcid[1:])])
-    addidx = delta[gap].astype(int).cumsum()
-    newslc = np.concatenate(([oldslc[0]],
-                             [slice(i + d, e + d) for (i, e, d) in \
-                              np.broadcast(slcid[1:-1], slcid[2:], addidx)]
-                             ))
-    #.............................
-    # Just a quick check
-    vdflat = np.asarray(dflat)
-    vnewdates = np.asarray(newdates)
-    for (osl, nsl) in zip(oldslc, newslc):
-        assert np.equal(vdflat[osl], vnewdates[nsl]).all(), \
-            "Slicing mishap ! Please check %s (old) and %s (new)" % (osl, nsl)
-    #.............................
+    values = dflat.tovalues()
+    if dflat.has_duplicated_dates():
+        err_msg = "Cannot fill the missing dates of a series with "\
+                  "duplicated dates!"
+        raise TimeSeriesError(err_msg)
+    if calendar is not None:
+        # The holidays are skipped: find the new positions by bisection
+        position = newdates.tovalues().searchsorted(values)
+    else:
+        (tstart, tend) = (values.min(), values.max())
+        timestep = dflat.timestep
+        position = values - tstart
+        if timestep > 1:
+            if (position % timestep).any():
+                timestep = 1
+            else:
+                position //= timestep
+        newdates = date_array(start_date=Date(dflat.freq, value=tstart),
+                              end_date=Date(dflat.freq, value=tend),
+                              timestep=timestep)
+    # Scatter the data and the mask to their new positions
     newshape = list(datad.shape)
-    newshape[0] = nsize
+    newshape[0] = newdates.size
     newdatad = np.empty(newshape, dtype=data.dtype)
     newdatam = np.ones(newshape, dtype=ma.make_mask_descr(datad.dtype))
-    #....
+    newdatad[position] = datad
     if datam is nomask:
-        for (new, old) in zip(newslc, oldslc):
-            newdatad[new] = datad[old]
-            newdatam[new] = False
+        newdatam[position] = False
     else:
-        for (new, old) in zip(newslc, oldslc):
-            newdatad[new] = datad[old]
-            newdatam[new] = datam[old]
+        newdatam[position] = datam
     if fill_value is None:
         fill_value = getattr(data, '_fill_value', None)
     newdata = ma.masked_array(newdatad, mask=newdatam, fill_value=fill_value)
@@ -59,7 +59,7 @@ def configuration(parent_package='',top_path=None):
 def setup_package():
 
     setup(
-          install_requires='numpy >= 1.3.0',
+          install_requires='numpy >= 1.7.0',
           namespace_packages=['scikits'],
           packages=setuptools.find_packages(),
           test_suite = 'nose.collector',